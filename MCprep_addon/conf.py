@@ -16,6 +16,7 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+from collections import OrderedDict
 from mathutils import Vector
 from pathlib import Path
 from typing import Optional, Union, Tuple, List, Dict
@@ -68,6 +69,14 @@ DEBUG_MODE = False
 MCPREP_RESOURCES: Path = Path(os.path.dirname(__file__), "MCprep_resources")
 
 
+def get_user_cache_dir() -> Path:
+	"""Folder for caches kept between sessions, outside of the addon folder.
+
+	The folder itself is only created once a cache is first written.
+	"""
+	return Path(bpy.utils.user_resource('CONFIG', path="mcprep"))
+
+
 # -----------------------------------------------------------------------------
 # ADDON GLOBAL VARIABLES AND INITIAL SETTINGS
 # -----------------------------------------------------------------------------
@@ -77,9 +86,26 @@ class MCprepEnv:
 	def __init__(self):
 		self.data = None
 		self.json_data: Optional[Dict] = None
+		# util.CanonicalIndex and util.ChecklistIndex, rebuilt whenever
+		# json_data is (re)loaded
+		self.canonical_index = None
+		self.checklist_index = None
 		self.json_path: Path = Path(MCPREP_RESOURCES, "mcprep_data.json")
 		self.json_path_update: Path = Path(
 			MCPREP_RESOURCES, "mcprep_data_update.json")
+		# Caches written at runtime go to the user config folder, so that
+		# they survive addon updates and never end up in the addon itself.
+		self.user_cache_dir: Path = get_user_cache_dir()
+		# Json lines file of generate.ImageAnalysisCache records, which is
+		# lazily loaded on the first image analysis lookup.
+		self.image_cache_path: Path = Path(
+			self.user_cache_dir, "image_analysis_cache.jsonl")
+		self.image_analysis_cache = None
+		# Json lines file of meshswap.MeshswapAssetCache records, holding the
+		# contents of meshswap libraries between sessions.
+		self.meshswap_asset_cache_file: Path = Path(
+			self.user_cache_dir, "meshswap_asset_cache.jsonl")
+		self.meshswap_asset_cache = None
 
 		self.dev_file: Path = Path(os.path.dirname(__file__), "mcprep_dev.txt")
 		self.languages_folder: Path = Path(MCPREP_RESOURCES, "Languages")
@@ -135,6 +161,32 @@ class MCprepEnv:
 		# If ever changing the resource pack, should also reset to None.
 		self.material_sync_cache: List = []
 
+		# -----------------------------------------------
+		# Resource pack texture catalogs, keyed by pack folder path
+		# -----------------------------------------------
+
+		# Values are generate.TexturePackIndex and generate.ModelPackIndex,
+		# which invalidate themselves when the pack's folders change on disk.
+		self.texturepack_indexes: Dict = {}
+		self.modelpack_indexes: Dict = {}
+		# generate.PackStack lookups, keyed by the tuple of layered pack paths
+		self.pack_stacks: Dict = {}
+		# generate.PassIndex of extra pbr pass images, keyed by folder path
+		self.pass_indexes: Dict = {}
+		# Alpha channels read by uv_tools.get_image_alpha, keyed by image name
+		# in least recently used order
+		self.alpha_cache: OrderedDict = OrderedDict()
+		# Resolved mcmodel elements and textures, keyed by model path and the
+		# pack stack folders, see mcmodel.read_model
+		self.model_cache: Dict = {}
+		# Names of prepped template materials, keyed by template key, see
+		# generate.prep_material_from_template
+		self.material_templates: Dict = {}
+		# Names of merged item meshes, keyed by item.get_item_mesh_key
+		self.item_meshes: Dict = {}
+		# Names of built model meshes, keyed by mcmodel.get_model_mesh_key
+		self.model_meshes: Dict = {}
+
 		# Whether we use PO files directly or use the converted form
 		self.use_direct_i18n = False
 		# i18n using Python's gettext module
@@ -365,8 +417,21 @@ def register():
 def unregister():
 	env.clear_previews()
 	env.json_data = None  # actively clearing out json data for next open
+	env.canonical_index = None
+	env.checklist_index = None
 
 	env.loaded_all_spawners = False
 	env.skin_list = []
 	env.rig_categories = []
 	env.material_sync_cache = []
+	env.texturepack_indexes = {}
+	env.modelpack_indexes = {}
+	env.pack_stacks = {}
+	env.pass_indexes = {}
+	env.alpha_cache = OrderedDict()
+	env.model_cache = {}
+	env.material_templates = {}
+	env.item_meshes = {}
+	env.model_meshes = {}
+	env.image_analysis_cache = None
+	env.meshswap_asset_cache = None
@@ -17,6 +17,9 @@
 # ##### END GPL LICENSE BLOCK #####
 
 import os
+import posixpath
+import time
+from array import array
 from typing import Dict, Optional, List, Any, Tuple, Union, cast
 from pathlib import Path
 from dataclasses import dataclass
@@ -28,6 +31,12 @@ from bpy.types import Context, Material, Image, Texture, Nodes, NodeLinks, Node
 from .. import util
 from ..conf import MCprepError, env, Form
 
+# Bundled with Blender, but kept optional with pure python fallbacks.
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
 AnimatedTex = Dict[str, int]
 
 # Error codes used during mat prep
@@ -60,77 +69,409 @@ def update_mcprep_texturepack_path(self, context: Context) -> None:
 def get_mc_canonical_name(name: str) -> Tuple[str, Optional[Form]]:
 	"""Convert a material name to standard MC name.
 
+	Lookups go through the precompiled util.CanonicalIndex, which is built
+	once per load of the json data and memoizes repeat names.
+
 	Returns:
 		canonical name, or fallback to generalized name (never returns None)
 		form (mc, jmc, or mineways)
 	"""
-	general_name = util.nameGeneralize(name)
 	if not env.json_data:
 		res = util.load_mcprep_json()
 		if not res:
-			return general_name, None
-
-	# Special case to allow material names, e.g. in meshswap, to end in .emit
-	# while still mapping to canonical names, to pick up features like animated
-	# textures. Cross check that name isn't exactly .emit to avoid None return.
-	if ".emit" in general_name and general_name != ".emit":
-		general_name = general_name.replace(".emit", "")
-
-	no_missing = "blocks" in env.json_data
-	no_missing &= "block_mapping_mc" in env.json_data["blocks"]
-	no_missing &= "block_mapping_jmc" in env.json_data["blocks"]
-	no_missing &= "block_mapping_mineways" in env.json_data["blocks"]
-
-	if no_missing is False:
-		env.log("Missing key values in json")
-		return general_name, None
-
-	# The below workaround is to account for the jmc2obj v113+ which changes
-	# how mappings and assignments work.
-	if general_name.startswith("minecraft_block-"):
-		# minecraft_block-name maps to textures/block/name.png,
-		# other options over block are: entity, models, etc.
-		jmc_prefix = True
-		general_name = name[len("minecraft_block-"):]
-	else:
-		jmc_prefix = False
-
-	# Patch naming to avoid issues.
-	if general_name == "water":
-		# Improves connection with older exports, without getting
-		# mixed up with the new "water": "painting/water" texture.
-		general_name = "water_still"
-
-	if general_name in env.json_data["blocks"]["block_mapping_mc"]:
-		canon = env.json_data["blocks"]["block_mapping_mc"][general_name]
-		form = "mc" if not jmc_prefix else "jmc2obj"
-	elif general_name in env.json_data["blocks"]["block_mapping_jmc"]:
-		canon = env.json_data["blocks"]["block_mapping_jmc"][general_name]
-		form = "jmc2obj"
-	elif general_name in env.json_data["blocks"]["block_mapping_mineways"]:
-		canon = env.json_data["blocks"]["block_mapping_mineways"][general_name]
-		form = "mineways"
-	elif general_name.lower() in env.json_data["blocks"]["block_mapping_jmc"]:
-		canon = env.json_data["blocks"]["block_mapping_jmc"][
-			general_name.lower()]
-		form = "jmc2obj"
-	elif general_name.lower() in env.json_data["blocks"]["block_mapping_mineways"]:
-		canon = env.json_data["blocks"]["block_mapping_mineways"][
-			general_name.lower()]
-		form = "mineways"
-	else:
-		env.log(f"Canonical name not matched: {general_name}", vv_only=True)
-		canon = general_name
-		form = None
+			return util.nameGeneralize(name), None
+
+	index = env.canonical_index
+	if index is None or index.source is not env.json_data:
+		# Json data was swapped out from under the index, e.g. by a reload
+		index = util.CanonicalIndex(env.json_data)
+		env.canonical_index = index
+	return index.lookup(name)
+
+
+class TexturePackIndex:
+	"""Catalog of all image files within a resource pack's textures folder.
+
+	The pack is walked once with os.scandir, and lookups are then resolved
+	against the in-memory catalog following the same priority order as the
+	per-call filesystem probing it replaces. The catalog is rebuilt when the
+	mtime of any walked directory changes, which happens whenever files are
+	added, removed or renamed within it, so lookups never touch the disk.
+
+	If the pack has no textures folder, only the files directly within it and
+	the SEARCH_FOLDERS are indexed, rather than walking the whole folder, so
+	lookups by subpath which miss the catalog fall back to probing the disk.
+	Keys are case-insensitive, as texture names in materials and models do
+	not always match the case of the files.
+	"""
+
+	EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+	# Candidate locations of the /textures folder, first match is used.
+	CHECK_DIRS = (
+		("textures",),
+		("minecraft", "textures"),
+		("assets", "minecraft", "textures"))
+
+	# Subfolders to wide-search, in order. Both singular and plural are listed
+	# as it has varied historically.
+	SEARCH_FOLDERS = (
+		"", "blocks", "block", "items", "item", "entity", "models", "model")
+
+	# Minimum seconds between checks of directory mtimes for staleness.
+	VALIDATE_INTERVAL = 1.0
+
+	def __init__(self, resource_folder: Path):
+		self.resource_folder = resource_folder
+		self.root: Path = resource_folder
+		self._files: Dict[str, str] = {}
+		self._dir_mtimes: Dict[str, Optional[float]] = {}
+		self._last_validated = 0.0
+		# Whether the whole root folder is indexed, else misses are probed
+		self._complete = False
+		# Incremented on each build, so that dependent lookups (see PackStack)
+		# know when to discard results derived from this catalog.
+		self.generation = 0
+		self.build()
+
+	@staticmethod
+	def _key(relpath: str) -> str:
+		return os.path.normcase(relpath).lower()
+
+	@staticmethod
+	def _mtime(path: str) -> Optional[float]:
+		try:
+			return os.stat(path).st_mtime
+		except OSError:
+			return None
+
+	def _watch_dirs(self) -> List[str]:
+		"""Folders outside of the scanned tree which affect its location."""
+		# The parents of the candidate textures folders, so that a newly added
+		# textures folder is picked up.
+		watch = []
+		for parts in self.CHECK_DIRS:
+			for i in range(len(parts)):
+				path = os.path.join(self.resource_folder, *parts[:i])
+				if path not in watch:
+					watch.append(path)
+		return watch
+
+	def _scan_roots(self) -> List[Tuple[str, str, bool]]:
+		"""Return (folder, relative path prefix, recursive) to scan."""
+		for parts in self.CHECK_DIRS:
+			path = Path(self.resource_folder, *parts)
+			if path.is_dir():
+				self.root = path
+				return [(str(self.root), "", True)]
+
+		# Not a recognized pack layout, avoid walking an arbitrary folder.
+		self.root = self.resource_folder
+		roots = [(str(self.root), "", False)]
+		for folder in self.SEARCH_FOLDERS[1:] + ("mineways_assets",):
+			roots.append((os.path.join(self.root, folder), folder, True))
+		return roots
+
+	def build(self) -> None:
+		"""Walk the pack and (re)populate the catalog."""
+		self._files.clear()
+		self._dir_mtimes.clear()
+		self.generation += 1
+
+		for path in self._watch_dirs():
+			self._dir_mtimes[path] = self._mtime(path)
+		visited = set()
+		roots = self._scan_roots()
+		self._complete = any(
+			recursive and path == str(self.root)
+			for path, _, recursive in roots)
+		for path, relpath, recursive in roots:
+			self._scan(path, relpath, visited, recursive)
+		self._last_validated = time.monotonic()
+		env.log(
+			f"Indexed {len(self._files)} files in {self.resource_folder}",
+			vv_only=True)
+
+	def _scan(self, path: str, relpath: str, visited: set, recursive: bool = True) -> None:
+		try:
+			stat = os.stat(path)
+		except OSError:
+			return
+		if (stat.st_dev, stat.st_ino) in visited:
+			return  # avoid symlink cycles
+		visited.add((stat.st_dev, stat.st_ino))
+		self._dir_mtimes[path] = stat.st_mtime
+
+		try:
+			entries = list(os.scandir(path))
+		except OSError as err:
+			env.log(f"Could not scan texture folder {path}: {err}")
+			return
+		for entry in entries:
+			try:
+				if entry.is_dir():
+					if not recursive:
+						continue
+					self._scan(
+						entry.path, posixpath.join(relpath, entry.name), visited)
+				elif os.path.splitext(entry.name)[1].lower() in self.EXTENSIONS:
+					key = self._key(posixpath.join(relpath, entry.name))
+					self._files.setdefault(key, entry.path)
+			except OSError:
+				continue
+
+	def is_stale(self) -> bool:
+		"""Check if any indexed directory changed since the last build."""
+		for path, mtime in self._dir_mtimes.items():
+			if self._mtime(path) != mtime:
+				return True
+		return False
+
+	def validate(self, force: bool = False) -> None:
+		"""Rebuild if stale, checking at most once per VALIDATE_INTERVAL."""
+		now = time.monotonic()
+		if not force and now - self._last_validated < self.VALIDATE_INTERVAL:
+			return
+		self._last_validated = now
+		if self.is_stale():
+			env.log(f"Texture pack changed, re-indexing {self.resource_folder}")
+			self.build()
+
+	def _get(self, relpath: str) -> Optional[str]:
+		"""Get the file for a relative path without extension, if any."""
+		for ext in self.EXTENSIONS:
+			res = self._files.get(self._key(relpath + ext))
+			if res is not None:
+				return res
+		return None
+
+	def _probe(self, relpath: str, extensions: Tuple[str, ...]) -> Optional[str]:
+		"""Check the disk for a file outside of an incomplete catalog."""
+		if self._complete:
+			return None
+		base = os.path.join(str(self.root), *relpath.split("/"))
+		for ext in extensions:
+			if os.path.isfile(base + ext):
+				return base + ext
+		return None
+
+	def get_exact(self, relpath: str) -> Optional[str]:
+		"""Get the file at an exact relative path (with extension), if any."""
+		res = self._files.get(self._key(relpath))
+		if res is None:
+			res = self._probe(relpath, ("",))
+		return res
+
+	def _resolve(self, blockname: str) -> Optional[str]:
+		# first see if subpath included is found, prioritize use of that
+		if "/" in blockname:
+			res = self._get(blockname)
+			if res is None:
+				res = self._probe(blockname, self.EXTENSIONS)
+			if res is not None:
+				return res
+			# case where goes into other subpaths
+			res = self._get(posixpath.basename(blockname))
+			if res is not None:
+				return res
+
+		# fallback (more common case), wide-search for
+		for folder in self.SEARCH_FOLDERS:
+			res = self._get(posixpath.join(folder, blockname))
+			if res is not None:
+				return res
+
+		# Mineways fallback
+		for suffix in ["-Alpha", "-RGB", "-RGBA"]:
+			if blockname.endswith(suffix):
+				return self._files.get(
+					self._key(f"mineways_assets/mineways{suffix}.png"))
+		return None
+
+	def find(self, blockname: str) -> Optional[Path]:
+		"""Return the path of the best matching texture, or None."""
+		self.validate()
+		res = self._resolve(blockname)
+		return Path(res) if res is not None else None
+
+
+class ModelPackIndex(TexturePackIndex):
+	"""Catalog of the json model files of a resource pack.
+
+	Keys are relative to the pack's assets folder, e.g.
+	minecraft/models/block/cube.json, across all namespaces.
+	"""
 
-	if canon is None or canon == '':
-		env.log(f"Error: Encountered None canon value with {general_name}")
-		canon = general_name
+	EXTENSIONS = (".json",)
+
+	def _namespace_dirs(self) -> List[str]:
+		assets = os.path.join(self.resource_folder, "assets")
+		try:
+			return [entry.path for entry in os.scandir(assets) if entry.is_dir()]
+		except OSError:
+			return []
+
+	def _watch_dirs(self) -> List[str]:
+		return [
+			str(self.resource_folder),
+			os.path.join(self.resource_folder, "assets")
+		] + self._namespace_dirs()
+
+	def _scan_roots(self) -> List[Tuple[str, str, bool]]:
+		self.root = Path(self.resource_folder, "assets")
+		roots = []
+		for namespace_dir in self._namespace_dirs():
+			models = os.path.join(namespace_dir, "models")
+			if os.path.isdir(models):
+				namespace = os.path.basename(namespace_dir)
+				roots.append((models, posixpath.join(namespace, "models"), True))
+		return roots
+
+	def find(self, relpath: str) -> Optional[Path]:
+		"""Return the model file at relpath within assets/, or None."""
+		self.validate()
+		res = self.get_exact(relpath)
+		return Path(res) if res is not None else None
+
+
+def get_texturepack_index(resource_folder: Path) -> TexturePackIndex:
+	"""Return the shared catalog for a resource pack, building if needed."""
+	key = str(resource_folder)
+	index = env.texturepack_indexes.get(key)
+	if index is None:
+		index = TexturePackIndex(resource_folder)
+		env.texturepack_indexes[key] = index
+	return index
+
+
+def get_modelpack_index(resource_folder: Path) -> ModelPackIndex:
+	"""Return the shared model catalog for a resource pack."""
+	key = str(resource_folder)
+	index = env.modelpack_indexes.get(key)
+	if index is None:
+		index = ModelPackIndex(resource_folder)
+		env.modelpack_indexes[key] = index
+	return index
+
+
+class PackStack:
+	"""Ordered layers of resource packs, resolved as one.
+
+	Packs earlier in the list take priority, e.g. an overrides pack, then a
+	PBR pack, then vanilla. Each pack keeps its own catalog, while resolved
+	lookups across the whole stack are merged into single tables which are
+	only discarded when one of the underlying catalogs is rebuilt.
+	"""
+
+	def __init__(self, folders: List[Path]):
+		self.folders = folders
+		self._textures: Dict[str, Optional[Path]] = {}
+		self._texture_paths: Dict[str, Optional[Path]] = {}
+		self._models: Dict[str, Optional[Path]] = {}
+		self._texture_gens: Tuple[int, ...] = ()
+		self._model_gens: Tuple[int, ...] = ()
+
+	def _texture_indexes(self) -> List[TexturePackIndex]:
+		indexes = [get_texturepack_index(folder) for folder in self.folders]
+		for index in indexes:
+			index.validate()
+		gens = tuple(index.generation for index in indexes)
+		if gens != self._texture_gens:
+			self._textures.clear()
+			self._texture_paths.clear()
+			self._texture_gens = gens
+		return indexes
+
+	def _model_indexes(self) -> List[ModelPackIndex]:
+		indexes = [get_modelpack_index(folder) for folder in self.folders]
+		for index in indexes:
+			index.validate()
+		gens = tuple(index.generation for index in indexes)
+		if gens != self._model_gens:
+			self._models.clear()
+			self._model_gens = gens
+		return indexes
+
+	@staticmethod
+	def _cached(table: Dict[str, Optional[Path]], key: str) -> Tuple[bool, Optional[Path]]:
+		"""Get a prior result, tables are cleared when a catalog is rebuilt."""
+		if key not in table:
+			return False, None
+		return True, table[key]
+
+	def find_texture(self, blockname: str) -> Optional[Path]:
+		"""Find a texture by (canonical) block name, same as per pack search."""
+		indexes = self._texture_indexes()
+		found, res = self._cached(self._textures, blockname)
+		if found:
+			return res
+		for index in indexes:
+			res = index.find(blockname)
+			if res is not None:
+				break
+		self._textures[blockname] = res
+		return res
+
+	def find_texture_path(self, relpath: str) -> Optional[Path]:
+		"""Find a texture by exact path relative to the textures folder."""
+		indexes = self._texture_indexes()
+		found, res = self._cached(self._texture_paths, relpath)
+		if found:
+			return res
+		for index in indexes:
+			hit = index.get_exact(relpath)
+			if hit is not None:
+				res = Path(hit)
+				break
+		self._texture_paths[relpath] = res
+		return res
+
+	def model_generation(self) -> Tuple[int, ...]:
+		"""Return the catalog generations of each layer's models.
+
+		Changes whenever any layer's model catalog is rebuilt, so results
+		resolved through find_model can be checked for being current.
+		"""
+		self._model_indexes()
+		return self._model_gens
+
+	def find_model(self, relpath: str) -> Optional[Path]:
+		"""Find a model by path relative to assets/, e.g. ns/models/x.json"""
+		indexes = self._model_indexes()
+		found, res = self._cached(self._models, relpath)
+		if found:
+			return res
+		for index in indexes:
+			res = index.find(relpath)
+			if res is not None:
+				break
+		self._models[relpath] = res
+		return res
+
+
+def get_pack_stack(folders: List[Union[Path, str]]) -> PackStack:
+	"""Return the shared stack for the given ordered resource pack folders.
+
+	Folders which don't exist or are repeated are skipped.
+	"""
+	stack_folders = []
+	for folder in folders:
+		if not folder:
+			continue
+		folder = Path(folder)
+		if folder in stack_folders or not folder.is_dir():
+			continue
+		stack_folders.append(folder)
 
-	return canon, form
+	key = tuple(str(folder) for folder in stack_folders)
+	stack = env.pack_stacks.get(key)
+	if stack is None:
+		stack = PackStack(stack_folders)
+		env.pack_stacks[key] = stack
+	return stack
 
 
-def find_from_texturepack(blockname: str, resource_folder: Optional[Path]=None) -> Union[Path, MCprepError]:
+def find_from_texturepack(blockname: str, resource_folder: Optional[Union[Path, List[Path]]]=None) -> Union[Path, MCprepError]:
 	"""Given a blockname (and resource folder), find image filepath.
 
 	Finds textures following any pack which should have this structure, and
@@ -138,6 +479,10 @@ def find_from_texturepack(blockname: str, resource_folder: Optional[Path]=None)
 	following sublevels above the <subfolder> level.
 	//pack_name/assets/minecraft/textures/<subfolder>/<blockname.png>
 
+	Lookups go through a TexturePackIndex, so the pack is only walked once
+	rather than probed per call. A list of resource folders may also be
+	given, in which case the first pack layer with a match is used.
+
 	Returns:
 		- Path if successful
 		- MCprepError if error occurs (may return with a message)
@@ -149,67 +494,19 @@ def find_from_texturepack(blockname: str, resource_folder: Optional[Path]=None)
 			bpy.path.abspath(bpy.context.scene.mcprep_texturepack_path)
 		))
 
-	if not resource_folder.exists() or not resource_folder.is_dir():
+	if isinstance(resource_folder, (list, tuple)):
+		res = get_pack_stack(resource_folder).find_texture(blockname)
+		if res is None:
+			line, file = env.current_line_and_file()
+			return MCprepError(FileNotFoundError(), line, file)
+		return res
+
+	if not resource_folder.is_dir():
 		env.log("Error, resource folder does not exist")
 		line, file = env.current_line_and_file()
 		return MCprepError(FileNotFoundError(), line, file, f"Resource pack folder at {resource_folder} does not exist!")
 
-	# Check multiple paths, picking the first match (order is important),
-	# goal of picking out the /textures folder.
-	check_dirs = [
-		Path(resource_folder, "textures"),
-		Path(resource_folder, "minecraft", "textures"),
-		Path(resource_folder, "assets", "minecraft", "textures")]
-	for path in check_dirs:
-		if path.exists():
-			resource_folder = path
-			break
-
-	search_paths = [
-		resource_folder,
-		# Both singular and plural shown below as it has varied historically.
-		Path(resource_folder, "blocks"),
-		Path(resource_folder, "block"),
-		Path(resource_folder, "items"),
-		Path(resource_folder, "item"),
-		Path(resource_folder, "entity"),
-		Path(resource_folder, "models"),
-		Path(resource_folder, "model"),
-	]
-	res = None
-
-	# first see if subpath included is found, prioritize use of that
-	extensions = [".png", ".jpg", ".jpeg"]
-	if "/" in blockname:
-		newpath = blockname.replace("/", os.path.sep)
-		for ext in extensions:
-			if Path(resource_folder, newpath + ext).exists():
-				res = Path(resource_folder, newpath + ext)
-				return res
-		newpath = os.path.basename(blockname)  # case where goes into other subpaths
-		for ext in extensions:
-			if Path(resource_folder, newpath + ext).exists():
-				res = Path(resource_folder, newpath + ext)
-				return res
-
-	# fallback (more common case), wide-search for
-	for path in search_paths:
-		if not path.is_dir():
-			continue
-		for ext in extensions:
-			check_path = Path(path, blockname + ext)
-			if check_path.exists() and check_path.is_file():
-				res = Path(path, blockname + ext)
-				return res
-
-	# Mineways fallback
-	for suffix in ["-Alpha", "-RGB", "-RGBA"]:
-		if blockname.endswith(suffix):
-			res = Path(
-				resource_folder, "mineways_assets", f"mineways{suffix}.png")
-			if res.exists() and res.is_file():
-				return res
-
+	res = get_pack_stack([resource_folder]).find_texture(blockname)
 	if res is None:
 		line, file = env.current_line_and_file()
 		return MCprepError(FileNotFoundError(), line, file)
@@ -262,24 +559,24 @@ def detect_form(materials: List[Material]) -> Optional[Form]:
 
 
 def checklist(matName: str, listName: str) -> bool:
-	"""Helper to expand single wildcard within generalized material names"""
+	"""Helper to expand single wildcard within generalized material names
+
+	Matching runs against the precompiled util.ChecklistIndex, memoized per
+	name and list.
+	"""
 	if not env.json_data:
 		env.log("No json_data for checklist to call from!")
-	if "blocks" not in env.json_data or listName not in env.json_data["blocks"]:
+		return False
+	index = env.checklist_index
+	if index is None or index.source is not env.json_data:
+		# Json data was swapped out from under the index, e.g. by a reload
+		index = util.ChecklistIndex(env.json_data)
+		env.checklist_index = index
+	if not index.has_list(listName):
 		env.log(
 			f"env.json_data is missing blocks or listName {listName}")
 		return False
-	if matName in env.json_data["blocks"][listName]:
-		return True
-	for name in env.json_data["blocks"][listName]:
-		if '*' not in name:
-			continue
-		x = name.split('*')
-		if x[0] != '' and x[0] in matName:
-			return True
-		elif x[1] != '' and x[1] in matName:
-			return True
-	return False
+	return index.check(matName, listName)
 
 
 # Dataclass representing all options
@@ -328,6 +625,178 @@ class PrepOptions:
 	use_emission: bool
 
 
+def check_diffuse_image(mat: Material, image_diff: Optional[Image]) -> Optional[int]:
+	"""Returns the error code if a diffuse image can't be used to generate."""
+	if not image_diff:
+		print(f"Could not find diffuse image, halting generation: {mat.name}")
+		return NO_DIFFUSE_NODE
+	elif image_diff.size[0] == 0 or image_diff.size[1] == 0:
+		if image_diff.source != 'SEQUENCE':
+			# Common non animated case; this means the image is missing and would
+			# have already checked for replacement textures by now, so skip
+			return IMG_MISSING
+		if not os.path.isfile(bpy.path.abspath(image_diff.filepath)):
+			# can't check size or pixels as it often is not immediately avaialble
+			# so instead, check against first frame of sequence to verify load
+			return IMG_MISSING
+	return None
+
+
+def apply_desaturation(node: Node, canon: str, image_diff: Image) -> None:
+	"""Tint the saturate mix node if the texture is a desaturated block."""
+	saturate_in = get_node_socket(node)
+	if checklist(canon, "desaturated") and is_image_grayscale(image_diff):
+		env.log(f"Texture desaturated: {canon}", vv_only=True)
+		desat_color = env.json_data['blocks']['desaturated'][canon]
+		if len(desat_color) < len(node.inputs[saturate_in[2]].default_value):
+			desat_color.append(1.0)
+		node.inputs[saturate_in[2]].default_value = desat_color
+		node.mute = False
+		node.hide = False
+	else:
+		node.mute = True
+		node.hide = True
+
+
+def update_emission_option(mat: Material, options: PrepOptions) -> None:
+	"""Set whether the material emits, from its canonical name or its name."""
+	canon, _ = get_mc_canonical_name(util.nameGeneralize(mat.name))
+	options.use_emission = checklist(canon, "emit") or "emit" in mat.name.lower()
+
+
+def get_template_key(mat: Material, options: PrepOptions) -> str:
+	"""Returns a key of every option which shapes a generated node graph.
+
+	Materials generated with the same key have the same nodes and links, and
+	only differ by their images and desaturation color.
+	"""
+	canon, _ = get_mc_canonical_name(util.nameGeneralize(mat.name))
+	if options.pack_format == PackFormat.SIMPLE:
+		generator = "simple"
+	elif options.use_principled:
+		generator = "principled"
+	else:
+		generator = "original"
+	key = (
+		generator,
+		options.pack_format.name,
+		options.use_reflections,
+		options.only_solid is True or checklist(canon, "solid"),
+		options.use_emission_nodes,
+		options.use_emission,
+		checklist(canon, "reflective"),
+		checklist(canon, "metallic"),
+		bool(options.passes.get("specular")),
+		bool(options.passes.get("normal")))
+	return ",".join(str(itm) for itm in key)
+
+
+def get_material_template(key: str) -> Optional[Material]:
+	"""Returns the prepped template material of a template key, if any.
+
+	Templates are looked up by name in env.material_templates, and only used
+	if still stamped with the same key.
+	"""
+	name = env.material_templates.get(key)
+	if name is None or name not in bpy.data.materials:
+		return None
+	template = bpy.data.materials[name]
+	if template.library or template.get("MCPREP_TEMPLATE") != key:
+		env.material_templates.pop(key, None)
+		return None
+	return template
+
+
+def set_material_template(key: str, mat: Material) -> None:
+	"""Keep a copy of a freshly generated material as the template of key.
+
+	The copy isn't used by anything, so isn't saved with the blend file, and
+	its images are cleared so it doesn't keep them loaded.
+	"""
+	template = mat.copy()
+	template.name = f".MCprep template {len(env.material_templates)}"
+	template["MCPREP_TEMPLATE"] = key
+	for pass_name in ("diffuse", "specular", "normal"):
+		node = get_node_for_pass(template, pass_name)
+		if node is not None:
+			node.image = None
+	env.material_templates[key] = template.name
+
+
+def patch_generated_material(mat: Material, options: PrepOptions) -> Optional[int]:
+	"""Set the images of a material copied from a template, see get_template_key.
+
+	Only the images and desaturation vary between materials of a template, so
+	these are all which need updating.
+
+	Returns:
+		None if the graph can't be patched, otherwise same as matprep_cycles
+	"""
+	node_diff = get_node_for_pass(mat, "diffuse")
+	sat_node = None
+	for node in mat.node_tree.nodes:
+		if "SATURATE" in node:
+			sat_node = node
+			break
+	if not node_diff or not sat_node:
+		return None
+
+	if options.pack_format != PackFormat.SIMPLE:
+		for pass_name in ("specular", "normal"):
+			image = options.passes.get(pass_name)
+			if not image:
+				continue  # Already muted, as part of the template key
+			node = get_node_for_pass(mat, pass_name)
+			if node is None or node == node_diff:
+				return None
+			node.image = image
+			res = util.apply_noncolor_data(node)
+			if res is not None:
+				env.log(f"TypeError on {res.line} in {res.file}: {res.err_type}")
+	image_diff = options.passes["diffuse"]
+	node_diff.image = image_diff
+
+	canon, _ = get_mc_canonical_name(util.nameGeneralize(mat.name))
+	apply_desaturation(sat_node, canon, image_diff)
+	return 0
+
+
+def prep_material_from_template(mat: Material, options: PrepOptions) -> Tuple[Material, Optional[int]]:
+	"""Prep a material as a copy of a template with the same node graph.
+
+	Copying the template's whole node tree in one call is much faster than
+	generating it again node by node, see copy_prepped_material. Materials
+	without a template yet are generated by matprep_cycles, and a copy kept
+	as the template for the next ones.
+
+	Returns:
+		The prepped material, which replaces mat if copied from a template
+		int: same as matprep_cycles
+	"""
+	mat.use_nodes = True
+	update_emission_option(mat, options)
+	image_diff = options.passes.get("diffuse")
+	err = check_diffuse_image(mat, image_diff)
+	if err is not None:
+		return mat, err
+
+	key = get_template_key(mat, options)
+	template = None
+	if image_diff.source != 'SEQUENCE':  # Image users are set per material
+		template = get_material_template(key)
+	if template is not None:
+		new_mat = copy_prepped_material(template, mat)
+		res = patch_generated_material(new_mat, options)
+		if res is not None:
+			return new_mat, res
+		mat = new_mat  # Generate again below, as a fallback
+
+	res = matprep_cycles(mat, options)
+	if res == 0 and image_diff.source != 'SEQUENCE':
+		set_material_template(key, mat)
+	return mat, res
+
+
 def matprep_cycles(mat: Material, options: PrepOptions) -> Optional[bool]:
 	"""Determine how to prep or generate the cycles materials.
 
@@ -340,10 +809,7 @@ def matprep_cycles(mat: Material, options: PrepOptions) -> Optional[bool]:
 	"""
 	# ensure nodes are enabled
 	mat.use_nodes = True
-
-	matGen = util.nameGeneralize(mat.name)
-	canon, _ = get_mc_canonical_name(matGen)
-	options.use_emission = checklist(canon, "emit") or "emit" in mat.name.lower()
+	update_emission_option(mat, options)
 
 	# TODO: Update different options for water before enabling this
 	# if use_reflections and checklist(canon, "water"):
@@ -356,9 +822,86 @@ def matprep_cycles(mat: Material, options: PrepOptions) -> Optional[bool]:
 		res = matgen_cycles_principled(mat, options)
 	else:
 		res = matgen_cycles_original(mat, options)
+	if res == 0:
+		mat["MCPREP_TEMPLATE"] = get_template_key(mat, options)
 	return res
 
 
+def group_materials_for_prep(materials: List[Material]) -> List[Tuple[Dict[str, Image], List[Material]]]:
+	"""Group materials which would prep identically, to only prep each once.
+
+	Materials are grouped by their generalized name and the images of all
+	their passes, so duplicates such as stone.001 and stone.002 land together
+	unless e.g. one already has a different normal map. Each group is
+	returned with the passes of its first material, in original order.
+	"""
+	groups: Dict[Tuple, Tuple[Dict[str, Image], List[Material]]] = {}
+	for mat in materials:
+		passes = get_textures(mat)
+		key = (util.nameGeneralize(mat.name),) + tuple(
+			(pass_name, image.name_full if image else None)
+			for pass_name, image in sorted(passes.items()))
+		if key in groups:
+			groups[key][1].append(mat)
+		else:
+			groups[key] = (passes, [mat])
+	return list(groups.values())
+
+
+# Material settings written by prep itself, so kept from the prepped source
+# when copying it, see copy_prepped_material. All others come from the target.
+PREP_MATERIAL_SETTINGS = (
+	"name", "use_nodes", "blend_method", "shadow_method",
+	"surface_render_method")
+PREP_MATERIAL_PROPS = ("MCPREP_TEMPLATE", "texture_swapped")
+
+
+def copy_rna_settings(source: Any, target: Any, skip: Tuple[str, ...] = ()) -> None:
+	"""Copy the writable, non pointer settings of one rna struct to another."""
+	for prop in source.bl_rna.properties:
+		if prop.identifier in skip or prop.identifier == "rna_type":
+			continue
+		if prop.is_readonly or prop.type in ('POINTER', 'COLLECTION'):
+			continue
+		try:
+			setattr(target, prop.identifier, getattr(source, prop.identifier))
+		except (AttributeError, TypeError, ValueError):
+			pass  # e.g. not settable in this context or blender version
+
+
+def copy_prepped_material(source: Material, target: Material) -> Material:
+	"""Replace target with a copy of an already prepped material.
+
+	Copying a material duplicates its whole node tree in one call, which is
+	much faster than generating it again node by node. All users of target
+	are remapped to the copy, which keeps the name, custom props and settings
+	(e.g. backface culling, viewport display) of target, except those which
+	prep itself sets.
+
+	Returns:
+		The new material, as target is removed.
+	"""
+	new_mat = source.copy()
+	for key in list(new_mat.keys()):
+		del new_mat[key]
+	for key in target.keys():
+		new_mat[key] = target[key]
+	for key in PREP_MATERIAL_PROPS:
+		if key in source:
+			new_mat[key] = source[key]
+
+	copy_rna_settings(target, new_mat, PREP_MATERIAL_SETTINGS)
+	for struct in ("cycles", "line_art"):
+		if hasattr(target, struct):
+			copy_rna_settings(getattr(target, struct), getattr(new_mat, struct))
+
+	name = target.name
+	target.user_remap(new_mat)
+	bpy.data.materials.remove(target)
+	new_mat.name = name
+	return new_mat
+
+
 def set_texture_pack(
 	material: Material, folder: Path, use_extra_passes: bool) -> bool:
 	"""Replace existing material's image with texture pack's.
@@ -586,6 +1129,77 @@ def get_textures(material: Material) -> Dict[str, Image]:
 	return passes
 
 
+class PassIndex:
+	"""Catalog of the extra pass images within one folder.
+
+	Maps the lowercase base name of a diffuse image to the paths of its
+	normal, specular, and displace passes. Built with a single scan of the
+	folder, and scanned again whenever the folder's mtime changes.
+	"""
+
+	# valid extentsions and ending names for pass types
+	EXTENSIONS = (".png", ".jpg", ".jpeg", ".tiff")
+	PASS_SUFFIXES = {
+		"normal": (" n", "_n", "-n", " normal", "_norm", "_nrm", " normals"),
+		"specular": (" s", "_s", "-s", " specular", "_spec"),
+		"displace": (
+			" d", "_d", "-d", " displace", "_disp", " bump", " b", "_b", "-b")
+	}
+
+	def __init__(self, folder: str):
+		self.folder = folder
+		self.mtime: Optional[float] = None
+		self._passes: Dict[str, Dict[str, str]] = {}
+
+	def validate(self) -> None:
+		"""Rescan the folder if it changed since the last scan."""
+		try:
+			mtime = os.stat(self.folder).st_mtime
+		except OSError:
+			mtime = None
+		if mtime != self.mtime:
+			self._scan()
+			self.mtime = mtime
+
+	def _scan(self) -> None:
+		self._passes = {}
+		try:
+			entries = list(os.scandir(self.folder))
+		except OSError:
+			return
+		for entry in entries:
+			stem, ext = os.path.splitext(entry.name)
+			if ext.lower() not in self.EXTENSIONS:
+				continue
+			try:
+				if not entry.is_file():
+					continue
+			except OSError:
+				continue
+			stem = stem.lower()
+			for pass_name, suffixes in self.PASS_SUFFIXES.items():
+				for suffix in suffixes:
+					if not stem.endswith(suffix):
+						continue
+					# Later files in the listing win, as before indexing
+					base = stem[:-len(suffix)]
+					self._passes.setdefault(base, {})[pass_name] = entry.path
+
+	def get(self, base_name: str) -> Dict[str, str]:
+		"""Returns the pass paths found for an image's base name."""
+		return dict(self._passes.get(base_name.lower(), {}))
+
+
+def get_pass_index(folder: str) -> PassIndex:
+	"""Returns the shared, up to date pass index for this folder."""
+	index = env.pass_indexes.get(folder)
+	if index is None:
+		index = PassIndex(folder)
+		env.pass_indexes[folder] = index
+	index.validate()
+	return index
+
+
 def find_additional_passes(image_file: Path) -> Dict[str, Image]:
 	"""Find relevant passes like normal and spec in same folder as image."""
 	print("What is this?", image_file)
@@ -598,37 +1212,8 @@ def find_additional_passes(image_file: Path) -> Dict[str, Image]:
 	img_base = os.path.basename(abs_img_file)
 	base_name = os.path.splitext(img_base)[0]  # remove extension
 
-	# valid extentsions and ending names for pass types
-	exts = [".png", ".jpg", ".jpeg", ".tiff"]
-	normal = [" n", "_n", "-n", " normal", "_norm", "_nrm", " normals"]
-	spec = [" s", "_s", "-s", " specular", "_spec"]
-	disp = [" d", "_d", "-d", " displace", "_disp", " bump", " b", "_b", "-b"]
 	res = {"diffuse": image_file}
-
-	# find lowercase base name matching with valid extentions
-	filtered_files = []
-	for f in os.listdir(img_dir):
-		if not f.lower().startswith(base_name.lower()):
-			continue
-		if not os.path.isfile(os.path.join(img_dir, f)):
-			continue
-		if os.path.splitext(f)[-1].lower() not in exts:
-			continue
-		filtered_files.append(f)
-
-	# now do narrow matching based on each extention name type
-	for filtered in filtered_files:
-		this_base = os.path.splitext(filtered)[0]
-		for npass in normal:
-			if this_base.lower() == (base_name + npass).lower():
-				res["normal"] = os.path.join(img_dir, filtered)
-		for spass in spec:
-			if this_base.lower() == (base_name + spass).lower():
-				res["specular"] = os.path.join(img_dir, filtered)
-		for dpass in disp:
-			if this_base.lower() == (base_name + dpass).lower():
-				res["displace"] = os.path.join(img_dir, filtered)
-
+	res.update(get_pass_index(img_dir).get(base_name))
 	return res
 
 
@@ -678,6 +1263,87 @@ def replace_missing_texture(image: Image) -> bool:
 	return True  # updated image block
 
 
+class ImageAnalysisCache(util.FileRecordCache):
+	"""Persistent store of per-file image analysis results.
+
+	Each record may hold any of the FIELDS, left out when not yet analyzed,
+	see util.FileRecordCache for how records are stored.
+	"""
+
+	# alpha_coverage is the share of pixels which are not fully opaque
+	FIELDS = ("grayscale", "alpha_coverage", "tiles", "width", "height")
+
+	def update(self, filepath: str, **values: Any) -> None:
+		"""Merge analysis values into this file's record and persist it."""
+		record = self.get(filepath) or {}
+		changed = {k: v for k, v in values.items()
+			if k in self.FIELDS and record.get(k) != v}
+		if not changed:
+			return
+		self.put(filepath, dict(record, **changed))
+
+
+def get_image_analysis_cache() -> ImageAnalysisCache:
+	"""Returns the shared image analysis cache, loading it on first use."""
+	if env.image_analysis_cache is None:
+		env.image_analysis_cache = ImageAnalysisCache(env.image_cache_path)
+	return env.image_analysis_cache
+
+
+def get_image_filepath(image: Image) -> Optional[str]:
+	"""Returns the absolute path of the file backing this image, if any.
+
+	Packed, generated, and sequence images are not backed by a single file,
+	so these have no path to cache analysis results against.
+	"""
+	if not image or image.source != 'FILE' or image.packed_file:
+		return None
+	path = bpy.path.abspath(image.filepath, library=image.library)
+	if not path or not os.path.isfile(path):
+		return None
+	return os.path.normpath(path)
+
+
+def get_image_analysis(image: Image) -> Optional[Dict[str, Any]]:
+	"""Returns the cached analysis record for an image, without reading it."""
+	path = get_image_filepath(image)
+	if not path:
+		return None
+	return get_image_analysis_cache().get(path)
+
+
+def set_image_analysis(image: Image, **values: Any) -> None:
+	"""Record analysis values for an image's file, see ImageAnalysisCache."""
+	path = get_image_filepath(image)
+	if not path:
+		return
+	get_image_analysis_cache().update(path, **values)
+
+
+def get_image_tiles(width: int, height: int) -> int:
+	"""Returns the number of square tiles stacked vertically in an image.
+
+	Returns 0 if the height is not a whole multiple of the width.
+	"""
+	if not width or height % width:
+		return 0
+	return height // width
+
+
+def get_image_pixels(image: Image) -> Union["np.ndarray", array]:
+	"""Read all pixel values of an image in one call, as a flat float buffer.
+
+	Uses a numpy array if available, otherwise a python float array.
+	"""
+	count = image.size[0] * image.size[1] * image.channels
+	if np is not None:
+		buf = np.empty(count, dtype=np.float32)
+	else:
+		buf = array('f', bytes(4 * count))
+	image.pixels.foreach_get(buf)
+	return buf
+
+
 def is_image_grayscale(image: Image) -> bool:
 	"""Returns true if image data is all grayscale, false otherwise"""
 
@@ -696,62 +1362,84 @@ def is_image_grayscale(image: Image) -> bool:
 	if 'grayscale' in image:  # cache
 		env.log(f"\tGrayscale cached {image['grayscale']}", vv_only=True)
 		return image['grayscale']
-	if not image.pixels:
+	record = get_image_analysis(image)
+	if record and record.get("grayscale") is not None:
+		env.log(f"\tGrayscale cached on disk {record['grayscale']}", vv_only=True)
+		image['grayscale'] = record["grayscale"]
+		return record["grayscale"]
+	channels = image.channels
+	width, height = image.size[0], image.size[1]
+	if not width or not height or not channels:
 		env.log("Not an image / no pixels", vv_only=True)
 		return None
+	if channels < 3:
+		is_grayscale = True  # No color channels to be saturated.
+		image['grayscale'] = is_grayscale  # set cache
+		set_image_analysis(
+			image, grayscale=is_grayscale, alpha_coverage=0.0,
+			width=width, height=height, tiles=get_image_tiles(width, height))
+		return is_grayscale
 
-	# setup sampling to limit number of processed pixels
-	max_samples = 1024  # A 32 by 32 image. May be higher with rounding.
-	pxl_count = len(image.pixels) / image.channels
-	aspect = image.size[0] / image.size[1]
-	datablock_copied = False
-
-	if pxl_count > max_samples:
-		imgcp = image.copy()  # Duplicate the datablock
-
-		# Find new pixel sizes keeping aspect ratio, equation of:
-		# 1024 = nwith * nheight
-		# 1024 = (nheight * aspect) * nheight
-		# nheight = sqrtoot(1024 / aspect)
-		nheight = (1024 / aspect)**0.5
-		imgcp.scale(int(nheight * aspect), int(nheight))
-		pxl_count = imgcp.size[0] * imgcp.size[1]
-		datablock_copied = True
-	else:
-		imgcp = image
+	pixels = get_image_pixels(image)
 
-	# Pixel by pixel saturation checks, with some wiggle room thresholds
+	# Pixel saturation checks, with some wiggle room thresholds
 	thresh = 0.1  # treat saturated if any more than 10%
 
-	# max pixels above thresh to return as saturated,
+	# max share of pixels above thresh to return as saturated,
 	# 15% is chosen as ~double the % of "yellow" pixels in vanilla jungle leaves
-	max_thresh = 0.15 * pxl_count
-
-	# running count to check against
-	pixels_saturated = 0
-
-	is_grayscale = True  # True until proven false.
-
-	# check all pixels until exceeded threshold.
-	for ind in range(int(pxl_count))[::]:
-		ind = ind * imgcp.channels  # could be rgb or rgba
-		if imgcp.channels > 3 and imgcp.pixels[ind + 3] == 0:
-			continue  # skip alpha pixels during check
-		this_saturated = rgb_to_saturation(
-			imgcp.pixels[ind],
-			imgcp.pixels[ind + 1],
-			imgcp.pixels[ind + 2])
-		if this_saturated > thresh:
-			pixels_saturated += 1
-		if pixels_saturated >= max_thresh:
-			is_grayscale = False
-			env.log("Image not grayscale: {image.name}", vv_only=True)
-			break
+	max_thresh_ratio = 0.15
+
+	if np is not None:
+		pixels = pixels.reshape(-1, channels)
+		rgb = pixels[:, :3]
+		mx = rgb.max(axis=1)
+		mn = rgb.min(axis=1)
+		saturation = np.divide(
+			mx - mn, mx, out=np.zeros_like(mx), where=mx != 0)
+		saturated = saturation > thresh
+		if channels > 3:
+			saturated &= pixels[:, 3] != 0  # skip alpha pixels during check
+		pixels_saturated = int(np.count_nonzero(saturated))
+		is_grayscale = pixels_saturated < max_thresh_ratio * len(pixels)
+		if channels > 3:
+			alpha_coverage = np.count_nonzero(pixels[:, 3] < 1.0) / len(pixels)
+		else:
+			alpha_coverage = 0.0
+	else:
+		# Without numpy, only sample a spread of up to ~1024 pixels, which is
+		# what a 32 by 32 image would have.
+		pxl_count = len(pixels) // channels
+		step = max(1, pxl_count // 1024)
+		sampled = range(0, pxl_count, step)
+		max_thresh = max_thresh_ratio * len(sampled)
+
+		pixels_saturated = 0
+		is_grayscale = True  # True until proven false.
+		for ind in sampled:
+			ind = ind * channels
+			if channels > 3 and pixels[ind + 3] == 0:
+				continue  # skip alpha pixels during check
+			this_saturated = rgb_to_saturation(
+				pixels[ind], pixels[ind + 1], pixels[ind + 2])
+			if this_saturated > thresh:
+				pixels_saturated += 1
+			if pixels_saturated >= max_thresh:
+				is_grayscale = False
+				break
+
+		if channels > 3:
+			transparent = sum(1 for a in pixels[3::channels] if a < 1.0)
+			alpha_coverage = transparent / pxl_count
+		else:
+			alpha_coverage = 0.0
 
-	if datablock_copied:  # Cleanup if image was copied to scale down size.
-		bpy.data.images.remove(imgcp)
+	if not is_grayscale:
+		env.log(f"Image not grayscale: {image.name}", vv_only=True)
 
 	image['grayscale'] = is_grayscale  # set cache
+	set_image_analysis(
+		image, grayscale=is_grayscale, alpha_coverage=float(alpha_coverage),
+		width=width, height=height, tiles=get_image_tiles(width, height))
 	env.log(f"Image grayscale: {image.name}: {is_grayscale}", vv_only=True)
 	return is_grayscale
 
@@ -1016,18 +1704,7 @@ def texgen_specular(mat: Material, passes: Dict[str, Image], nodeInputs: List, u
 		env.log(f"TypeError on {res.line} in {res.file}: {res.err_type}")
 
 	# Graystyle Blending
-	if not checklist(canon, "desaturated"):
-		pass
-	elif not is_image_grayscale(image_diff):
-		pass
-	else:
-		env.log(f"Texture desaturated: {canon}", vv_only=True)
-		desat_color = env.json_data['blocks']['desaturated'][canon]
-		if len(desat_color) < len(nodeSaturateMix.inputs[saturateMixIn[2]].default_value):
-			desat_color.append(1.0)
-		nodeSaturateMix.inputs[saturateMixIn[2]].default_value = desat_color
-		nodeSaturateMix.mute = False
-		nodeSaturateMix.hide = False
+	apply_desaturation(nodeSaturateMix, canon, image_diff)
 
 	# annotate special nodes for finding later, and load images if available
 	nodeTexDiff["MCPREP_diffuse"] = True
@@ -1162,19 +1839,7 @@ def texgen_seus(mat: Material, passes: Dict[str, Image], nodeInputs: List, use_r
 		env.log(f"TypeError on {res.line} in {res.file}: {res.err_type}")
 
 	# Graystyle Blending
-	if not checklist(canon, "desaturated"):
-		pass
-	elif not is_image_grayscale(image_diff):
-		pass
-	else:
-		env.log(f"Texture desaturated: {canon}", vv_only=True)
-		desat_color = env.json_data['blocks']['desaturated'][canon]
-		desat_cmpr = len(nodeSaturateMix.inputs[saturateMixIn[2]].default_value)
-		if len(desat_color) < desat_cmpr:
-			desat_color.append(1.0)
-		nodeSaturateMix.inputs[saturateMixIn[2]].default_value = desat_color
-		nodeSaturateMix.mute = False
-		nodeSaturateMix.hide = False
+	apply_desaturation(nodeSaturateMix, canon, image_diff)
 
 	# annotate special nodes for finding later, and load images if available
 	nodeTexDiff["MCPREP_diffuse"] = True
@@ -1246,19 +1911,9 @@ def matgen_cycles_simple(mat: Material, options: PrepOptions) -> Optional[bool]:
 	canon, form = get_mc_canonical_name(matGen)
 
 	image_diff = options.passes["diffuse"]
-
-	if not image_diff:
-		print(f"Could not find diffuse image, halting generation: {mat.name}")
-		return NO_DIFFUSE_NODE
-	elif image_diff.size[0] == 0 or image_diff.size[1] == 0:
-		if image_diff.source != 'SEQUENCE':
-			# Common non animated case; this means the image is missing and would
-			# have already checked for replacement textures by now, so skip.
-			return IMG_MISSING
-		if not os.path.isfile(bpy.path.abspath(image_diff.filepath)):
-			# can't check size or pixels as it often is not immediately avaialble
-			# so instead, check against firs frame of sequence to verify load
-			return IMG_MISSING
+	err = check_diffuse_image(mat, image_diff)
+	if err is not None:
+		return err
 
 	mat.use_nodes = True
 	animated_data = copy_texture_animation_pass_settings(mat)
@@ -1339,18 +1994,7 @@ def matgen_cycles_simple(mat: Material, options: PrepOptions) -> Optional[bool]:
 	apply_texture_animation_pass_settings(mat, animated_data)
 
 	# Graystyle Blending
-	if not checklist(canon, "desaturated"):
-		pass
-	elif not is_image_grayscale(image_diff):
-		pass
-	else:
-		env.log(f"Texture desaturated: {canon}", vv_only=True)
-		desat_color = env.json_data['blocks']['desaturated'][canon]
-		if len(desat_color) < len(nodeSaturateMix.inputs[saturateMixIn[2]].default_value):
-			desat_color.append(1.0)
-		nodeSaturateMix.inputs[saturateMixIn[2]].default_value = desat_color
-		nodeSaturateMix.mute = False
-		nodeSaturateMix.hide = False
+	apply_desaturation(nodeSaturateMix, canon, image_diff)
 
 	# annotate special nodes for finding later, and load images if available
 	nodeTexDiff["MCPREP_diffuse"] = True
@@ -1366,19 +2010,9 @@ def matgen_cycles_principled(mat: Material, options: PrepOptions) -> Optional[bo
 	canon, form = get_mc_canonical_name(matGen)
 
 	image_diff = options.passes["diffuse"]
-
-	if not image_diff:
-		print(f"Could not find diffuse image, halting generation: {mat.name}")
-		return NO_DIFFUSE_NODE
-	elif image_diff.size[0] == 0 or image_diff.size[1] == 0:
-		if image_diff.source != 'SEQUENCE':
-			# Common non animated case; this means the image is missing and would
-			# have already checked for replacement textures by now, so skip
-			return IMG_MISSING
-		if not os.path.isfile(bpy.path.abspath(image_diff.filepath)):
-			# can't check size or pixels as it often is not immediately avaialble
-			# so instead, check against first frame of sequence to verify load
-			return IMG_MISSING
+	err = check_diffuse_image(mat, image_diff)
+	if err is not None:
+		return err
 
 	mat.use_nodes = True
 	animated_data = copy_texture_animation_pass_settings(mat)
@@ -1521,19 +2155,9 @@ def matgen_cycles_original(mat: Material, options: PrepOptions):
 	canon, form = get_mc_canonical_name(matGen)
 
 	image_diff = options.passes["diffuse"]
-
-	if not image_diff:
-		print(f"Could not find diffuse image, halting generation: {mat.name}")
-		return NO_DIFFUSE_NODE
-	elif image_diff.size[0] == 0 or image_diff.size[1] == 0:
-		if image_diff.source != 'SEQUENCE':
-			# Common non animated case; this means the image is missing and would
-			# have already checked for replacement textures by now, so skip
-			return IMG_MISSING
-		if not os.path.isfile(bpy.path.abspath(image_diff.filepath)):
-			# can't check size or pixels as it often is not immediately avaialble
-			# so instea, check against firs frame of sequence to verify load
-			return IMG_MISSING
+	err = check_diffuse_image(mat, image_diff)
+	if err is not None:
+		return err
 
 	mat.use_nodes = True
 	animated_data = copy_texture_animation_pass_settings(mat)
@@ -1814,7 +2438,6 @@ def matgen_special_water(mat: Material, passes: Dict[str, Image]) -> Optional[bo
 		nodes, 'ShaderNodeOutputMaterial', location=(920, 140))
 
 	# Mix RGB sockets for 3.4
-	saturateMixIn = get_node_socket(nodeSaturateMix)
 	saturateMixOut = get_node_socket(nodeSaturateMix, is_input=False)
 
 	# Sets default values
@@ -1878,18 +2501,7 @@ def matgen_special_water(mat: Material, passes: Dict[str, Image]) -> Optional[bo
 	apply_texture_animation_pass_settings(mat, animated_data)
 
 	# Graystyle Blending
-	if not checklist(canon, "desaturated"):
-		pass
-	elif not is_image_grayscale(image_diff):
-		pass
-	else:
-		env.log(f"Texture desaturated: {canon}", vv_only=True)
-		desat_color = env.json_data['blocks']['desaturated'][canon]
-		if len(desat_color) < len(nodeSaturateMix.inputs[saturateMixIn[2]].default_value):
-			desat_color.append(1.0)
-		nodeSaturateMix.inputs[saturateMixIn[2]].default_value = desat_color
-		nodeSaturateMix.mute = False
-		nodeSaturateMix.hide = False
+	apply_desaturation(nodeSaturateMix, canon, image_diff)
 
 	# annotate special nodes for finding later, and load images if available
 	nodeTexDiff["MCPREP_diffuse"] = True
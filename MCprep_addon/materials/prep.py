@@ -19,10 +19,11 @@
 
 import os
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 
 import bpy
 from bpy_extras.io_utils import ImportHelper
-from bpy.types import Context
+from bpy.types import Context, Image, Material
 
 from . import generate
 from . import sequences
@@ -178,6 +179,67 @@ class MCPREP_OT_prep_materials(bpy.types.Operator, McprepMaterialProps):
 	def draw(self, context):
 		draw_mats_common(self, context)
 
+	def load_passes(self, passes: Dict[str, Image]) -> bool:
+		"""Load or clear the extra passes for a group of materials.
+
+		Returns True if any pass was replaced by a found missing texture.
+		"""
+		swapped = False
+		if not self.useExtraMaps or self.packFormat == "simple":
+			# Clear out extra passes if not needed/requested
+			for pass_name in passes:
+				if pass_name != "diffuse":
+					passes[pass_name] = None
+		elif passes.get("diffuse"):
+			# Otherwise, attempt to get or load extra passes. Needed if
+			# swap texturepack hasn't been used yet, otherwise would need
+			# to prep twice (even if the base diff texture was already
+			# loaded from that pack).
+			diff_filepath = passes["diffuse"].filepath
+			# bpy. makes rel to file, os. resolves any os.pardir refs.
+			abspath = os.path.abspath(bpy.path.abspath(diff_filepath))
+			other_passes = generate.find_additional_passes(abspath)
+			for pass_name in other_passes:
+				if pass_name not in passes or not passes.get(pass_name):
+					# Need to update the according tagged node with tex.
+					passes[pass_name] = bpy.data.images.load(
+						other_passes[pass_name],
+						check_existing=True)
+
+		if self.autoFindMissingTextures:
+			for pass_name in passes:
+				res = generate.replace_missing_texture(passes[pass_name])
+				if res > 0:
+					swapped = True
+		return swapped
+
+	def prep_single(self, context: Context, mat: Material, passes: Dict[str, Image], swapped: bool) -> Tuple[Material, Optional[int]]:
+		"""Generate the nodes of one material from already loaded passes.
+
+		Returns the prepped material, which replaces mat if copied from a
+		template, see generate.prep_material_from_template.
+		"""
+		if swapped:
+			mat["texture_swapped"] = True  # used to apply saturation
+
+		options = generate.PrepOptions(
+			passes,
+			self.useReflections,
+			self.usePrincipledShader,
+			self.makeSolid,
+			generate.PackFormat[self.packFormat.upper()],
+			self.useEmission,
+			False  # This is for an option set in matprep_cycles
+		)
+		mat, res = generate.prep_material_from_template(mat, options)
+
+		if self.animateTextures:
+			sequences.animate_single_material(
+				mat,
+				context.scene.render.engine,
+				export_location=sequences.ExportLocation.ORIGINAL)
+		return mat, res
+
 	track_function = "materials"
 	track_param = None
 	track_exporter = None
@@ -207,6 +269,7 @@ class MCPREP_OT_prep_materials(bpy.types.Operator, McprepMaterialProps):
 
 		print("Orig mat list: ", len(mat_list))
 
+		prep_list = []
 		for mat in mat_list:
 			if not mat:
 				env.log(
@@ -215,67 +278,40 @@ class MCPREP_OT_prep_materials(bpy.types.Operator, McprepMaterialProps):
 			elif mat.library or mat.get("MCPREP_NO_PREP", False):
 				count_lib_skipped += 1
 				continue
+			prep_list.append(mat)
+
+		if prep_list and engine not in ('CYCLES', 'BLENDER_EEVEE', 'BLENDER_EEVEE_NEXT'):
+			self.report(
+				{'ERROR'},
+				"Only Cycles and Eevee are supported"
+			)
+			return {'CANCELLED'}
+
+		# Duplicates like stone.001 and stone.002 sharing the same texture
+		# resolve passes and generate nodes once, and the rest are copies.
+		for passes, group in generate.group_materials_for_prep(prep_list):
+			swapped = self.load_passes(passes)
+			first, res = self.prep_single(context, group[0], passes, swapped)
+			results = [res]
+
+			diffuse = passes.get("diffuse")
+			reuse = res == 0 and not (
+				diffuse and diffuse.source == 'SEQUENCE')
+			for mat in group[1:]:
+				if reuse:
+					generate.copy_prepped_material(first, mat)
+					results.append(0)
+				else:
+					_, res = self.prep_single(context, mat, passes, swapped)
+					results.append(res)
 
-			passes = generate.get_textures(mat)
-			if not self.useExtraMaps or self.packFormat == "simple":
-				# Clear out extra passes if not needed/requested
-				for pass_name in passes:
-					if pass_name != "diffuse":
-						passes[pass_name] = None
-			elif passes.get("diffuse"):
-				# Otherwise, attempt to get or load extra passes. Needed if
-				# swap texturepack hasn't been used yet, otherwise would need
-				# to prep twice (even if the base diff texture was already
-				# loaded from that pack).
-				diff_filepath = passes["diffuse"].filepath
-				# bpy. makes rel to file, os. resolves any os.pardir refs.
-				abspath = os.path.abspath(bpy.path.abspath(diff_filepath))
-				other_passes = generate.find_additional_passes(abspath)
-				for pass_name in other_passes:
-					if pass_name not in passes or not passes.get(pass_name):
-						# Need to update the according tagged node with tex.
-						passes[pass_name] = bpy.data.images.load(
-							other_passes[pass_name],
-							check_existing=True)
-
-			if self.autoFindMissingTextures:
-				for pass_name in passes:
-					res = generate.replace_missing_texture(passes[pass_name])
-					if res > 0:
-						mat["texture_swapped"] = True  # used to apply saturation
-
-			if engine == 'CYCLES' or engine == 'BLENDER_EEVEE' or engine == 'BLENDER_EEVEE_NEXT':
-				options = generate.PrepOptions(
-					passes,
-					self.useReflections,
-					self.usePrincipledShader,
-					self.makeSolid,
-					generate.PackFormat[self.packFormat.upper()],
-					self.useEmission,
-					False  # This is for an option set in matprep_cycles
-				)
-				res = generate.matprep_cycles(
-					mat=mat,
-					options=options
-				)
+			for res in results:
 				if res == 0:
 					count += 1
 				elif res == generate.IMG_MISSING:
 					count_img_not_found += 1
 				else:
 					count_misc_no_prep += 1
-			else:
-				self.report(
-					{'ERROR'},
-					"Only Cycles and Eevee are supported"
-				)
-				return {'CANCELLED'}
-
-			if self.animateTextures:
-				sequences.animate_single_material(
-					mat,
-					context.scene.render.engine,
-					export_location=sequences.ExportLocation.ORIGINAL)
 
 		# Sync materials.
 		if self.syncMaterials is True:
@@ -489,7 +525,8 @@ class MCPREP_OT_swap_texture_pack(
 			self.report({'ERROR'}, "No materials found on selected objects")
 			return {'CANCELLED'}
 		_ = generate.detect_form(mat_list)
-		invalid_uv, affected_objs = uv_tools.detect_invalid_uvs_from_objs(obj_list)
+		invalid_uv, affected_objs = uv_tools.detect_invalid_uvs_from_objs(
+			obj_list, sample_size=uv_tools.UV_SAMPLE_SIZE)
 
 		# NOTE: This is temporary
 		addon_prefs = util.get_user_preferences(context)
@@ -17,13 +17,18 @@
 # ##### END GPL LICENSE BLOCK #####
 
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple, Dict
+from array import array
+from typing import Any, Optional, Tuple, Dict, List, Union
 import enum
 import errno
+import hashlib
 import json
 import os
 import re
+import struct
+import zlib
 
 import bpy
 from bpy.types import Context, Material, Image, Texture
@@ -34,6 +39,19 @@ from .. import tracking
 from .. import util
 from ..conf import MCprepError, env, Engine, Form
 
+# Bundled with Blender, but kept optional with pure python fallbacks.
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+
+# Name of the file describing the frames exported to a sequence folder
+SEQUENCE_MANIFEST = "mcprep_sequence.json"
+
+# Number of distinct blends between two tiles of interpolated animations
+INTERPOLATE_STEPS = 16
+
 
 class ExportLocation(enum.Enum):
 	ORIGINAL = "original"
@@ -102,7 +120,8 @@ def animate_single_material(
 		source_path = image_path_canon
 		env.log("Fallback to using image canon path instead of source path")
 	tile_path_dict, err = generate_material_sequence(
-		source_path, image_path_canon, form, export_location, clear_cache)
+		source_path, image_path_canon, form, export_location, clear_cache,
+		mcmeta)
 	if err:
 		env.log("Error occured during sequence generation:")
 		env.log(err)
@@ -138,28 +157,77 @@ def animate_single_material(
 
 
 def is_image_tiled(image_block: Image) -> bool:
-	"""Checks whether an image block tiled."""
-	if not image_block or image_block.size[0] == 0:
+	"""Checks whether an image block tiled.
+
+	Uses the on-disk image analysis cache when available, to avoid loading
+	the image just to read its dimensions.
+	"""
+	if not image_block:
 		return False
-	tiles = image_block.size[1] / image_block.size[0]
-	if int(tiles) != tiles or not tiles > 1:
+	record = generate.get_image_analysis(image_block)
+	if record and record.get("tiles") is not None:
+		return record["tiles"] > 1
+	width, height = image_block.size[0], image_block.size[1]
+	if width == 0:
 		return False
-	else:
-		return True
-
-
-def generate_material_sequence(source_path: Path, image_path: Path, form: Optional[Form], export_location: ExportLocation, clear_cache: bool) -> Tuple[Dict[str, Path], Optional[str]]:
+	tiles = generate.get_image_tiles(width, height)
+	generate.set_image_analysis(
+		image_block, width=width, height=height, tiles=tiles)
+	return tiles > 1
+
+
+def hash_file(filepath: str) -> str:
+	"""Returns the sha1 hex digest of a file's contents."""
+	sha = hashlib.sha1()
+	with open(filepath, 'rb') as fd:
+		for block in iter(lambda: fd.read(65536), b""):
+			sha.update(block)
+	return sha.hexdigest()
+
+
+def read_sequence_manifest(seq_path: str) -> Optional[Dict]:
+	"""Returns the manifest of an exported sequence folder, if valid."""
+	manifest_path = os.path.join(seq_path, SEQUENCE_MANIFEST)
+	if not os.path.isfile(manifest_path):
+		return None
+	try:
+		with open(manifest_path, 'r') as fd:
+			manifest = json.load(fd)
+	except (OSError, ValueError) as e:
+		env.log(f"Failed to read sequence manifest {manifest_path}: {e}")
+		return None
+	if not isinstance(manifest, dict) or not isinstance(manifest.get("files"), list):
+		return None
+	return manifest
+
+
+def write_sequence_manifest(seq_path: str, manifest: Dict) -> None:
+	"""Save the manifest of an exported sequence folder."""
+	manifest_path = os.path.join(seq_path, SEQUENCE_MANIFEST)
+	try:
+		with open(manifest_path, 'w') as fd:
+			json.dump(manifest, fd, indent=1)
+	except OSError as e:
+		env.log(f"Failed to write sequence manifest {manifest_path}: {e}")
+
+
+def generate_material_sequence(source_path: Path, image_path: Path, form: Optional[Form], export_location: ExportLocation, clear_cache: bool, mcmeta: Optional[Dict]=None) -> Tuple[Dict[str, Path], Optional[str]]:
 	"""Performs frame by frame export of sequences to location based on input.
 
 	Returns Dictionary of the image paths to the first tile of each
 	material pass type detected (e.g. diffuse, specular, normal)
 
+	Each sequence folder holds a manifest of the source file's hash, the
+	mcmeta parameters, and the frames exported. Sequences are only re-used
+	if these still match, and any missing frames are exported again.
+
 	Args:
 		source_path: Source of the previous image's folder (diffuse image)
 		image_path: The path of the tiled image from a resource pack
 		form: jmc2obj, mineways, or none
 		export_location: enum of type of location output
 		clear_cache: whether to delete and re-export frames, even if existing found
+		mcmeta: The parsed .mcmeta animation data of the image, if any
 	Returns:
 		tile_path_dict: list of filepaths
 		err: Error if any handled
@@ -254,8 +322,6 @@ def generate_material_sequence(source_path: Path, image_path: Path, form: Option
 			tile for tile in os.listdir(seq_path)
 			if os.path.isfile(os.path.join(seq_path, tile))
 			and tile.startswith(pass_name)]
-		if cached:
-			env.log("Cached detected")
 
 		if clear_cache and cached:
 			for tile in cached:
@@ -266,13 +332,55 @@ def generate_material_sequence(source_path: Path, image_path: Path, form: Option
 						return {}, perm_denied
 					else:
 						raise Exception(exc)
-
-		# generate the sequences
-		params = []  # TODO: get from json file
-		if clear_cache or not cached:
-			first_tile = export_image_to_sequence(passfile, params, seq_path, form)
+			cached = []
+
+		# Only hash the source again if it changed since the last export
+		manifest = None if clear_cache else read_sequence_manifest(seq_path)
+		source_stat = os.stat(passfile)
+		if manifest and manifest.get("size") == source_stat.st_size and (
+				manifest.get("mtime") == source_stat.st_mtime):
+			source_hash = manifest.get("source_hash")
 		else:
-			first_tile = os.path.join(seq_path, sorted(cached)[0])
+			source_hash = hash_file(passfile)
+		is_current = bool(manifest) and (
+			manifest.get("source_hash") == source_hash
+			and manifest.get("mcmeta") == mcmeta
+			and "timeline" in manifest)
+
+		# generate the sequences, with frames following the mcmeta animation
+		if is_current:
+			env.log("Cached detected")
+			frames = [
+				i for i, tile in enumerate(manifest["files"])
+				if not os.path.isfile(os.path.join(seq_path, tile))]
+			if frames:
+				env.log(f"Re-exporting {len(frames)} missing frames")
+				export_sequence_frames(passfile, seq_path, form, frames, mcmeta)
+			files = manifest["files"]
+			timeline = manifest["timeline"]
+		else:
+			paths, timeline = export_sequence_frames(
+				passfile, seq_path, form, mcmeta=mcmeta)
+			files = [os.path.basename(path) for path in paths]
+			for tile in cached:
+				if tile in files:
+					continue
+				try:  # Remove frames left over from a prior, different source
+					os.remove(os.path.join(seq_path, tile))
+				except OSError as exc:
+					env.log(f"Could not remove stale frame {tile}: {exc}")
+
+		if not is_current or manifest.get("mtime") != source_stat.st_mtime:
+			write_sequence_manifest(seq_path, {
+				"source": passfile,
+				"source_hash": source_hash,
+				"size": source_stat.st_size,
+				"mtime": source_stat.st_mtime,
+				"mcmeta": mcmeta,
+				"timeline": timeline,
+				"frames": len(files),
+				"files": files})
+		first_tile = os.path.join(seq_path, files[0]) if files else None
 
 		# save first tile to dict
 		if first_tile:
@@ -280,17 +388,123 @@ def generate_material_sequence(source_path: Path, image_path: Path, form: Option
 	return image_dict, None
 
 
-def export_image_to_sequence(image_path: Path, params: Tuple[str, int, bool], output_folder: Path=None, form: Optional[Form]=None) -> Path:
+def get_mcmeta_ticks(value: Any, default: int) -> int:
+	"""Returns the number of game ticks of an mcmeta time value.
+
+	Values which are not numbers fall back to the default, while fractions
+	are rounded down and kept to at least one tick.
+	"""
+	if isinstance(value, bool) or not isinstance(value, (int, float)):
+		return default
+	try:
+		return max(1, int(value))
+	except (OverflowError, ValueError):  # Infinite or nan values
+		return default
+
+
+def get_sequence_plan(mcmeta: Optional[Dict], tiles: int) -> Tuple[List[Tuple[int, int, float]], List[Tuple[int, int]]]:
+	"""Returns the frames of a sequence following its mcmeta animation.
+
+	Each frame is a tuple of (tile, next tile, blend towards next tile), with
+	tiles indexed from the top of the image, and is only listed once. The
+	timeline lists which frame is shown for how many game ticks in play
+	order, so tiles repeated in the mcmeta frames list share the same frame.
+	Interpolated tiles blend towards the next tile in up to INTERPOLATE_STEPS
+	frames, each held for an even share of the tile's time.
+	"""
+	anim = mcmeta.get("animation") if isinstance(mcmeta, dict) else None
+	if not isinstance(anim, dict):
+		anim = {}
+	frametime = get_mcmeta_ticks(anim.get("frametime"), 1)
+	order = anim.get("frames")
+	if not isinstance(order, list) or not order:
+		order = range(tiles)
+
+	entries = []  # Each is the tile index and number of ticks shown
+	for frame in order:
+		if isinstance(frame, dict):
+			index = frame.get("index")
+			time = get_mcmeta_ticks(frame.get("time"), frametime)
+		else:
+			index = frame
+			time = frametime
+		if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < tiles:
+			env.log(f"Skipping invalid mcmeta frame {frame}", vv_only=True)
+			continue
+		entries.append((index, time))
+	if not entries:
+		entries = [(i, 1) for i in range(tiles)]
+
+	frames = []
+	frame_ids = {}
+	timeline = []
+	for num, (index, time) in enumerate(entries):
+		next_index = entries[(num + 1) % len(entries)][0]
+		steps = 1
+		if anim.get("interpolate") and next_index != index:
+			steps = min(time, INTERPOLATE_STEPS)
+		for step in range(steps):
+			key = (index, next_index, step / steps) if step else (index, index, 0.0)
+			if key not in frame_ids:
+				frame_ids[key] = len(frames)
+				frames.append(key)
+			ticks = (step + 1) * time // steps - step * time // steps
+			if timeline and timeline[-1][0] == frame_ids[key]:
+				timeline[-1] = (frame_ids[key], timeline[-1][1] + ticks)
+			else:
+				timeline.append((frame_ids[key], ticks))
+	return frames, timeline
+
+
+def get_uniform_ticks(timeline: List[Tuple[int, int]]) -> Optional[int]:
+	"""Returns the ticks of each frame, if all play once in order for as long.
+
+	Returns None for any other timeline, such as repeated or uneven frames.
+	"""
+	if not timeline:
+		return None
+	frame_ticks = timeline[0][1]
+	for num, (frame, ticks) in enumerate(timeline):
+		if frame != num or ticks != frame_ticks:
+			return None
+	return frame_ticks
+
+
+def export_image_to_sequence(image_path: Path, output_folder: Path=None, form: Optional[Form]=None) -> Path:
 	"""Convert image tiles into image sequence files.
 
+	How to animate them comes from the image's mcmeta, see
+	export_sequence_frames.
+
 	image_path: image filepath source
-	params: Settings from the json file or otherwise on *how* to animate it
-		e.g. ["linear", 2, false] = linear animation, 2 seconds long, and _?
 	form: jmc2obj, Mineways, or None (default)
 	Returns:
 		Full path of first image on success.
 	Does not auto load new images (or keep temporary ones created around)
 	"""
+	paths, _ = export_sequence_frames(image_path, output_folder, form)
+	if not paths:
+		return None
+	return bpy.path.abspath(paths[0])
+
+
+def export_sequence_frames(image_path: Path, output_folder: Path=None, form: Optional[Form]=None, frames: Optional[List[int]]=None, mcmeta: Optional[Dict]=None) -> Tuple[List[str], List[Tuple[int, int]]]:
+	"""Export the tiles of an image as frame files.
+
+	Frames follow the image's mcmeta animation, see get_sequence_plan. Each
+	distinct frame is saved once, and repeats are left to the timeline.
+	Frames are always encoded as 8 bit png files, whatever the source format.
+
+	Args:
+		image_path: image filepath source
+		output_folder: where to save frames, defaults to the image's folder
+		form: jmc2obj, Mineways, or None (default)
+		frames: indices of the frames to export, or all frames if None
+		mcmeta: The parsed .mcmeta animation data of the image, if any
+	Returns:
+		Paths of all frames of the sequence, empty if the image isn't tiled.
+		Timeline of the frame shown and for how many game ticks, in order.
+	"""
 
 	# load in the image_path to a temporary datablock, check here if tiled
 	image = bpy.data.images.load(image_path)
@@ -302,10 +516,10 @@ def export_image_to_sequence(image_path: Path, params: Tuple[str, int, bool], ou
 			bpy.data.images.remove(image)
 		else:
 			env.log(f"Couldn't remove image, shouldn't keep: {image.name}")
-		return None  # any non-titled materials will exit here
+		return [], []  # any non-titled materials will exit here
 	else:
 		tiles = int(tiles)
-	basename, ext = os.path.splitext(os.path.basename(image_path))
+	basename = os.path.splitext(os.path.basename(image_path))[0]
 
 	# use the source image's filepath, or fallback to blend file's,
 	if not output_folder:
@@ -320,44 +534,64 @@ def export_image_to_sequence(image_path: Path, params: Tuple[str, int, bool], ou
 	# base_name = first_img[:-ind]
 	# start_img = int(first_img[-ind:])
 
-	pxlen = len(image.pixels)
-	first_img = None
+	if form == "mineways":
+		raise Exception("No Animate Textures Mineways support yet")
+
+	# Read all pixels once, so each frame is just a view into this buffer.
+	width = image.size[0]
+	channels = image.channels
+	pixels = generate.get_image_pixels(image)
+	if image.is_float and not image.colorspace_settings.is_data:
+		# Float buffers hold linear values, unlike the raw values of byte ones
+		linear_to_srgb(pixels, channels)
+	if np is None:
+		pixels = memoryview(pixels)
+	pxlen = len(pixels)
+	if width * width * channels * tiles != pxlen:
+		raise Exception("Mis-match of tile size and source sequence")
+
+	tile_pixels = []
 	for i in range(tiles):
-		env.log(f"Exporting sequence tile {i}")
-		tile_name = f"{basename}_{i + 1:04}"
-		out_path = os.path.join(output_folder, tile_name + ext)
-		if not first_img:
-			first_img = out_path
-
 		revi = tiles - i - 1  # To reverse index, based on MC tile order.
-
-		# new image for copying pixels over to
-		if form != "mineways":
-			img_tile = bpy.data.images.new(
-				f"{basename}-seq-temp",
-				image.size[0], image.size[0], alpha=(image.channels == 4))
-			img_tile.filepath = out_path
-
-			if len(img_tile.pixels) * tiles != len(image.pixels):
-				raise Exception("Mis-match of tile size and source sequence")
-			start = int(pxlen / tiles * revi)
-			end = int(pxlen / tiles * (revi + 1))
-			img_tile.pixels = image.pixels[start:end]
-
-			# Could have OS issues here in form of RuntimeError.
-			img_tile.save()
-
-			# verify it now exists
-			if not os.path.isfile(out_path):
-				raise Exception("Did not successfully save tile frame from sequence")
-			img_tile.user_clear()
-			if img_tile.users == 0:
-				bpy.data.images.remove(img_tile)
-			else:
-				env.log(f"Couldn't remove tile, shouldn't keep: {img_tile.name}")
+		start = int(pxlen / tiles * revi)
+		end = int(pxlen / tiles * (revi + 1))
+		tile_pixels.append(pixels[start:end])
+
+	plan, timeline = get_sequence_plan(mcmeta, tiles)
+	out_paths = [
+		os.path.join(output_folder, f"{basename}_{i + 1:04}.png")
+		for i in range(len(plan))]
+	if frames is None:
+		frames = list(range(len(plan)))
+	else:
+		frames = [i for i in frames if i < len(plan)]
+
+	def save_frame(index: int) -> None:
+		env.log(f"Exporting sequence tile {index}")
+		tile, next_tile, blend = plan[index]
+		if blend:
+			frame_pixels = blend_pixels(
+				tile_pixels[tile], tile_pixels[next_tile], blend)
 		else:
-			img_tile = None
-			raise Exception("No Animate Textures Mineways support yet")
+			frame_pixels = tile_pixels[tile]
+		png = encode_png(frame_pixels, width, width, channels)
+		if os.path.lexists(out_paths[index]):
+			# Unlink first, as older exports may have hard linked frames
+			os.remove(out_paths[index])
+		with open(out_paths[index], 'wb') as fd:
+			fd.write(png)
+
+	# Encoding and writing is done outside of bpy, where zlib compression and
+	# file writes release the GIL, so frames can be written in parallel.
+	workers = max(1, min(len(frames), os.cpu_count() or 1))
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		for future in [executor.submit(save_frame, i) for i in frames]:
+			future.result()  # Re-raise any error, such as a permission error
+
+	for index in frames:
+		# verify it now exists
+		if not os.path.isfile(out_paths[index]):
+			raise Exception("Did not successfully save tile frame from sequence")
 
 	env.log(f"Finished exporting frame sequence: {basename}")
 	image.user_clear()
@@ -366,7 +600,71 @@ def export_image_to_sequence(image_path: Path, params: Tuple[str, int, bool], ou
 	else:
 		env.log(f"Couldn't remove image block, shouldn't keep: {image.name}")
 
-	return bpy.path.abspath(first_img)
+	return out_paths, timeline
+
+
+def linear_to_srgb(pixels: Union["np.ndarray", array], channels: int) -> None:
+	"""Convert linear float pixels to sRGB in place, leaving alpha as is."""
+	color = 1 if channels < 3 else 3
+
+	if np is not None:
+		view = pixels.reshape(-1, channels)[:, :color]
+		view[...] = np.where(
+			view <= 0.0031308,
+			view * 12.92,
+			1.055 * np.power(np.maximum(view, 0.0031308), 1 / 2.4) - 0.055)
+		return
+
+	for i, val in enumerate(pixels):
+		if i % channels >= color:
+			continue
+		if val <= 0.0031308:
+			pixels[i] = val * 12.92
+		else:
+			pixels[i] = 1.055 * val ** (1 / 2.4) - 0.055
+
+
+def blend_pixels(first: Union["np.ndarray", memoryview], second: Union["np.ndarray", memoryview], blend: float) -> Union["np.ndarray", array]:
+	"""Linearly blend two equal sized pixel buffers."""
+	if np is not None:
+		return first * (1.0 - blend) + second * blend
+	return array('f', (
+		val * (1.0 - blend) + other * blend
+		for val, other in zip(first, second)))
+
+
+def encode_png(pixels: Union["np.ndarray", memoryview], width: int, height: int, channels: int) -> bytes:
+	"""Encode float pixels, ordered bottom row first like Blender, as png data.
+
+	Values are clamped and rounded to 8 bits per channel, same as saving a
+	byte image from Blender.
+	"""
+	color_type = {1: 0, 2: 4, 3: 2, 4: 6}[channels]
+	stride = width * channels
+	if np is not None:
+		data = np.clip(pixels, 0.0, 1.0) * 255.0 + 0.5
+		rows = np.zeros((height, stride + 1), dtype=np.uint8)
+		# Png rows go from the top down, the reverse of Blender's pixels
+		rows[:, 1:] = data.astype(np.uint8).reshape(height, stride)[::-1]
+		raw = rows.tobytes()
+	else:
+		raw = bytearray()
+		for row in range(height - 1, -1, -1):
+			raw.append(0)  # No scanline filter
+			raw.extend(
+				min(255, max(0, int(val * 255.0 + 0.5)))
+				for val in pixels[row * stride:(row + 1) * stride])
+
+	def chunk(tag: bytes, data: bytes) -> bytes:
+		crc = zlib.crc32(tag + data) & 0xffffffff
+		return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", crc)
+
+	header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+	return b"".join([
+		b"\x89PNG\r\n\x1a\n",
+		chunk(b"IHDR", header),
+		chunk(b"IDAT", zlib.compress(bytes(raw), 6)),
+		chunk(b"IEND", b"")])
 
 
 def get_sequence_int_index(base_name: str) -> int:
@@ -407,6 +705,80 @@ def set_sequence_to_texnode(node: Texture, image_path: Path) -> None:
 	node.image_user.use_cyclic = True
 	node.image_user.use_auto_refresh = True
 
+	# Frames lasting multiple game ticks, at one tick per scene frame, are
+	# held by offsetting the image user instead of repeating frame files.
+	manifest = read_sequence_manifest(base_dir)
+	timeline = get_manifest_timeline(manifest)
+	frame_ticks = get_uniform_ticks(timeline) if timeline else 1
+	try:
+		node.image_user.driver_remove("frame_offset")
+		fcurve = get_frame_offset_fcurve(node)
+		if fcurve:
+			fcurve.id_data.fcurves.remove(fcurve)
+		if frame_ticks is None:
+			set_sequence_frame_keys(node, start_img, timeline)
+		elif frame_ticks > 1:
+			set_sequence_frame_driver(node, start_img, img_count, frame_ticks)
+	except TypeError as e:
+		env.log(f"Could not drive sequence frames of {node.name}: {e}")
+
+
+def get_manifest_timeline(manifest: Optional[Dict]) -> List[Tuple[int, int]]:
+	"""Returns the timeline of a sequence manifest, empty if missing or invalid."""
+	if not manifest:
+		return []
+	try:
+		return [
+			(int(frame), max(1, int(ticks)))
+			for frame, ticks in manifest.get("timeline") or []]
+	except (TypeError, ValueError):
+		return []
+
+
+def set_sequence_frame_driver(node: Texture, start_img: int, img_count: int, frame_ticks: int) -> None:
+	"""Drive the image user offset so each frame is held for frame_ticks.
+
+	Uses a simple expression, which Blender evaluates without python and so
+	works even when auto running python scripts is disabled.
+	"""
+	length = img_count * frame_ticks
+	node.image_user.frame_duration = length
+	# Zero based scene frame within the cycle, same as the image user's cycle
+	cycle = f"fmod(fmod(frame - {start_img}, {length}) + {length}, {length})"
+	fcurve = node.image_user.driver_add("frame_offset")
+	fcurve.driver.type = 'SCRIPTED'
+	fcurve.driver.expression = (
+		f"{start_img} + floor({cycle} / {frame_ticks}) - {cycle} - 1")
+
+
+def get_frame_offset_fcurve(node: Texture) -> Optional[bpy.types.FCurve]:
+	"""Returns the keyframed curve of the image user offset, if any."""
+	anim = node.id_data.animation_data
+	if not anim or not anim.action:
+		return None
+	return anim.action.fcurves.find(
+		node.image_user.path_from_id("frame_offset"))
+
+
+def set_sequence_frame_keys(node: Texture, start_img: int, timeline: List[Tuple[int, int]]) -> None:
+	"""Keyframe the image user offset to show frames in timeline order.
+
+	Used for timelines a single driver expression can't hold, such as uneven
+	frame times or repeated frames. With a frame duration of one, the image
+	shown is just the offset plus one, so each frame is one constant key.
+	"""
+	node.image_user.frame_duration = 1
+	frame = start_img
+	# The closing key repeats the first, so the cycle includes the last frame
+	for frame_id, ticks in timeline + [timeline[0]]:
+		node.image_user.frame_offset = start_img + frame_id - 1
+		node.image_user.keyframe_insert("frame_offset", frame=frame)
+		frame += ticks
+	fcurve = get_frame_offset_fcurve(node)
+	for point in fcurve.keyframe_points:
+		point.interpolation = 'CONSTANT'
+	fcurve.modifiers.new('CYCLES')
+
 
 # -----------------------------------------------------------------------------
 # Sequence texture classes
@@ -488,7 +860,8 @@ class MCPREP_OT_prep_animated_textures(bpy.types.Operator):
 			if self.break_err:
 				break
 
-		invalid_uv, affected_objs = uv_tools.detect_invalid_uvs_from_objs(objs)
+		invalid_uv, affected_objs = uv_tools.detect_invalid_uvs_from_objs(
+			objs, sample_size=uv_tools.UV_SAMPLE_SIZE)
 
 		if self.break_err:
 			print(self.break_err)
@@ -18,16 +18,32 @@
 
 
 import bpy
-from bpy.types import Context
+from bpy.types import Context, Image
 
+import os
 import time
-from typing import Dict, List, Tuple
+from array import array
+from typing import Dict, List, Sequence, Tuple, Union
 
 from ..conf import env
 from . import generate
 from .. import tracking
 from .. import util
 
+# Bundled with Blender, but kept optional with pure python fallbacks.
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+
+# Faces sampled per material by operators checking for invalid uvs, see
+# detect_invalid_uvs_from_objs
+UV_SAMPLE_SIZE = 128
+
+# Total pixels of alpha buffers kept between operator calls, see
+# get_image_alpha. 16M pixels is 64MB of float32 values.
+ALPHA_CACHE_PIXELS = 16 * 1024 * 1024
 
 # -----------------------------------------------------------------------------
 # UV functions
@@ -58,36 +74,163 @@ def get_uv_bounds_per_material(obj: bpy.types.Object) -> Dict[str, list]:
 	# TODO: add other key for max_uvsize, to detect cases like lava and water
 	# where multiple materials are in one but UVs split over multiple blocks.
 	# In the meantime, threshold of 0.25 set by parent function is a sweetspot
-	for poly in obj.data.polygons:
-		m_index = poly.material_index
+	slot_bounds = get_uv_bounds_per_slot(obj.data, active_uv)
+	for m_index, bounds in slot_bounds.items():
+		if m_index >= len(obj.material_slots):
+			continue
 		mslot = obj.material_slots[m_index]
 		if not mslot or not mslot.material:
 			continue
+		mkey = mslot.material.name
+		res[mkey] = [
+			min(res[mkey][0], bounds[0]),
+			max(res[mkey][1], bounds[1]),
+			min(res[mkey][2], bounds[2]),
+			max(res[mkey][3], bounds[3])]
+	return res
 
-		# TODO: Consider breaking early after reaching the first N hits of a
-		# given material face within the same object, to avoid slowdown for
-		# very large worlds. Butm early tests show that UV check is still small
-		# compared to overall process time of either swap tex or anim tex.
 
-		mkey = mslot.material.name
-		for loop_ind in poly.loop_indices:
-			# a loop could be an edge or face
-			# loop = obj.data.loops[i] # This polygon/edge
-			uvx, uvy = active_uv.data[loop_ind].uv
-			if uvx < res[mkey][0]:  # min x
-				res[mkey][0] = uvx
-			if uvx > res[mkey][1]:  # max x
-				res[mkey][1] = uvx
-			if uvy < res[mkey][2]:  # min y
-				res[mkey][2] = uvy
-			if uvy > res[mkey][3]:  # max y
-				res[mkey][3] = uvy
+def get_uv_bounds_per_slot(mesh: bpy.types.Mesh, uv_layer: bpy.types.MeshUVLoopLayer) -> Dict[int, Tuple[float, float, float, float]]:
+	"""Return the uv bounds of all faces, grouped by material index.
+
+	Reads all loop uvs and face attributes in bulk with foreach_get, then
+	reduces them per material index.
+
+	Returns:
+		dict: key of material index, value of minx, maxx, miny, maxy
+	"""
+	polys = mesh.polygons
+	n_polys = len(polys)
+	n_loops = len(uv_layer.data)
+	if not n_polys or not n_loops:
+		return {}
+
+	if np is not None:
+		uvs = np.empty(n_loops * 2, dtype=np.float32)
+		uv_layer.data.foreach_get("uv", uvs)
+		uvs = uvs.reshape(-1, 2)
+		mat_index = np.empty(n_polys, dtype=np.int32)
+		loop_start = np.empty(n_polys, dtype=np.int32)
+		loop_total = np.empty(n_polys, dtype=np.int32)
+		polys.foreach_get("material_index", mat_index)
+		polys.foreach_get("loop_start", loop_start)
+		polys.foreach_get("loop_total", loop_total)
+
+		# Expand to the loop indices of every face, and each one's material.
+		face_offsets = np.cumsum(loop_total) - loop_total
+		loop_face = np.repeat(np.arange(n_polys), loop_total)
+		loop_ids = loop_start[loop_face] + (
+			np.arange(len(loop_face)) - face_offsets[loop_face])
+		loop_mat = mat_index[loop_face]
+
+		# Sort loops by material, to reduce each contiguous run at once.
+		order = np.argsort(loop_mat, kind='stable')
+		loop_mat = loop_mat[order]
+		grouped = uvs[loop_ids[order]]
+		keys, starts = np.unique(loop_mat, return_index=True)
+		mins = np.minimum.reduceat(grouped, starts, axis=0)
+		maxs = np.maximum.reduceat(grouped, starts, axis=0)
+		return {
+			int(key): (
+				float(mins[i][0]), float(maxs[i][0]),
+				float(mins[i][1]), float(maxs[i][1]))
+			for i, key in enumerate(keys)}
+
+	uvs = array('f', bytes(4 * n_loops * 2))
+	uv_layer.data.foreach_get("uv", uvs)
+	mat_index = array('i', bytes(4 * n_polys))
+	loop_start = array('i', bytes(4 * n_polys))
+	loop_total = array('i', bytes(4 * n_polys))
+	polys.foreach_get("material_index", mat_index)
+	polys.foreach_get("loop_start", loop_start)
+	polys.foreach_get("loop_total", loop_total)
+
+	res = {}
+	for m_index, start, total in zip(mat_index, loop_start, loop_total):
+		xs = uvs[start * 2:(start + total) * 2:2]
+		ys = uvs[start * 2 + 1:(start + total) * 2:2]
+		if not xs:
+			continue
+		face = (min(xs), max(xs), min(ys), max(ys))
+		prior = res.get(m_index)
+		if prior is None:
+			res[m_index] = face
+		else:
+			res[m_index] = (
+				min(prior[0], face[0]), max(prior[1], face[1]),
+				min(prior[2], face[2]), max(prior[3], face[3]))
 	return res
 
 
-def detect_invalid_uvs_from_objs(obj_list: List[bpy.types.Object]) -> Tuple[bool, List[bpy.types.Object]]:
+def sample_uv_bounds_per_material(obj: bpy.types.Object, sample_size: int) -> Tuple[Dict[str, list], Dict[str, bool]]:
+	"""Return uv bounds per material from a stratified sample of its faces.
+
+	Each material's faces are split into sample_size strata, and the middle
+	face of each stratum is read. Sampled bounds can only be narrower than
+	the true bounds of all faces.
+
+	Returns:
+		dict: same as get_uv_bounds_per_material, but only of sampled faces
+		dict: per material, whether every one of its faces was sampled
+	"""
+	if not obj or obj.type != 'MESH' or np is None:
+		return {}, {}
+	mats = util.materialsFromObj([obj])
+	active_uv = obj.data.uv_layers.active
+	if not mats or not active_uv or not active_uv.data:
+		return {}, {}
+
+	res = {mat.name: [1, 0, 1, 0] for mat in mats}
+	exact = {mat.name: True for mat in mats}
+
+	polys = obj.data.polygons
+	n_polys = len(polys)
+	mat_index = np.empty(n_polys, dtype=np.int32)
+	loop_start = np.empty(n_polys, dtype=np.int32)
+	loop_total = np.empty(n_polys, dtype=np.int32)
+	polys.foreach_get("material_index", mat_index)
+	polys.foreach_get("loop_start", loop_start)
+	polys.foreach_get("loop_total", loop_total)
+
+	order = np.argsort(mat_index, kind='stable')
+	keys, starts, counts = np.unique(
+		mat_index[order], return_index=True, return_counts=True)
+	uv_data = active_uv.data
+	for key, start, count in zip(keys, starts, counts):
+		if key >= len(obj.material_slots):
+			continue
+		mslot = obj.material_slots[key]
+		if not mslot or not mslot.material:
+			continue
+		mkey = mslot.material.name
+		faces = order[start:start + count]
+		if count > sample_size:
+			strata = np.arange(sample_size) * count + count // 2
+			faces = faces[strata // sample_size]
+			exact[mkey] = False
+
+		bounds = res[mkey]
+		for face in faces:
+			first = int(loop_start[face])
+			for loop_ind in range(first, first + int(loop_total[face])):
+				uvx, uvy = uv_data[loop_ind].uv
+				bounds[0] = min(bounds[0], uvx)
+				bounds[1] = max(bounds[1], uvx)
+				bounds[2] = min(bounds[2], uvy)
+				bounds[3] = max(bounds[3], uvy)
+	return res, exact
+
+
+def detect_invalid_uvs_from_objs(obj_list: List[bpy.types.Object], sample_size: int = 0, confidence: float = 0.5) -> Tuple[bool, List[bpy.types.Object]]:
 	"""Detect all-in one combined images from concentrated UV layouts.
 
+	Args:
+		obj_list: Objects to check
+		sample_size: If above 0, first check up to this many faces per
+			material, only reading all faces if the sample is ambiguous
+		confidence: Share of the threshold below which a sampled material is
+			taken as concentrated. Sampled spreads between this and the full
+			threshold could still widen with more faces, so count as ambiguous
 	Returns:
 		bool: True for invalid layout, False of ok layout
 		list: Of objects which appear to have invalid UVs
@@ -104,7 +247,22 @@ def detect_invalid_uvs_from_objs(obj_list: List[bpy.types.Object]) -> Tuple[bool
 	t0 = time.time()
 
 	for obj in obj_list:
-		uv_bounds = get_uv_bounds_per_material(obj)
+		uv_bounds = None
+		if sample_size > 0:
+			uv_bounds, exact = sample_uv_bounds_per_material(obj, sample_size)
+			for mt in uv_bounds:
+				spread = max(
+					uv_bounds[mt][1] - uv_bounds[mt][0],
+					uv_bounds[mt][3] - uv_bounds[mt][2])
+				if spread >= thresh:
+					break  # Conclusive, as more faces can only widen bounds
+				elif not exact[mt] and spread >= thresh * confidence:
+					uv_bounds = None  # Ambiguous, so check all faces
+					break
+			if uv_bounds == {}:
+				uv_bounds = None  # Not sampled, such as without numpy
+		if uv_bounds is None:
+			uv_bounds = get_uv_bounds_per_material(obj)
 		mis_mats = [
 			mt for mt in uv_bounds
 			if uv_bounds[mt][1] - uv_bounds[mt][0] < thresh
@@ -128,6 +286,127 @@ def detect_invalid_uvs_from_objs(obj_list: List[bpy.types.Object]) -> Tuple[bool
 	return invalid, invalid_objects
 
 
+def get_image_alpha(image: Image) -> Union["np.ndarray", array]:
+	"""Return the alpha channel of a 4 channel image as a flat float buffer.
+
+	Buffers are kept on env.alpha_cache between operator calls, and read
+	again once the image is edited or its size or source file changes. See
+	cache_image_alpha for how the cache is bounded.
+	"""
+	path = generate.get_image_filepath(image)
+	stamp = (
+		tuple(image.size), image.filepath_raw,
+		os.path.getmtime(path) if path else None)
+	cached = env.alpha_cache.get(image.name_full)
+	if cached and cached[0] == stamp and not image.is_dirty:
+		env.alpha_cache.move_to_end(image.name_full)
+		return cached[1]
+
+	count = image.size[0] * image.size[1]
+	record = generate.get_image_analysis(image)
+	if record and record.get("alpha_coverage") == 0:
+		# Known fully opaque from a prior analysis, skip the read
+		if np is not None:
+			alpha = np.ones(count, dtype=np.float32)
+		else:
+			alpha = array('f', [1.0]) * count
+	else:
+		alpha = generate.get_image_pixels(image)[3::4]
+		if np is not None:
+			alpha = alpha.copy()  # Release the rest of the pixel buffer
+			transparent = int(np.count_nonzero(alpha < 1.0))
+		else:
+			transparent = sum(1 for a in alpha if a < 1.0)
+		generate.set_image_analysis(
+			image, alpha_coverage=transparent / max(count, 1))
+
+	if not image.is_dirty:
+		cache_image_alpha(image.name_full, stamp, alpha)
+	return alpha
+
+
+def cache_image_alpha(name: str, stamp: Tuple, alpha: Union["np.ndarray", array]) -> None:
+	"""Keep an alpha buffer on env.alpha_cache, within ALPHA_CACHE_PIXELS.
+
+	Entries of images no longer in the file are dropped, then the least
+	recently used ones until the total pixel count fits. The newest entry is
+	always kept, even if larger than the limit on its own.
+	"""
+	cache = env.alpha_cache
+	names = {image.name_full for image in bpy.data.images}
+	for cached_name in [key for key in cache if key not in names]:
+		del cache[cached_name]
+
+	cache[name] = (stamp, alpha)
+	cache.move_to_end(name)
+	total = sum(len(entry[1]) for entry in cache.values())
+	while total > ALPHA_CACHE_PIXELS and len(cache) > 1:
+		_, (_, evicted) = cache.popitem(last=False)
+		total -= len(evicted)
+
+
+def get_face_uv_bounds(mesh: bpy.types.Mesh, uv_layer: bpy.types.MeshUVLoopLayer) -> Tuple[Sequence, Sequence, Sequence]:
+	"""Return the uv bounds of each face, with uvs wrapped into 0-1.
+
+	Returns:
+		sequence: per face of minx, maxx, miny, maxy
+		sequence: per face number of loops
+		sequence: per face material index
+	"""
+	polys = mesh.polygons
+	n_polys = len(polys)
+	n_loops = len(uv_layer.data)
+
+	if np is not None:
+		mat_index = np.empty(n_polys, dtype=np.int32)
+		loop_start = np.empty(n_polys, dtype=np.int32)
+		loop_total = np.empty(n_polys, dtype=np.int32)
+		polys.foreach_get("material_index", mat_index)
+		polys.foreach_get("loop_start", loop_start)
+		polys.foreach_get("loop_total", loop_total)
+		bounds = np.zeros((n_polys, 4))
+		if not n_polys or not n_loops or not loop_total.sum():
+			return bounds, loop_total, mat_index
+
+		uvs = np.empty(n_loops * 2, dtype=np.float32)
+		uv_layer.data.foreach_get("uv", uvs)
+		uvs = uvs.reshape(-1, 2).astype(np.float64) % 1
+
+		# Gather loops face by face, so each face is one contiguous run.
+		face_offsets = np.cumsum(loop_total) - loop_total
+		loop_face = np.repeat(np.arange(n_polys), loop_total)
+		loop_ids = loop_start[loop_face] + (
+			np.arange(len(loop_face)) - face_offsets[loop_face])
+		grouped = uvs[loop_ids]
+		offsets = np.minimum(face_offsets, len(grouped) - 1)
+		mins = np.minimum.reduceat(grouped, offsets, axis=0)
+		maxs = np.maximum.reduceat(grouped, offsets, axis=0)
+		bounds[:, 0] = mins[:, 0]
+		bounds[:, 1] = maxs[:, 0]
+		bounds[:, 2] = mins[:, 1]
+		bounds[:, 3] = maxs[:, 1]
+		return bounds, loop_total, mat_index
+
+	mat_index = array('i', bytes(4 * n_polys))
+	loop_start = array('i', bytes(4 * n_polys))
+	loop_total = array('i', bytes(4 * n_polys))
+	polys.foreach_get("material_index", mat_index)
+	polys.foreach_get("loop_start", loop_start)
+	polys.foreach_get("loop_total", loop_total)
+	uvs = array('f', bytes(4 * n_loops * 2))
+	uv_layer.data.foreach_get("uv", uvs)
+
+	bounds = []
+	for start, total in zip(loop_start, loop_total):
+		xs = [x % 1 for x in uvs[start * 2:(start + total) * 2:2]]
+		ys = [y % 1 for y in uvs[start * 2 + 1:(start + total) * 2:2]]
+		if not xs:
+			bounds.append((0, 0, 0, 0))
+			continue
+		bounds.append((min(xs), max(xs), min(ys), max(ys)))
+	return bounds, loop_total, mat_index
+
+
 # -----------------------------------------------------------------------------
 # UV Operator definitions
 # -----------------------------------------------------------------------------
@@ -314,67 +593,69 @@ class MCPREP_OT_select_alpha_faces(bpy.types.Operator):
 				env.log(f"No alpha channel for: {image.name}")
 				continue
 			textures.append(image)
-		data = [None for tex in textures]
 
-		uv = ob.data.uv_layers.active
-		for f in ob.data.polygons:
-			if len(f.loop_indices) < 3:
-				continue  # don't select edges or vertices
-			fnd = f.material_index
-			image = textures[fnd]
+		mesh = ob.data
+		if mesh.uv_layers.active is None:
+			return "No active UV map found"
+		bounds, loop_total, mat_index = get_face_uv_bounds(
+			mesh, mesh.uv_layers.active)
+		n_polys = len(mesh.polygons)
+		if np is not None:
+			select = np.empty(n_polys, dtype=bool)
+		else:
+			select = [False] * n_polys
+		mesh.polygons.foreach_get("select", select)
+
+		# Group faces by material, skipping edges or vertices
+		faces_by_index = {}
+		for face, (total, index) in enumerate(zip(loop_total, mat_index)):
+			if total < 3:
+				continue
+			faces_by_index.setdefault(int(index), []).append(face)
+
+		for index, faces in faces_by_index.items():
+			image = textures[index] if index < len(textures) else None
 			if not image:
 				env.log("Could not get image from face's material")
 				return "Could not get image from face's material"
-
-			# lazy load alpha part of image to memory, hold for whole operator
-			if not data[fnd]:
-				data[fnd] = list(image.pixels)[3::4]
-
-			# relate the polygon to the UV layer to the image coordinates
-			shape = []
-			for i in f.loop_indices:
-				loop = ob.data.loops[i]
-				x = uv.data[loop.index].uv[0] % 1  # TODO: fix this wraparound hack
-				y = uv.data[loop.index].uv[1] % 1
-				shape.append((x, y))
-
-			# print("The shape coords:")
-			# print(shape)
-			# could just do "the closest" pixel... but better is weighted area
-			if not shape:
+			width, height = image.size[0], image.size[1]
+			alpha = get_image_alpha(image)
+
+			if np is not None:
+				# Summed area table, to total any pixel rectangle in one step
+				table = np.zeros((height + 1, width + 1))
+				table[1:, 1:] = alpha.reshape(height, width).cumsum(
+					axis=0, dtype=np.float64).cumsum(axis=1)
+				faces = np.array(faces)
+				face_bounds = bounds[faces]
+				pixels = np.round(face_bounds * (width, width, height, height))
+				x0 = np.clip(pixels[:, 0], 0, width).astype(int)
+				x1 = np.clip(pixels[:, 1], x0, width).astype(int)
+				y0 = np.clip(pixels[:, 2], 0, height).astype(int)
+				y1 = np.clip(pixels[:, 3], y0, height).astype(int)
+				asum = (
+					table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0])
+				acount = np.maximum((x1 - x0) * (y1 - y0), 1)
+				select[faces] = asum / acount < float(threshold)
 				continue
 
-			xlist, ylist = tuple([list(tup) for tup in zip(*shape)])
-			# not sure if I actually want to +0.5 to the values to get middle..
-			xmin = round(min(xlist) * image.size[0]) - 0.5
-			xmax = round(max(xlist) * image.size[0]) - 0.5
-			ymin = round(min(ylist) * image.size[1]) - 0.5
-			ymax = round(max(ylist) * image.size[1]) - 0.5
-			env.log(["\tSet size:", xmin, xmax, ymin, ymax], vv_only=True)
-
-			# assuming faces are roughly rectangular, sum pixels a face covers
-			asum = 0
-			acount = 0
-			for row in range(image.size[1]):
-				if row < ymin or row > ymax:
-					continue
-				for col in range(image.size[0]):
-					if col >= xmin and col <= xmax:
-						try:
-							asum += data[fnd][image.size[1] * row + col]
-							acount += 1
-						except IndexError as err:
-							print(f"Index error while parsing col {col}, row {row}: {err}")
-
-			if acount == 0:
-				acount = 1
-			ratio = float(asum) / float(acount)
-			if ratio < float(threshold):
-				print(f"\t{ratio} - Below threshold, select")
-				f.select = True
-			else:
-				print(f"\t{ratio} - above thresh, NO select")
-				f.select = False
+			for face in faces:
+				xmin, xmax, ymin, ymax = bounds[face]
+				# assuming faces are roughly rectangular, sum pixels a face covers
+				x0 = min(max(round(xmin * width), 0), width)
+				x1 = max(min(max(round(xmax * width), 0), width), x0)
+				y0 = min(max(round(ymin * height), 0), height)
+				y1 = max(min(max(round(ymax * height), 0), height), y0)
+				asum = 0
+				for row in range(y0, y1):
+					asum += sum(alpha[row * width + x0:row * width + x1])
+				acount = max((x1 - x0) * (y1 - y0), 1)
+				select[face] = asum / acount < float(threshold)
+
+		mesh.polygons.foreach_set("select", select)
+		env.log(
+			f"Selected {sum(1 for sel in select if sel)} alpha faces",
+			vv_only=True)
 		return
 
 
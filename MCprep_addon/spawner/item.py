@@ -17,12 +17,11 @@
 # ##### END GPL LICENSE BLOCK #####
 
 from pathlib import Path
-from typing import Optional, Tuple
-import mathutils
+from typing import List, Optional, Tuple
 import os
 
 import bpy
-from bpy.types import Context
+from bpy.types import Context, Image, Mesh
 from bpy_extras.io_utils import ImportHelper
 
 from .. import util
@@ -34,6 +33,12 @@ try:
 except ImportError:
 	pass
 
+# Bundled with Blender, but kept optional with pure python fallbacks.
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
 # -----------------------------------------------------------------------------
 # Support functions
 # -----------------------------------------------------------------------------
@@ -101,9 +106,130 @@ def reload_items(context: Context) -> None:
 		mcprep_props.item_list_index = len(mcprep_props.item_list) - 1
 
 
+def get_item_pixel_mask(image: Image, threshold: float, transparency: bool) -> List[Tuple[int, int]]:
+	"""Return the (column, row) of each image pixel which should get a face.
+
+	Pixels with alpha below the threshold are left out if transparency is
+	set, with alpha read in one bulk call rather than a full python list.
+	"""
+	width, height = image.size[0], image.size[1]
+	if not transparency or image.channels != 4:
+		return [(col, row) for row in range(height) for col in range(width)]
+
+	alpha = generate.get_image_pixels(image)[3::4]
+	if np is not None:
+		rows, cols = np.nonzero(alpha.reshape(height, width) >= threshold)
+		return list(zip(cols.tolist(), rows.tolist()))
+	return [
+		(ind % width, ind // width)
+		for ind, val in enumerate(alpha) if val >= threshold]
+
+
+def merge_item_pixels(pixels: List[Tuple[int, int]], width: int, height: int) -> List[Tuple[int, int, int, int]]:
+	"""Greedily merge pixels into rectangles of (column, row, columns, rows).
+
+	Each rectangle grows first along its row, then upwards while the whole
+	span of the next row is also given, so it covers exactly the pixels.
+	"""
+	todo = bytearray(width * height)
+	for col, row in pixels:
+		todo[row * width + col] = 1
+
+	rects = []
+	for row in range(height):
+		for col in range(width):
+			if not todo[row * width + col]:
+				continue
+			cols = 1
+			while col + cols < width and todo[row * width + col + cols]:
+				cols += 1
+			rows = 1
+			while row + rows < height:
+				start = (row + rows) * width + col
+				if 0 in todo[start:start + cols]:
+					break
+				rows += 1
+			for done in range(row, row + rows):
+				todo[done * width + col:done * width + col + cols] = bytes(cols)
+			rects.append((col, row, cols, rows))
+	return rects
+
+
+def create_item_mesh(name: str, width: int, height: int, rects: List[Tuple[int, int, int, int]]) -> Mesh:
+	"""Build a flat mesh of one quad per pixel rectangle, with pixel exact UVs.
+
+	Rectangles are (column, row, columns, rows), see merge_item_pixels. The
+	longest side of the image spans -1 to 1, and quads share the vertices of
+	corners in common.
+	"""
+	scale_x = min(width / height, 1)
+	scale_y = min(height / width, 1)
+
+	# Index only the grid corners used by some rectangle, in order of use.
+	vert_ids = {}
+	faces = []
+	uvs = []
+	for col, row, cols, rows in rects:
+		face = []
+		for corner in (
+				(col, row), (col + cols, row),
+				(col + cols, row + rows), (col, row + rows)):
+			if corner not in vert_ids:
+				vert_ids[corner] = len(vert_ids)
+			face.append(vert_ids[corner])
+			uvs.extend((corner[0] / width, corner[1] / height))
+		faces.append(face)
+	verts = [
+		((2 * col / width - 1) * scale_x, (2 * row / height - 1) * scale_y, 0)
+		for col, row in vert_ids]
+
+	mesh = bpy.data.meshes.new(name)
+	mesh.from_pydata(verts, [], faces)
+	uv_layer = mesh.uv_layers.new(name="UVMap")
+	uv_layer.data.foreach_set("uv", uvs)
+	mesh.update()
+	return mesh
+
+
+def link_item_object(context: Context, itm_obj: bpy.types.Object) -> None:
+	"""Link a new item to the scene at the cursor, as the only selection."""
+	context.collection.objects.link(itm_obj)
+	for obj in context.selected_objects:
+		util.select_set(obj, False)
+	util.select_set(itm_obj, True)
+	util.set_active_object(context, itm_obj)
+	itm_obj.location = util.get_cursor_location(context)
+
+
+def get_item_mesh_key(abspath: str, max_pixels: int, threshold: float, transparency: bool) -> str:
+	"""Return the key identifying a merged item mesh built from these inputs.
+
+	Includes the image file's modified time, so edited images are rebuilt.
+	"""
+	mtime = os.path.getmtime(abspath) if os.path.isfile(abspath) else 0
+	return f"{abspath};{mtime};{max_pixels};{threshold:.4f};{transparency}"
+
+
+def get_cached_item_mesh(key: str) -> Optional[Mesh]:
+	"""Return an existing merged item mesh with the given key, if any.
+
+	Meshes are looked up by name, and only used if still stamped with the
+	same key, as they may have been renamed, removed, or edited since.
+	"""
+	name = env.item_meshes.get(key)
+	if name is None or name not in bpy.data.meshes:
+		return None
+	mesh = bpy.data.meshes[name]
+	if mesh.get("MCPREP_ITEM") != key or mesh.library:
+		env.item_meshes.pop(key, None)
+		return None
+	return mesh
+
+
 def spawn_item_from_filepath(
 		context: Context, path: Path, 
-		max_pixels: int, thickness: float, threshold: float, transparency: bool
+		max_pixels: int, thickness: float, threshold: float, transparency: bool,
+		greedy: bool = False
 	) -> Tuple[Optional[bpy.types.Object], Optional[str]]:
 	"""Reusable function for generating an item from an image filepath
 
@@ -114,6 +240,8 @@ def spawn_item_from_filepath(
 		thickness: Thickness of the solidfy modifier, minimum 0
 		threshold: float, alpha value below which faces will be removed
 		transparency: bool, remove faces below threshold
+		greedy: bool, merge pixels into larger faces, and reuse the mesh of
+			prior spawns with the same inputs
 	"""
 
 	# Load image and initialize objects.
@@ -122,6 +250,19 @@ def spawn_item_from_filepath(
 	name = os.path.splitext(img_str)[0]
 	abspath = bpy.path.abspath(path)
 
+	mesh_key = None
+	if greedy:
+		mesh_key = get_item_mesh_key(abspath, max_pixels, threshold, transparency)
+		mesh = get_cached_item_mesh(mesh_key)
+		if mesh:
+			itm_obj = bpy.data.objects.new(name, mesh)
+			link_item_object(context, itm_obj)
+			if thickness > 0:
+				mod = itm_obj.modifiers.new(type='SOLIDIFY', name='Solidify')
+				mod.thickness = thickness / mesh["MCPREP_ITEM_PIXELS"]
+				mod.offset = 0
+			return itm_obj, None
+
 	if img_str in bpy.data.images and bpy.path.abspath(
 			bpy.data.images[img_str].filepath) == abspath:
 		image = bpy.data.images[img_str]
@@ -148,73 +289,19 @@ def spawn_item_from_filepath(
 	if width == 0 or height == 0:
 		return None, "Image has invalid 0-size dimension"
 
-	w_even_add = (-0.5 if width % 2 == 0 else 0) + width
-	h_even_add = (-0.5 if height % 2 == 0 else 0) + height
-
-	# new method, start with a UV grid and delete faces from there
-	if bpy.app.version >= (2, 93):  # Index changed
-		bpy.ops.mesh.primitive_grid_add(
-			x_subdivisions=height,  # Outter edges count as a subdiv.
-			y_subdivisions=width,  # Outter edges count as a subdiv.
-			size=2,
-			calc_uvs=True,
-			location=(0, 0, 0))
+	# Build only the faces of kept pixels, instead of deleting from a grid
+	pixels = get_item_pixel_mask(image, threshold, transparency)
+	if greedy:
+		rects = merge_item_pixels(pixels, width, height)
 	else:
-		bpy.ops.mesh.primitive_grid_add(
-			x_subdivisions=height + 1,  # Outter edges count as a subdiv.
-			y_subdivisions=width + 1,  # Outter edges count as a subdiv.
-			size=2,
-			calc_uvs=True,
-			location=(0, 0, 0))
-	itm_obj = context.object
-
-	if not itm_obj:
-		print("Error, could not create the item primitive object")
-		return None, "Could not create the item primitive object"
-
-	# Scale the object to match ratio, keeping max dimension as set above.
-	if width < height:
-		itm_obj.scale[0] = width / height
-	elif height < width:
-		itm_obj.scale[1] = height / width
-
-	# Apply scale transform (funcitonally, applies ALL loc, rot, scale).
-	itm_obj.data.transform(itm_obj.matrix_world)
-	itm_obj.matrix_world = mathutils.Matrix()
-
-	# Deselect faces now, as setting face.select = False doens't work even
-	# though using face.select = True does work.
-	bpy.ops.object.mode_set(mode='EDIT')
-	bpy.ops.mesh.select_mode(type='FACE')  # Ideally capture initial state.
-	bpy.ops.mesh.select_all(action='DESELECT')
-	bpy.ops.object.mode_set(mode='OBJECT')
-
-	if transparency is True:
-		# Lazy load alpha part of image to memory, hold for whole operator.
-		alpha_faces = list(image.pixels)[3::4]
-		# uv = itm_obj.data.uv_layers.active
-		for face in itm_obj.data.polygons:
-			if len(face.loop_indices) < 3:
-				continue
-
-			# Since we just generated UVs and the mesh, safe to get img
-			# coords from face cetner, offset from obj center.
-			img_x = int((face.center[0] * width + w_even_add) / 2)
-			img_y = int((face.center[1] * height + h_even_add) / 2)
-
-			# Now verify this index of image is below alpha threshold.
-			if len(alpha_faces) > img_y * height + img_x:
-				alpha = alpha_faces[img_y * height + img_x]
-			else:  # This shouldn't occur, but reports were filed.
-				continue
-			if alpha < threshold:
-				face.select = True
-
-		bpy.ops.object.mode_set(mode='EDIT')
-		bpy.ops.mesh.delete(type='FACE')
-		bpy.ops.object.mode_set(mode='OBJECT')
-
-	itm_obj.location = util.get_cursor_location(context)
+		rects = [(col, row, 1, 1) for col, row in pixels]
+	mesh = create_item_mesh(name, width, height, rects)
+	if mesh_key:
+		mesh["MCPREP_ITEM"] = mesh_key
+		mesh["MCPREP_ITEM_PIXELS"] = max(width, height)
+		env.item_meshes[mesh_key] = mesh.name
+	itm_obj = bpy.data.objects.new(name, mesh)
+	link_item_object(context, itm_obj)
 
 	# Material and Textures.
 	# TODO: use the generate functions here instead
@@ -267,7 +354,7 @@ def spawn_item_from_filepath(
 		mod.thickness = thickness / max([width, height])
 		mod.offset = 0
 	itm_obj.data.name = name
-	bpy.context.object.data.materials.append(mat)
+	itm_obj.data.materials.append(mat)
 	itm_obj.name = name
 
 	# set the image, mostly just relevant to blender internal
@@ -319,6 +406,12 @@ class ItemSpawnBase():
 		name="Scale UVs",
 		default=0.75,
 		description="Scale individual UV faces of the generated item")
+	greedy: bpy.props.BoolProperty(
+		name="Merge faces",
+		description=(
+			"Merge pixels into larger faces, and share the mesh between "
+			"spawns of the same item. UV faces are not scaled"),
+		default=False)
 	filepath: bpy.props.StringProperty(
 		default="",
 		subtype="FILE_PATH",
@@ -344,9 +437,12 @@ class ItemSpawnBase():
 		else:
 			spawn_in_pose = False
 
+		# Shared merged meshes keep the size as object scale, so thickness is
+		# relative to the unscaled mesh, which spans 2 units.
+		thickness = self.thickness * (2 if self.greedy else self.size)
 		obj, status = spawn_item_from_filepath(
 			context, self.filepath, self.max_pixels,
-			self.thickness * self.size, self.threshold, self.transparency)
+			thickness, self.threshold, self.transparency, self.greedy)
 
 		# apply additional settings
 		# generate materials via prep, without re-loading image datablock
@@ -363,9 +459,10 @@ class ItemSpawnBase():
 		# Apply other settings such as overall object scale and uv face scale.
 		for i in range(3):
 			obj.scale[i] *= 0.5 * self.size
-		bpy.ops.object.transform_apply(scale=True, location=False)
-		bpy.ops.mcprep.scale_uv(
-			scale=self.scale_uvs, selected_only=False, skipUsage=True)
+		if not self.greedy:
+			bpy.ops.object.transform_apply(scale=True, location=False)
+			bpy.ops.mcprep.scale_uv(
+				scale=self.scale_uvs, selected_only=False, skipUsage=True)
 
 		# If originally in pose mode, do any further movement and parenting.
 		if spawn_in_pose:
@@ -16,16 +16,21 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 import os
 import json
+import posixpath
+import time
 from mathutils import Vector
-from math import sin, cos, radians
+from math import ceil, sin, cos, radians
 from pathlib import Path
-from typing import Dict, Optional, Tuple, Union, Sequence
+from typing import Dict, List, Optional, Tuple, Union, Sequence
 
 import bpy
 import bmesh
-from bpy.types import Context, Material
+from bpy.app.handlers import persistent
+from bpy.types import Context, Material, Mesh
 from bpy_extras.io_utils import ImportHelper
 
 from ..conf import env, VectorType
@@ -157,6 +162,30 @@ def add_material(
 	return mat
 
 
+def get_model_pack_stack(
+	context: Context, model_filepath: Path) -> generate.PackStack:
+	"""Returns the layered resource packs used to resolve a model.
+
+	The pack containing the model itself takes priority, followed by the
+	active resource pack, then the default pack from user preferences.
+	"""
+	addon_prefs = util.get_user_preferences(context)
+
+	# Go from:      pack/assets/minecraft/models/block/block.json
+	# to 5 dirs up: pack/
+	targets_folder = bpy.path.abspath(
+		os.path.dirname(
+			os.path.dirname(
+				os.path.dirname(
+					os.path.dirname(
+						os.path.dirname(model_filepath))))))
+	# Fallback directories, which should already be resource pack paths.
+	resource_folder = bpy.path.abspath(context.scene.mcprep_texturepack_path)
+	fallback_folder = bpy.path.abspath(addon_prefs.custom_texturepack_path)
+	return generate.get_pack_stack(
+		[targets_folder, resource_folder, fallback_folder])
+
+
 def locate_image(
 	context: Context, textures: Dict[str, str], img: str, model_filepath: Path
 ) -> Path:
@@ -179,78 +208,149 @@ def locate_image(
 				namespace = local_path.split(":")[0]
 				local_path = local_path.split(":")[1]
 
+			if namespace == "minecraft":
+				# Pick from the first pack layer which defines this texture.
+				stack = get_model_pack_stack(context, model_filepath)
+				found = stack.find_texture_path(local_path + ".png")
+				if found is not None:
+					return os.path.realpath(found)
+
 			directory = os.path.join(
 				resource_folder, "assets", namespace, "textures")
 		return os.path.realpath(os.path.join(directory, local_path) + ".png")
 
 
+def load_model_json(model_filepath: Path) -> Dict:
+	"""Read and parse a single model file, without resolving its parents."""
+	try:
+		with open(model_filepath, 'r') as f:
+			return json.load(f)
+	except PermissionError as e:
+		print(e)
+		raise ModelException("Permission error, try running as admin") from e
+	except UnicodeDecodeError as e:
+		print(e)
+		raise ModelException("Could not read file, select valid json file") from e
+
+
+def get_parent_model_path(
+	obj_data: Dict, stack: generate.PackStack
+) -> Optional[Path]:
+	"""Return the file of a model's parent, or None if not a file or found.
+
+	Builtin parents, such as item/generated, have no file to read.
+	"""
+	parent = obj_data.get("parent")
+	if parent is None:
+		return None
+	if parent == "builtin/generated" or parent == "item/generated":
+		return None  # generates the model from the texture
+	if parent == "builtin/entity":
+		# model from an entity file, only for chests, ender chests, mob
+		# heads, shields, banners and tridents.
+		return None
+
+	if len(parent.split(":")) == 1:
+		namespace = "minecraft"
+		parent_filepath = parent
+	else:
+		namespace = parent.split(":")[0]
+		parent_filepath = parent.split(":")[1]
+
+	parent_path = stack.find_model(
+		posixpath.join(namespace, "models", f"{parent_filepath}.json"))
+	if parent_path is None:
+		env.log(f"Failed to find mcmodel file {parent_filepath}")
+	return parent_path
+
+
 def read_model(
-	context: Context, model_filepath: Path) -> Tuple[Element, Texture]:
+	context: Context,
+	model_filepath: Path,
+	stack: Optional[generate.PackStack] = None,
+	chain: Optional[List[Path]] = None,
+	preloaded: Optional[Dict[str, Dict]] = None
+) -> Tuple[Element, Texture]:
 	"""Reads json file to get textures and elements needed for model.
 
 	This function is recursively called to also get the elements and textures
 	from the parent models the elements from the child will always overwrite
 	the parent's elements individual textures from the child will overwrite the
 	same texture from the parent.
+
+	Parents are resolved through the layered packs of the initial model, see
+	get_model_pack_stack, which is passed along to each recursive call. If a
+	chain list is given, each model file read is appended to it. Files in
+	preloaded, of normalized path to already parsed json, are not read again.
+
+	Resolved models are kept in env.model_cache, so shared parents such as
+	block/cube are only read once. These are read again once any file in
+	their chain is modified, or the stack's model catalogs change.
 	"""
+	if stack is None:
+		stack = get_model_pack_stack(context, model_filepath)
+
+	key = (
+		os.path.normpath(model_filepath),
+		tuple(str(folder) for folder in stack.folders))
+	resolved = get_resolved_model(key, stack)
+	if resolved is None:
+		resolved = resolve_model(context, model_filepath, stack, preloaded)
+		env.model_cache[key] = resolved
+	_, stamp, elements, textures = resolved
+
+	if chain is not None:
+		chain.extend(path for path, _ in stamp)
+	if textures is not None:
+		textures = dict(textures)  # Children overwrite entries of parents
+	return elements, textures
+
+
+def get_resolved_model(
+	key: Tuple[str, Tuple[str, ...]], stack: generate.PackStack
+) -> Optional[Tuple]:
+	"""Return the cached resolve_model result of a key, if still current."""
+	resolved = env.model_cache.get(key)
+	if resolved is None:
+		return None
+	if resolved[0] != stack.model_generation():
+		return None
 	try:
-		with open(model_filepath, 'r') as f:
-			obj_data = json.load(f)
-	except PermissionError as e:
-		print(e)
-		raise ModelException("Permission error, try running as admin") from e
-	except UnicodeDecodeError as e:
-		print(e)
-		raise ModelException("Could not read file, select valid json file") from e
+		if any(os.path.getmtime(path) != mtime for path, mtime in resolved[1]):
+			return None
+	except OSError:
+		return None
+	return resolved
 
-	addon_prefs = util.get_user_preferences(context)
 
-	# Go from:      pack/assets/minecraft/models/block/block.json
-	# to 5 dirs up: pack/
-	targets_folder = bpy.path.abspath(
-		os.path.dirname(
-			os.path.dirname(
-				os.path.dirname(
-					os.path.dirname(
-						os.path.dirname(model_filepath))))))
-	# Fallback directories, which should already be resource pack paths.
-	resource_folder = bpy.path.abspath(context.scene.mcprep_texturepack_path)
-	fallback_folder = bpy.path.abspath(addon_prefs.custom_texturepack_path)
+def resolve_model(
+	context: Context,
+	model_filepath: Path,
+	stack: generate.PackStack,
+	preloaded: Optional[Dict[str, Dict]] = None
+) -> Tuple[Tuple[int, ...], List[Tuple[str, float]], Element, Texture]:
+	"""Read a model file, merged on top of its (cached) parent models.
+
+	Returns:
+		tuple: model catalog generation of the stack when resolved
+		list: of path and modified time, for this file and all its parents
+		elements and textures, as per read_model
+	"""
+	generation = stack.model_generation()
+	chain = [model_filepath]
+	obj_data = None
+	if preloaded:
+		obj_data = preloaded.get(os.path.normpath(model_filepath))
+	if obj_data is None:
+		obj_data = load_model_json(model_filepath)
 
 	elements: Optional[Element] = None
 	textures: Optional[Texture] = None
 
-	parent = obj_data.get("parent")
-	if parent is not None:
-		if parent == "builtin/generated" or parent == "item/generated":
-			pass  # generates the model from the texture
-		elif parent == "builtin/entity":
-			# model from an entity file, only for chests, ender chests, mob
-			# heads, shields, banners and tridents.
-			pass
-		else:
-			if len(parent.split(":")) == 1:
-				namespace = "minecraft"
-				parent_filepath = parent
-			else:
-				namespace = parent.split(":")[0]
-				parent_filepath = parent.split(":")[1]
-
-			# resource_folder
-			models_dir = os.path.join(
-				"assets", namespace, "models", f"{parent_filepath}.json")
-			target_path = os.path.join(targets_folder, models_dir)
-			active_path = os.path.join(resource_folder, models_dir)
-			base_path = os.path.join(fallback_folder, models_dir)
-
-			if os.path.isfile(target_path):
-				elements, textures = read_model(context, target_path)
-			if os.path.isfile(active_path):
-				elements, textures = read_model(context, active_path)
-			elif os.path.isfile(base_path):
-				elements, textures = read_model(context, base_path)
-			else:
-				env.log(f"Failed to find mcmodel file {parent_filepath}")
+	parent_path = get_parent_model_path(obj_data, stack)
+	if parent_path is not None:
+		elements, textures = read_model(
+			context, parent_path, stack, chain, preloaded)
 
 	current_elements: Element = obj_data.get("elements")
 	if current_elements is not None:
@@ -269,30 +369,261 @@ def read_model(
 	# env.log("elements:" + str(elements))
 	# env.log("textures:" + str(textures))
 
-	return elements, textures
+	stamp = [(str(path), os.path.getmtime(path)) for path in chain]
+	return generation, stamp, elements, textures
 
 
-def add_model(
-	model_filepath: Path, obj_name: str = "MinecraftModel"
-) -> Tuple[int, bpy.types.Object]:
-	"""Primary function for generating a model from json file."""
-	collection = bpy.context.collection
-	view_layer = bpy.context.view_layer
+def get_model_mesh_key(model_filepath: Path, stack: generate.PackStack) -> str:
+	"""Return the key of a model's cached mesh, from its path and pack stack."""
+	folders = "|".join(str(folder) for folder in stack.folders)
+	return f"{os.path.normpath(model_filepath)};{folders}"
+
+
+def get_model_chain_stamp(chain: List[Path]) -> str:
+	"""Return the files and modified times of a model and its parents."""
+	return json.dumps([
+		[str(path), os.path.getmtime(path)] for path in chain])
+
+
+def get_cached_model_mesh(key: str) -> Optional[Mesh]:
+	"""Return a prior mesh of this model key, if none of its files changed.
+
+	Meshes are looked up by name in env.model_meshes, and store the model
+	files they were built from, see read_model. They are no longer used
+	once renamed, removed, or any of these files are modified or removed.
+	Cached meshes keep a fake user, as single user spawns only use copies,
+	which is cleared once stale so that unused ones can be purged.
+	"""
+	name = env.model_meshes.get(key)
+	if name is None or name not in bpy.data.meshes:
+		return None
+	mesh = bpy.data.meshes[name]
+	if not mesh.library and mesh.get("MCPREP_MODEL") == key:
+		try:
+			chain = json.loads(mesh.get("MCPREP_MODEL_CHAIN", "[]"))
+			if chain and all(
+					os.path.getmtime(path) == mtime for path, mtime in chain):
+				return mesh
+		except (OSError, ValueError, TypeError):
+			pass
+		mesh.use_fake_user = False
+	env.model_meshes.pop(key, None)
+	return None
+
+
+@persistent
+def index_model_meshes(scene):
+	"""Rebuild env.model_meshes from the cached meshes of the loaded file."""
+	env.model_meshes = {
+		mesh["MCPREP_MODEL"]: mesh.name for mesh in bpy.data.meshes
+		if not mesh.library and "MCPREP_MODEL" in mesh}
+
+
+def get_model_mesh(
+	context: Context,
+	model_filepath: Path,
+	preloaded: Optional[Dict[str, Dict]] = None,
+	bm: Optional[bmesh.types.BMesh] = None
+) -> Optional[Mesh]:
+	"""Return the mesh of a model, reusing a prior build if still current.
+
+	The mesh and its materials are named after the model file, as they are
+	shared by all later spawns of the model. Returns None if the model has
+	no geometry elements. See read_model for preloaded, and build_model_mesh
+	for bm.
+	"""
+	stack = get_model_pack_stack(context, model_filepath)
+	key = get_model_mesh_key(model_filepath, stack)
+	mesh = get_cached_model_mesh(key)
+	if mesh is not None:
+		return mesh
 
 	# Called recursively!
 	# Can raise ModelException due to permission or corrupted file data.
-	elements, textures = read_model(bpy.context, model_filepath)
+	chain = []
+	elements, textures = read_model(
+		context, model_filepath, stack, chain, preloaded)
 
 	if elements is None:
+		return None
+
+	model_name = os.path.splitext(os.path.basename(model_filepath))[0]
+	mesh = build_model_mesh(model_filepath, model_name, elements, textures, bm)
+	mesh["MCPREP_MODEL"] = key
+	mesh["MCPREP_MODEL_CHAIN"] = get_model_chain_stamp(chain)
+	mesh.use_fake_user = True
+	env.model_meshes[key] = mesh.name
+	return mesh
+
+
+def add_model(
+	model_filepath: Path, obj_name: str = "MinecraftModel",
+	share_mesh: bool = False
+) -> Tuple[int, bpy.types.Object]:
+	"""Primary function for generating a model from json file.
+
+	Built meshes are kept per model and pack stack, so spawning the same
+	model again skips reading and building it. By default the new object
+	gets its own copy of that mesh, or with share_mesh uses it directly.
+	"""
+	collection = bpy.context.collection
+	view_layer = bpy.context.view_layer
+
+	mesh = get_model_mesh(bpy.context, model_filepath)
+	if mesh is None:
 		return 1, None
 
-	mesh = bpy.data.meshes.new(obj_name)  # add a new mesh
+	if not share_mesh:
+		mesh = mesh.copy()
+		mesh.use_fake_user = False
+		del mesh["MCPREP_MODEL"]
+		del mesh["MCPREP_MODEL_CHAIN"]
+
 	obj = bpy.data.objects.new(obj_name, mesh)  # add a new object using the mesh
 	collection.objects.link(obj)  # put the object into the scene (link)
 	view_layer.objects.active = obj  # set as the active object in the scene
 	obj.select_set(True)  # select object
+	return 0, obj
+
+
+@dataclass
+class ModelSpawnResult:
+	"""Outcome of one model spawned by spawn_models
+
+	filepath: path of the model file
+	obj: the new object, or None if the model failed
+	error: why the model failed, or None
+	duration: seconds spent resolving and building the model
+	"""
+	filepath: str
+	obj: Optional[bpy.types.Object] = None
+	error: Optional[str] = None
+	duration: float = 0.0
+
+
+def spawn_models(
+	context: Context,
+	model_paths: Sequence[Path],
+	spacing: Optional[float] = None,
+	share_mesh: bool = False
+) -> List[ModelSpawnResult]:
+	"""Spawn many models at once, such as for pack previews or QA runs.
+
+	All model files, and any parent files not already resolved, are parsed
+	up front in parallel, one level of parents at a time. Models are then
+	resolved and built on the main thread into one reused bmesh. With
+	spacing, the new objects are laid out in a square grid, this distance
+	apart.
+
+	Returns a result per model path in the same order, failures included.
+	"""
+	paths = [os.path.normpath(path) for path in model_paths]
+	if not paths:
+		return []
 
+	def load(path: str) -> Union[Dict, Exception]:
+		try:
+			return load_model_json(path)
+		except (ModelException, OSError, ValueError) as e:
+			return e
+
+	# Parents are resolved through the pack stack of the model using them
+	stacks = {path: get_model_pack_stack(context, path) for path in paths}
+	parsed = {}
+
+	# File reads release the GIL, so these can overlap.
+	workers = max(1, min(len(paths), os.cpu_count() or 1))
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		pending = list(dict.fromkeys(paths))
+		while pending:
+			parsed.update(zip(pending, executor.map(load, pending)))
+			parents = {}
+			for path in pending:
+				if isinstance(parsed[path], Exception):
+					continue
+				stack = stacks[path]
+				parent_path = get_parent_model_path(parsed[path], stack)
+				if parent_path is None:
+					continue
+				parent_path = os.path.normpath(parent_path)
+				if parent_path in parsed or parent_path in parents:
+					continue
+				key = (parent_path, tuple(str(folder) for folder in stack.folders))
+				if get_resolved_model(key, stack) is None:
+					stacks.setdefault(parent_path, stack)
+					parents[parent_path] = None
+			pending = list(parents)
+	preloaded = {
+		path: data for path, data in parsed.items()
+		if not isinstance(data, Exception)}
+
+	collection = context.collection
+	columns = ceil(len(paths) ** 0.5)
+	placed = 0
+	results = []
 	bm = bmesh.new()
+	try:
+		for path in paths:
+			res = ModelSpawnResult(filepath=path)
+			results.append(res)
+			if isinstance(parsed[path], Exception):
+				res.error = str(parsed[path])
+				continue
+
+			obj_name = os.path.splitext(os.path.basename(path))[0]
+			t0 = time.time()
+			try:
+				mesh = get_model_mesh(context, path, preloaded, bm)
+			except Exception as e:
+				# Report malformed models, rather than abort the whole batch
+				res.error = f"{type(e).__name__}: {e}"
+				continue
+			finally:
+				res.duration = time.time() - t0
+			if mesh is None:
+				res.error = "Model does not contain any geometry elements"
+				continue
+
+			if not share_mesh:
+				mesh = mesh.copy()
+				mesh.use_fake_user = False
+				del mesh["MCPREP_MODEL"]
+				del mesh["MCPREP_MODEL_CHAIN"]
+			obj = bpy.data.objects.new(obj_name, mesh)
+			collection.objects.link(obj)
+			obj.select_set(True)
+			if spacing is not None:
+				row, col = divmod(placed, columns)
+				obj.location = (row * spacing, col * spacing, 0)
+			placed += 1
+			res.obj = obj
+	finally:
+		bm.free()
+
+	failed = sum(1 for res in results if res.error)
+	env.log(f"Spawned {len(results) - failed} models, {failed} failed")
+	return results
+
+
+def build_model_mesh(
+	model_filepath: Path,
+	obj_name: str,
+	elements: Element,
+	textures: Texture,
+	bm: Optional[bmesh.types.BMesh] = None
+) -> Mesh:
+	"""Build the mesh and materials of a model, as read by read_model.
+
+	A given bmesh is cleared and reused instead of creating a new one, and
+	is left for the caller to free.
+	"""
+	mesh = bpy.data.meshes.new(obj_name)  # add a new mesh
+
+	owns_bm = bm is None
+	if owns_bm:
+		bm = bmesh.new()
+	else:
+		bm.clear()
 
 	mesh.uv_layers.new()
 	uv_layer = bm.loops.layers.uv.verify()
@@ -303,7 +634,7 @@ def add_model(
 			if img != "particle":
 				tex_pth = locate_image(bpy.context, textures, img, model_filepath)
 				mat = add_material(f"{obj_name}_{img}", tex_pth, use_name=False)
-				obj_mats = obj.data.materials
+				obj_mats = mesh.materials
 				if f"#{img}" not in materials:
 					obj_mats.append(mat)
 					materials.append(f"#{img}")
@@ -390,8 +721,9 @@ def add_model(
 
 	# make the bmesh the object's mesh
 	bm.to_mesh(mesh)
-	bm.free()
-	return 0, obj
+	if owns_bm:
+		bm.free()
+	return mesh
 
 
 # -----------------------------------------------------------------------------
@@ -493,6 +825,12 @@ class ModelSpawnBase():
 			("center", "Snap center", "Snap to block center"),
 			("offset", "Snap offset", "Snap to block center with 0.5 offset")],
 		description="Automatically snap to whole block locations")
+	single_user: bpy.props.BoolProperty(
+		name="Single user",
+		description=(
+			"Give the model its own mesh, instead of sharing the mesh of "
+			"prior spawns of the same model"),
+		default=True)
 	skipUsage: bpy.props.BoolProperty(
 		default=False,
 		options={'HIDDEN'})
@@ -546,7 +884,9 @@ class MCPREP_OT_spawn_minecraft_model(bpy.types.Operator, ModelSpawnBase):
 			return {'CANCELLED'}
 
 		try:
-			r, obj = add_model(os.path.normpath(self.filepath), name)
+			r, obj = add_model(
+				os.path.normpath(self.filepath), name,
+				share_mesh=not self.single_user)
 			if r:
 				self.report(
 					{"ERROR"}, "The JSON model does not contain any geometry elements")
@@ -588,7 +928,9 @@ class MCPREP_OT_import_minecraft_model_file(
 			return {'CANCELLED'}
 
 		try:
-			r, obj = add_model(os.path.normpath(self.filepath), filename)
+			r, obj = add_model(
+				os.path.normpath(self.filepath), filename,
+				share_mesh=not self.single_user)
 			if r:
 				self.report(
 					{"ERROR"}, "The JSON model does not contain any geometry elements")
@@ -625,9 +967,14 @@ def register():
 		bpy.utils.register_class(cls)
 
 	bpy.types.TOPBAR_MT_file_import.append(draw_import_mcmodel)
+	bpy.app.handlers.load_post.append(index_model_meshes)
 
 
 def unregister():
 	bpy.types.TOPBAR_MT_file_import.remove(draw_import_mcmodel)
 	for cls in reversed(classes):
 		bpy.utils.unregister_class(cls)
+	try:
+		bpy.app.handlers.load_post.remove(index_model_meshes)
+	except Exception as e:
+		print("Unregister post handler error: ", e)
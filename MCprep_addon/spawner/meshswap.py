@@ -18,7 +18,7 @@
 
 
 from dataclasses import dataclass
-from typing import Dict, List, Union, Tuple
+from typing import Any, Dict, List, Optional, Union, Tuple
 import math
 from .. import world_tools
 import mathutils
@@ -35,6 +35,12 @@ from ..materials import generate
 from .. import util
 from .. import tracking
 
+# Bundled with Blender, but kept optional with pure python fallbacks.
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
 
 # -----------------------------------------------------------------------------
 # Mesh swap functions
@@ -44,12 +50,87 @@ meshswap_cache = {}
 meshswap_cache_path = None
 
 
+class MeshswapAssetCache(util.FileRecordCache):
+	"""Persistent store of meshswap library contents between sessions.
+
+	Each record holds the library's group and object names, and the swap
+	props of each asset once it has been loaded, see read_swap_props and
+	util.FileRecordCache for how records are stored. Malformed records, such
+	as from a hand edited cache file, are treated as missing.
+	"""
+
+	def _is_valid(self, record: Any) -> bool:
+		if not isinstance(record, dict):
+			return False
+		if not isinstance(record.get("props"), dict):
+			return False
+		for key in ("groups", "objects"):
+			names = record.get(key)
+			if not isinstance(names, list):
+				return False
+			if not all(isinstance(name, str) for name in names):
+				return False
+		return True
+
+	def set_names(self, filepath: str, groups: List[str], objects: List[str]) -> None:
+		"""Record the group and object names of a library, dropping any props."""
+		self.put(filepath, {
+			"groups": list(groups), "objects": list(objects), "props": {}})
+
+	def get_props(self, filepath: str, key: str) -> Optional[Dict[str, Any]]:
+		"""Returns the recorded swap props of an asset, key per get_asset_key."""
+		record = self.get(filepath)
+		if record is None:
+			return None
+		props = record["props"].get(key)
+		if not isinstance(props, dict):
+			return None
+		if any(not isinstance(props.get(flag), bool) for flag in SWAP_FLAGS):
+			return None
+		variance = props.get("variance")
+		if not isinstance(variance, list) or len(variance) != 2:
+			return None
+		return props
+
+	def set_props(self, filepath: str, key: str, props: Dict[str, Any]) -> None:
+		"""Record the swap props of an asset in an already recorded library."""
+		record = self.get(filepath)
+		if record is None or record["props"].get(key) == props:
+			return
+		# Unserializable props, e.g. array variance values, are not stored
+		# and just read again next time.
+		self.put(filepath, dict(record, props=dict(record["props"], **{key: props})))
+
+
+def get_meshswap_asset_cache() -> MeshswapAssetCache:
+	"""Returns the shared meshswap asset cache, loading it on first use."""
+	if env.meshswap_asset_cache is None:
+		env.meshswap_asset_cache = MeshswapAssetCache(env.meshswap_asset_cache_file)
+	return env.meshswap_asset_cache
+
+
+def get_meshswap_filepath(context: Context) -> str:
+	"""Returns the normalized absolute path of the meshswap library."""
+	return os.path.normpath(bpy.path.abspath(context.scene.meshswap_path))
+
+
+def get_asset_key(name: str, is_group: bool) -> str:
+	"""Returns the key of a library asset within a MeshswapAssetCache record."""
+	return f"{'group' if is_group else 'object'}:{name}"
+
+
 def get_meshswap_cache(context: Context, clear: bool=False) -> Dict[str, List[str]]:
-	"""Load groups/objects from meshswap lib if not cached, return key vars."""
+	"""Load groups/objects from meshswap lib if not cached, return key vars.
+
+	Names are read from the persistent MeshswapAssetCache when the library is
+	unchanged since last read, so the library is only opened when needed. With
+	clear, the library is always read again and its record replaced.
+	"""
 	global meshswap_cache
 	global meshswap_cache_path  # used to auto-clear path if bpy prop changed
 
 	meshswap_path = context.scene.meshswap_path
+	reload = clear
 	if not meshswap_cache_path:
 		meshswap_cache_path = meshswap_path
 		clear = True
@@ -67,6 +148,14 @@ def get_meshswap_cache(context: Context, clear: bool=False) -> Dict[str, List[st
 		env.log("Meshswap path must be a .blend file")
 		return meshswap_cache
 
+	filepath = get_meshswap_filepath(context)
+	asset_cache = get_meshswap_asset_cache()
+	record = None if reload else asset_cache.get(filepath)
+	if record is not None:
+		meshswap_cache["groups"] = list(record["groups"])
+		meshswap_cache["objects"] = list(record["objects"])
+		return meshswap_cache
+
 	with bpy.data.libraries.load(meshswap_path) as (data_from, _):
 		grp_list = spawn_util.filter_collections(data_from)
 
@@ -77,6 +166,8 @@ def get_meshswap_cache(context: Context, clear: bool=False) -> Dict[str, List[st
 				continue
 			# ignore list? e.g. Point.001,
 			meshswap_cache["objects"].append(obj)
+	asset_cache.set_names(
+		filepath, meshswap_cache["groups"], meshswap_cache["objects"])
 	return meshswap_cache
 
 
@@ -160,12 +251,392 @@ def updateMeshswapList(context: Context) -> None:
 		item.description = itm[3]
 
 
+def get_face_cell(local: VectorType, normal: VectorType, outside_hanging: int) -> List[int]:
+	"""Return the block a face belongs to, from its local center and normal.
+
+	Transform so centers are half ints (jmc2obj default), from local coords.
+	Faces on the unit block boundary are first nudged along their normal,
+	to the block in front of (outside_hanging=1) or behind (-1) the face.
+	"""
+	if util.face_on_edge(local):
+		return [
+			round(loc + nrm * 0.1 * outside_hanging)
+			for loc, nrm in zip(local, normal)]
+	return [round(loc) for loc in local]
+
+
+def get_face_cells(local: "np.ndarray", normals: "np.ndarray", outside_hanging: int) -> "np.ndarray":
+	"""Vectorized get_face_cell, over (n, 3) arrays of centers and normals."""
+	decimals = local - np.floor(local)
+	on_edge = (
+		((decimals[:, 0] > 0.4999) & (decimals[:, 0] < 0.501))
+		| ((decimals[:, 1] > 0.499) & (decimals[:, 1] < 0.501))
+		| ((decimals[:, 2] > 0.499) & (decimals[:, 2] < 0.501)))
+	shift = normals * 0.1 * outside_hanging
+	shifted = np.where(on_edge[:, None], local + shift, local)
+	return np.round(shifted).astype(np.int64)
+
+
+# Rotations of instances, from the offset of each face's center to its block
+# cell. Rules are (axis, lower, upper, rot_type) for lower < offset < upper,
+# with axis 0, 1, 2 for x, y, z. The first matching rule applies, otherwise
+# the default rot_type.
+HANGING_ROTATIONS = ([
+	(1, -math.inf, 0, 8),
+	(0, 0.3, math.inf, 7),
+	(2, 0.3, math.inf, 0),
+	(2, -math.inf, -0.3, 6)], 5)
+TORCHLIKE_ROTATIONS = {
+	"jmc2obj": ([
+		(0, 0.1, 0.4, 1),
+		(2, 0.1, 0.4, 2),
+		(0, -0.4, -0.1, 3),
+		(2, -0.4, -0.1, 4)], 0),
+	"Mineways": ([
+		(0, 0.1, 0.6, 1),
+		(2, 0.1, 0.6, 2),
+		(0, -0.6, -0.1, 3),
+		(2, -0.6, -0.1, 4)], 0),
+}
+
+
+def get_rotation_rules(exporter: str, swapProps: Dict[str, str]) -> Tuple[List[Tuple[int, float, float, int]], int]:
+	"""Return the rotation rules and default rot_type for a swapped object."""
+	if exporter not in TORCHLIKE_ROTATIONS:
+		return [], 0
+	if swapProps['torchlike']:  # needs fixing
+		return TORCHLIKE_ROTATIONS[exporter]
+	elif swapProps['edgeFloat']:
+		return HANGING_ROTATIONS
+	elif swapProps['edgeFlush']:
+		# actually 6 cases here, can need rotation below...
+		# currently not necessary/used, so not programmed..
+		return [], 0
+	elif swapProps['doorlike']:
+		return HANGING_ROTATIONS
+	return [], 0
+
+
+def get_rot_types(faces: "FaceArrays", rules: List[Tuple[int, float, float, int]], default: int) -> List[int]:
+	"""Classify the rotation of each face's instance, see get_rotation_rules."""
+	if not rules:
+		return [default] * len(faces)
+
+	if np is None:
+		rot_types = []
+		for cell, local in zip(faces.c, faces.l):
+			diffs = [c - l for c, l in zip(cell, local)]
+			for axis, lower, upper, rot_type in rules:
+				if lower < diffs[axis] < upper:
+					rot_types.append(rot_type)
+					break
+			else:
+				rot_types.append(default)
+		return rot_types
+
+	cells = np.asarray(faces.c, dtype=np.float64).reshape(-1, 3)
+	local = np.asarray(faces.l, dtype=np.float64).reshape(-1, 3)
+	diffs = cells - local
+	conditions = [
+		(lower < diffs[:, axis]) & (diffs[:, axis] < upper)
+		for axis, lower, upper, _ in rules]
+	choices = [rot_type for _, _, _, rot_type in rules]
+	return np.select(conditions, choices, default).tolist()
+
+
+# Material names of extra mesh pieces per exporter, removed when swapping.
+REMOVABLE_BLOCKS = {
+	"jmc2obj": [
+		'book', 'brewing_stand', 'cactus_bottom', 'cactus_top', 'campfire_fire',
+		'campfire_log_lit', 'door_acacia_upper', 'door_birch_upper',
+		'door_dark_oak_upper', 'door_iron_top', 'door_jungle_upper',
+		'door_spruce_upper', 'door_wood_top', 'double_plant_grass_top',
+		'enchant_table_bottom', 'enchant_table_side', 'furnace_side',
+		'furnace_top', 'pumpkin_side_lit', 'pumpkin_top_lit', 'sunflower_back',
+		'sunflower_front', 'sunflower_top', 'tnt_bottom', 'tnt_side',
+		'torch_flame', 'workbench_back', 'workbench_front'
+	],
+	"Mineways": [
+		'acacia_door_top', 'birch_door_top', 'cactus_top', 'campfire_fire',
+		'campfire_log_lit', 'dark_oak_door_top', 'enchanting_table_side',
+		'iron_door_top', 'jungle_door_top', 'oak_door_top',
+		'spruce_door_top', 'sunflower_back', 'sunflower_front',
+		'sunflower_top', 'tall_grass_top', 'tnt_bottom' 'tnt_side'
+	],
+}
+
+# Custom properties flagging how a meshswap asset is placed.
+# edgeFlush: blocks perfectly on edges, require rotation
+# edgeFloat: floating off edge into air, require rotation ['vines','ladder','lilypad']
+# torchlike: ['torch','redstone_torch_on','redstone_torch_off']
+# removable: to be removed
+# doorlike: appears like a door
+# frontFaceRotate: rotate mesh with this material's face forward (+y local=default)
+SWAP_FLAGS = (
+	"edgeFlush", "edgeFloat", "torchlike", "removable", "doorlike",
+	"frontFaceRotate")
+
+
+def read_swap_props(asset: Union[bpy.types.Object, Collection]) -> Dict[str, Any]:
+	"""Returns the swap flags and variance set on a meshswap object or group.
+
+	Variance is for varied positions from exactly center on the block:
+	[True, 1] for x, y, z random, [True, 0] for only x, y random.
+	"""
+	props = {flag: False for flag in SWAP_FLAGS}
+	props['variance'] = [False, 0]  # needs to be in this structure
+	for key, value in asset.items():
+		if hasattr(value, "name"):
+			continue  # ID property, not a flag
+		if key == 'variance':
+			props['variance'] = [True, value]
+		elif key in props:
+			props[key] = True
+	return props
+
+
 @dataclass
-class FaceStruct:
-	"""Structure class for preprocessed faces of a mesh"""
-	n: VectorType  # For normal_coord
-	g: VectorType  # For global_coord
-	l: VectorType  # For local_coord
+class FaceArrays:
+	"""Structure class for preprocessed faces of a mesh, one row per face.
+
+	Each field is an (n, 3) numpy array, or a list of per face lists when
+	numpy is not available.
+	"""
+	n: Any  # For normal_coord
+	g: Any  # For global_coord
+	l: Any  # For local_coord
+	c: Any  # For block cell, see get_face_cells
+
+	def __len__(self) -> int:
+		return len(self.c)
+
+
+def get_face_list(swap: bpy.types.Object, offset: float, outside_hanging: int = -1) -> FaceArrays:
+	"""Returns the relevant faces and their mapped coordinates.
+
+	Offset is for Mineways to virtually shift all block centers to half ints
+
+	Returns rows of n (normal), g (global pos), l (local pos), c (block cell)
+	"""
+	polys = swap.data.polygons
+	if np is None:
+		faces = FaceArrays([], [], [], [])
+		for poly in polys:
+			if 0.015 < poly.area and poly.area < 0.016:
+				# hack to avoid too many torches show up, both jmc2obj and Mineways
+				continue
+			gtmp = util.matmul(
+				swap.matrix_world, mathutils.Vector(poly.center))
+			n = list(poly.normal)  # in local coordinates
+			l = [val + offset for val in poly.center]
+			faces.n.append(n)
+			faces.g.append([gtmp[0] + offset, gtmp[1] + offset, gtmp[2] + offset])
+			faces.l.append(l)
+			faces.c.append(get_face_cell(l, n, outside_hanging))
+		return faces
+
+	count = len(polys)
+	centers = np.empty(count * 3, dtype=np.float32)
+	normals = np.empty(count * 3, dtype=np.float32)
+	areas = np.empty(count, dtype=np.float32)
+	polys.foreach_get("center", centers)
+	polys.foreach_get("normal", normals)
+	polys.foreach_get("area", areas)
+
+	# hack to avoid too many torches show up, both jmc2obj and Mineways
+	areas = areas.astype(np.float64)
+	keep = ~((0.015 < areas) & (areas < 0.016))
+	centers = centers.reshape(-1, 3)[keep].astype(np.float64)
+	normals = normals.reshape(-1, 3)[keep].astype(np.float64)
+
+	matrix = np.array(swap.matrix_world, dtype=np.float64)
+	glob = centers @ matrix[:3, :3].T + matrix[:3, 3] + offset
+	local = centers + offset
+	cells = get_face_cells(local, normals, outside_hanging)
+	return FaceArrays(normals, glob, local, cells)
+
+
+def get_instance_transform(
+	swap: bpy.types.Object, loc_local: VectorType, rot: int, variance: List
+) -> Tuple[mathutils.Vector, mathutils.Euler, mathutils.Vector]:
+	"""Returns the world location, rotation and scale of a single instance.
+
+	Arguments:
+		swap: the object being swapped, instances are placed relative to it
+		loc_local: the instance location local to swap
+		rot: rot_type of the instance, see get_rotation_rules
+		variance: the [bool, int] variance setting of the swapped block
+	"""
+	loc = util.matmul(swap.matrix_world, mathutils.Vector(loc_local))
+	rotation = swap.rotation_euler.copy()
+
+	# special case of un-applied,
+	# 90(+/- 0.01)-0-0 rotation on source (y-up conversion)
+	checkcon = swap.rotation_euler[0] >= math.pi / 2 - .01
+	checkcon &= swap.rotation_euler[0] <= math.pi / 2 + .01
+	checkcon &= swap.rotation_euler[1] == 0
+	checkcon &= swap.rotation_euler[2] == 0
+	if checkcon:
+		rotation[0] -= math.pi / 2
+
+	# rotation/translation for walls
+	x, y, offset, rotValue, z = 0, 0, 0.28, 0.436332, 0.12
+
+	if rot == 1:
+		# torch rotation 1
+		x = -offset
+		loc += mathutils.Vector((x, y, z))
+		rotation[1] += rotValue
+	elif rot == 2:
+		# torch rotation 2
+		y = offset
+		loc += mathutils.Vector((x, y, z))
+		rotation[0] += rotValue
+	elif rot == 3:
+		# torch rotation 3
+		x = offset
+		loc += mathutils.Vector((x, y, z))
+		rotation[1] -= rotValue
+	elif rot == 4:
+		# torch rotation 4
+		y = -offset
+		loc += mathutils.Vector((x, y, z))
+		rotation[0] -= rotValue
+	elif rot == 5:
+		# edge block rotation 1
+		rotation[2] += -math.pi / 2
+	elif rot == 6:
+		# edge block rotation 2
+		rotation[2] += math.pi
+	elif rot == 7:
+		# edge block rotation 3
+		rotation[2] += math.pi / 2
+	elif rot == 8:
+		# edge block rotation 4 (ceiling, not 'keep same')
+		rotation[0] += math.pi / 2
+
+	# extra variance to break up regularity, e.g. for tall grass
+	# first, xy and z variance
+	if [True, 1] == variance:
+		x = (random.random() - 0.5) * 0.5
+		y = (random.random() - 0.5) * 0.5
+		z = (random.random() / 2 - 0.5) * 0.6
+		loc += mathutils.Vector((x, y, z))
+	# now for just xy variance, base stays the same
+	elif [True, 0] == variance:  # for non-z variance
+		# values LOWER than *1.0 make it less variable
+		x = (random.random() - 0.5) * 0.5
+		y = (random.random() - 0.5) * 0.5
+		loc += mathutils.Vector((x, y, 0))
+
+	return loc, rotation, swap.scale.copy()
+
+
+def instance_points_available() -> bool:
+	"""Whether geometry nodes can instance swapped blocks on points."""
+	# Named attribute node needed to read per point rotation and scale.
+	return bool(util.min_bv((3, 2)))
+
+
+def get_named_attribute_output(node: bpy.types.Node) -> bpy.types.NodeSocket:
+	"""Returns the active output of a named attribute node.
+
+	Blender 3.x has one output per data type, 4.0+ only one.
+	"""
+	for socket in node.outputs:
+		if socket.name == "Attribute" and socket.enabled:
+			return socket
+	return node.outputs[0]
+
+
+def get_instance_node_group(source: Union[bpy.types.Object, Collection]) -> bpy.types.NodeTree:
+	"""Returns a geometry node group instancing source on all input points.
+
+	The per point "rotation" and "scale" attributes are used for transforms,
+	an existing group for the same source is reused.
+	"""
+	name = f"MCprep instance {source.name}"
+	is_coll = isinstance(source, Collection)
+	for ng in bpy.data.node_groups:
+		if ng.type != "GEOMETRY" or not ng.name.startswith(name):
+			continue
+		info = ng.nodes.get("Source")
+		if info and info.inputs[0].default_value == source:
+			return ng
+
+	ng = bpy.data.node_groups.new(name, "GeometryNodeTree")
+	if hasattr(ng, "interface"):  # 4.0+
+		ng.interface.new_socket(
+			name="Geometry", in_out="INPUT", socket_type="NodeSocketGeometry")
+		ng.interface.new_socket(
+			name="Geometry", in_out="OUTPUT", socket_type="NodeSocketGeometry")
+	else:
+		ng.inputs.new("NodeSocketGeometry", "Geometry")
+		ng.outputs.new("NodeSocketGeometry", "Geometry")
+
+	nodes = ng.nodes
+	group_in = nodes.new("NodeGroupInput")
+	group_out = nodes.new("NodeGroupOutput")
+	instance = nodes.new("GeometryNodeInstanceOnPoints")
+	if is_coll:
+		info = nodes.new("GeometryNodeCollectionInfo")
+	else:
+		info = nodes.new("GeometryNodeObjectInfo")
+	info.name = "Source"
+	info.transform_space = "ORIGINAL"
+	info.inputs[0].default_value = source
+
+	group_in.location = (-400, 0)
+	info.location = (-400, -150)
+	instance.location = (0, 0)
+	group_out.location = (200, 0)
+
+	links = ng.links
+	links.new(group_in.outputs[0], instance.inputs["Points"])
+	if is_coll:
+		links.new(info.outputs["Instances"], instance.inputs["Instance"])
+	else:
+		links.new(info.outputs["Geometry"], instance.inputs["Instance"])
+	links.new(instance.outputs["Instances"], group_out.inputs[0])
+
+	for i, attr in enumerate(("rotation", "scale")):
+		named = nodes.new("GeometryNodeInputNamedAttribute")
+		named.data_type = "FLOAT_VECTOR"
+		named.inputs["Name"].default_value = attr
+		named.location = (-400, -300 - i * 150)
+		links.new(
+			get_named_attribute_output(named),
+			instance.inputs[attr.capitalize()])
+	return ng
+
+
+def create_instance_points(
+	context: Context, name: str,
+	source: Union[bpy.types.Object, Collection],
+	transforms: List[Tuple[mathutils.Vector, mathutils.Euler, mathutils.Vector]]
+) -> bpy.types.Object:
+	"""Creates a point cloud object instancing source on each point.
+
+	Transforms are (location, rotation, scale) per point, in world space.
+	"""
+	mesh = bpy.data.meshes.new(name)
+	mesh.vertices.add(len(transforms))
+	mesh.vertices.foreach_set(
+		"co", [val for loc, _, _ in transforms for val in loc])
+
+	rotation = mesh.attributes.new("rotation", "FLOAT_VECTOR", "POINT")
+	rotation.data.foreach_set(
+		"vector", [val for _, rot, _ in transforms for val in rot])
+	scale = mesh.attributes.new("scale", "FLOAT_VECTOR", "POINT")
+	scale.data.foreach_set(
+		"vector", [val for _, _, scl in transforms for val in scl])
+	mesh.update()
+
+	obj = bpy.data.objects.new(name, mesh)
+	geo_mod = obj.modifiers.new("MCprep instances", "NODES")
+	geo_mod.node_group = get_instance_node_group(source)
+	util.obj_link_scene(obj, context)
+	return obj
 
 
 # -----------------------------------------------------------------------------
@@ -450,9 +921,11 @@ class MCPREP_OT_meshswap(bpy.types.Operator):
 			"Join together swapped blocks of the same type "
 			"(unless swapped with a group)"))
 	use_dupliverts: bpy.props.BoolProperty(
-		name="Use dupliverts (faster)",
-		default=True,
-		description="Use dupliverts to add meshes")
+		name="Instance on points (faster)",
+		default=False,
+		description=(
+			"Add one point cloud object per block type, instanced with "
+			"geometry nodes, instead of an object per block (Blender 3.2+)"))
 	link_groups: bpy.props.BoolProperty(
 		name="Link groups",
 		default=False,
@@ -484,7 +957,9 @@ class MCPREP_OT_meshswap(bpy.types.Operator):
 
 		layout.label(text="GENERAL SETTINGS")
 		row = layout.row()
-		# row.prop(self,"use_dupliverts") # coming soon
+		row.prop(self, "use_dupliverts")
+		row.enabled = instance_points_available()
+		row = layout.row()
 		row.prop(self, "meshswap_join")
 		row = layout.row()
 		row.prop(self, "link_groups")
@@ -514,6 +989,8 @@ class MCPREP_OT_meshswap(bpy.types.Operator):
 
 	track_function = "meshswap"
 	track_exporter = None
+	asset_templates = {}  # name: appended object, copied for each swap
+	library_groups = set()  # names of groups loaded by preload_assets
 	@tracking.report_error
 	def execute(self, context):
 		tprep = time.time()
@@ -543,6 +1020,10 @@ class MCPREP_OT_meshswap(bpy.types.Operator):
 		new_groups = []  # for new imported groups
 		removeList = []  # for objects that should be removed
 		new_objects = []  # all the newly added objects
+		use_points = self.use_dupliverts and instance_points_available()
+
+		# Append everything needed upfront, in a single library load
+		new_groups += self.preload_assets(context, objList)
 
 		# setup the progress bar
 		denom = len(objList)
@@ -588,31 +1069,38 @@ class MCPREP_OT_meshswap(bpy.types.Operator):
 			# loop through each face or "polygon" of mesh, throw out invalids
 			t1s[-1] = time.time()
 			offset = 0.5 if self.track_exporter == 'Mineways' else 0
-			facebook = self.get_face_list(swap, offset)
+			# Reverses which block to count 'on edge' for so that the instances
+			# are placed in "front" of where it hangs, as this is how the meshswap
+			# assets are setup (object origin will be in front of the hanging item)
+			outside_hanging = 1 if swapProps['edgeFloat'] else -1
+			faces = get_face_list(swap, offset, outside_hanging)
 
 			# removing duplicates and checking orientation
-			# structure of: "x-y-z":[[x,y,z], [xr, yr, zr]]
-			instance_configs = {}
-			for face in facebook:
-				# updates instance_configs
-				self.proccess_poly_orientations(face, swapProps, swapGen, instance_configs)
+			# structure of: (x, y, z):[[x,y,z], rot_type]
+			instance_configs = self.get_instance_configs(
+				faces, swapProps, swapGen)
 
 			# Primary function for adding the actual instances
 			# Critical path process section!
 			t2s[-1] = time.time()
-			grouped, dupedObj = self.add_instances_with_transforms(
-				context, swap, swapProps, instance_configs)
+			if use_points:
+				grouped, dupedObj = self.add_instances_as_points(
+					context, swap, swapProps, instance_configs)
+			else:
+				grouped, dupedObj = self.add_instances_with_transforms(
+					context, swap, swapProps, instance_configs)
 			base = swapProps["object"]
 
-			# Having completed adding instances, remove the 'base copy'
+			# Having completed adding instances, remove the 'base copy'. When
+			# instancing on points, keep it as the (unlinked) instance source.
 			if not grouped:
 				if base in dupedObj:
 					dupedObj.pop(dupedObj.index(base))
 				if base in selList:  # gaurd for stability, but shouldn't happen
 					selList.pop(selList.index(base))
-				util.obj_unlink_remove(base, True, context)
+				util.obj_unlink_remove(base, not use_points, context)
 
-			if grouped:
+			if grouped or use_points:
 				new_objects += dupedObj  # list
 			elif dupedObj and self.meshswap_join:
 				# join meshes together, carefully removing old selected objects
@@ -696,6 +1184,7 @@ class MCPREP_OT_meshswap(bpy.types.Operator):
 			util.move_to_collection(obj, swaped_vl.collection)
 
 		util.move_assets_to_excluded_layer(context, new_groups)
+		self.clear_asset_templates()
 
 		# end progress bar, end of primary section
 		bpy.context.window_manager.progress_end()
@@ -749,112 +1238,170 @@ class MCPREP_OT_meshswap(bpy.types.Operator):
 				obj.name = util.nameGeneralize(obj.active_material.name)
 		return objList
 
-	def get_face_list(self, swap: bpy.types.Object, offset: float) -> List[VectorType]:
-		"""Returns list of relevant faces and mapped coordinates.
+	def get_swap_asset(self, context: Context, name: str) -> Optional[Tuple[str, bool]]:
+		"""Returns the library asset name to swap a block with, and if a group.
 
-		Offset is for Mineways to virtually shift all block centers to half ints
-
-		Returns list with each item: n (normal), g (global pos), l (local pos)
+		If an asset is both a group and object, the group will be used. Returns
+		None if nothing in the library matches.
 		"""
-		facebook = []
-		for poly in swap.data.polygons:
-			gtmp = util.matmul(
-				swap.matrix_world, mathutils.Vector(poly.center))
-			# even without offset, list this to make values unlinked to mesh
-			g = [gtmp[0] + offset, gtmp[1] + offset, gtmp[2] + offset]
-			n = poly.normal  # in local coordinates
-			tmp2 = poly.center
-			# even without offset, list this
-			l = [tmp2[0] + offset, tmp2[1] + offset, tmp2[2] + offset]
-			if 0.015 < poly.area and poly.area < 0.016:
-				# hack to avoid too many torches show up, both jmc2obj and Mineways
+		name = generate.get_mc_canonical_name(name)[0]
+		cache = get_meshswap_cache(context)
+		# e.g. remaps entity/chest/normal back to chest
+		name_remap = env.json_data["blocks"]["canon_mapping_block"].get(name)
+
+		for candidate in (name, name_remap):
+			if not candidate:
+				return None
+			if candidate in cache["groups"] or candidate in util.collections():
+				return candidate, True
+			if candidate in cache["objects"]:
+				return candidate, False
+		return None  # if not present, continue
+
+	def preload_assets(self, context: Context, obj_list: List[bpy.types.Object]) -> List[Collection]:
+		"""Append or link all assets needed to swap obj_list in one load.
+
+		Appended mesh objects are kept as unlinked templates, which
+		checkExternal copies for each swapped object. Other object types are
+		removed again, and left to be appended by checkExternal. Returns the
+		newly added groups.
+		"""
+		self.asset_templates = {}
+		self.library_groups = set()
+		rmable = REMOVABLE_BLOCKS.get(self.track_exporter)
+		if rmable is None:
+			return []
+		filepath = get_meshswap_filepath(context)
+		asset_cache = get_meshswap_asset_cache()
+
+		group_names = set()
+		obj_names = set()
+		for obj in obj_list:
+			name = util.nameGeneralize(obj.name)
+			if name in rmable:
+				continue
+			target = self.get_swap_asset(context, name)
+			if target is None:
+				continue
+			name, is_group = target
+			if is_group and name in util.collections():
+				continue
+			props = asset_cache.get_props(filepath, get_asset_key(name, is_group))
+			if props is not None and props['removable']:
+				continue  # known to be removed, no need to load
+			if not is_group:
+				obj_names.add(name)
+				continue
+			group_names.add(name)
+			# special cases, make another list for this? number of variants can vary..
+			if name == "torch" or name == "Torch":
+				group_names.update([f"{name}.1", f"{name}.2"])
+		group_names -= set(util.collections().keys())
+		if not group_names and not obj_names:
+			return []
+
+		env.log(
+			f"Preloading {len(group_names)} groups, {len(obj_names)} objects",
+			vv_only=True)
+		meshswap_path = bpy.path.abspath(context.scene.meshswap_path)
+		link = self.link_groups
+		with bpy.data.libraries.load(meshswap_path, link=link) as (data_from, data_to):
+			data_to.collections = [
+				coll for coll in data_from.collections if coll in group_names]
+			if not link:
+				data_to.objects = [
+					obj for obj in data_from.objects if obj in obj_names]
+		new_groups = [coll for coll in data_to.collections if coll is not None]
+		obj_from = [obj for obj in data_from.objects if obj in obj_names]
+		obj_to = list(data_to.objects)
+
+		if link and obj_names:
+			# Objects are always appended, as they are modified once swapped.
+			with bpy.data.libraries.load(meshswap_path) as (data_from, data_to):
+				obj_from = [obj for obj in data_from.objects if obj in obj_names]
+				data_to.objects = list(obj_from)
+			obj_to = list(data_to.objects)
+
+		self.asset_templates = {}
+		for name, obj in zip(obj_from, obj_to):
+			if obj is None:
+				continue
+			if obj.type != 'MESH':
+				# Appending on its own also clears any non mesh objects it brings
+				self.remove_asset_template(obj)
 				continue
-			facebook.append(FaceStruct(n, g, l))  # g is global, l is local
-		return facebook
+			self.asset_templates[name] = obj
+
+		# Place as wm.append would, moved to the excluded layer after swapping.
+		active_coll = context.view_layer.active_layer_collection.collection
+		for coll in new_groups:
+			active_coll.children.link(coll)
+		self.library_groups = {coll.name for coll in new_groups}
+		return new_groups
+
+	def remove_asset_template(self, template: bpy.types.Object) -> None:
+		"""Remove a preloaded template object, and its data once unused."""
+		try:
+			data = template.data if template.type == 'MESH' else None
+			bpy.data.objects.remove(template)
+		except ReferenceError:
+			return
+		if data is not None and data.users == 0:
+			bpy.data.meshes.remove(data)
+
+	def clear_asset_templates(self) -> None:
+		"""Remove preloaded object templates, all swaps have copied them."""
+		for template in self.asset_templates.values():
+			self.remove_asset_template(template)
+		self.asset_templates = {}
 
 	def checkExternal(self, context: Context, name: str) -> Union[bool, Dict[str, str]]:
-		"""Called for each object in the loop as soon as possible."""
-
-		groupSwap = False
-		meshSwap = False  # if object in both group and mesh swap, group will be used
-		edgeFlush = False  # blocks perfectly on edges, require rotation
-		edgeFloat = False  # floating off edge into air, require rotation ['vines','ladder','lilypad']
-		torchlike = False  # ['torch','redstone_torch_on','redstone_torch_off']
-		removable = False  # to be removed, hard coded.
-		doorlike = False  # appears like a door.
-
-		front_face_rotate = False
-		# rotate mesh with this material's face forward (+y local=default)
-		# for varied positions from exactly center on the block, 1 for Z random too
-		# 1= x,y,z random; 0= only x,y random; 2=rotation random only (vertical)
-		# variance = [ ['tall_grass',1], ['double_plant_grass_bottom',1],
-		# ['flower_yellow',0], ['flower_red',0] ]
-		variance = [False, 0]  # needs to be in this structure
-		new_groups = []  # list of newly added groups in this process
+		"""Called for each object in the loop as soon as possible.
 
-		meshSwapPath = context.scene.meshswap_path
-		rmable = []
-		if self.track_exporter == "jmc2obj":
-			rmable = [
-				'book', 'brewing_stand', 'cactus_bottom', 'cactus_top', 'campfire_fire',
-				'campfire_log_lit', 'door_acacia_upper', 'door_birch_upper',
-				'door_dark_oak_upper', 'door_iron_top', 'door_jungle_upper',
-				'door_spruce_upper', 'door_wood_top', 'double_plant_grass_top',
-				'enchant_table_bottom', 'enchant_table_side', 'furnace_side',
-				'furnace_top', 'pumpkin_side_lit', 'pumpkin_top_lit', 'sunflower_back',
-				'sunflower_front', 'sunflower_top', 'tnt_bottom', 'tnt_side',
-				'torch_flame', 'workbench_back', 'workbench_front'
-			]
-		elif self.track_exporter == "Mineways":
-			rmable = [
-				'acacia_door_top', 'birch_door_top', 'cactus_top', 'campfire_fire',
-				'campfire_log_lit', 'dark_oak_door_top', 'enchanting_table_side',
-				'iron_door_top', 'jungle_door_top', 'oak_door_top',
-				'spruce_door_top', 'sunflower_back', 'sunflower_front',
-				'sunflower_top', 'tall_grass_top', 'tnt_bottom' 'tnt_side'
-			]
-		else:
+		Uses assets added by preload_assets, appending any which were not.
+		Templates are copied with util.obj_copy, same as each swapped instance
+		is made from this object later, so the copy doesn't keep the parent,
+		constraints, or custom properties of the template.
+		"""
+		rmable = REMOVABLE_BLOCKS.get(self.track_exporter)
+		if rmable is None:
 			# need to select one of the exporters!
 			return False  # {'CANCELLED'}
 		# delete unnecessary ones first
 		if name in rmable:
-			removable = True
 			env.log("Removable!")
-			return {'removable': removable}
+			return {'removable': True}
 
 		# check the actual name against the library
-		name = generate.get_mc_canonical_name(name)[0]
-		cache = get_meshswap_cache(context)
-		if name in env.json_data["blocks"]["canon_mapping_block"]:
-			# e.g. remaps entity/chest/normal back to chest
-			name_remap = env.json_data["blocks"]["canon_mapping_block"][name]
-		else:
-			name_remap = None
-
-		if name in cache["groups"] or name in util.collections():
-			groupSwap = True
-		elif name in cache["objects"]:
-			meshSwap = True
-		elif not name_remap:
+		target = self.get_swap_asset(context, name)
+		if target is None:
 			return False
-		elif name_remap in cache["groups"] or name_remap in util.collections():
-			groupSwap = True
-			name = name_remap
-		elif name_remap in cache["objects"]:
-			meshSwap = True
-			name = name_remap
-		else:
-			return False  # if not present, continue
+		name, groupSwap = target
+		meshSwap = not groupSwap
+		new_groups = []  # list of newly added groups in this process
+
+		# Swap properties only need to be read once per library asset. Groups
+		# already in this file may have been edited, so are always read.
+		filepath = get_meshswap_filepath(context)
+		asset_cache = get_meshswap_asset_cache()
+		asset_key = get_asset_key(name, groupSwap)
+		local_group = groupSwap and name in util.collections() and (
+			name not in self.library_groups
+			and not util.collections()[name].library)
+		props = None
+		if not local_group:
+			props = asset_cache.get_props(filepath, asset_key)
+		if props is not None and props['removable']:
+			env.log("Removable!")
+			return {'removable': True}
 
 		# now import
 		env.log(f"About to link, group {groupSwap} / mesh {meshSwap}?")
+		meshSwapPath = context.scene.meshswap_path
 		toLink = self.link_groups
 		for ob in context.selected_objects:
 			util.select_set(ob, False)
 
-		# import: guaranteed to have same name as "appendObj" for the first
-		# instant afterwards.
-
 		# Need to initialize to something, though this obj not used.
 		importedObj = None
 
@@ -880,37 +1427,19 @@ class MCPREP_OT_meshswap(bpy.types.Operator):
 
 				post_colls = list(util.collections())
 				new_groups += list(set(post_colls) - set(pre_colls))
-
-			# set properties
-			for item in util.collections()[name].items():
-				env.log(f"GROUP PROPS:{item}")
-				try:
-					x = item[1].name  # will NOT work if property UI
-				except:
-					x = item[0]  # the name of the property, [1] is the value
-					if x == 'variance':
-						variance = [True, item[1]]
-					elif x == 'edgeFloat':
-						edgeFloat = True
-					elif x == 'doorlike':
-						doorlike = True
-					elif x == 'edgeFlush':
-						edgeFlush = True
-					elif x == 'torchlike':
-						torchlike = True
-					elif x == 'removable':
-						removable = True
-					elif x == 'frontFaceRotate':
-						front_face_rotate = True
+				self.library_groups = self.library_groups | {
+					coll.name for coll in new_groups}
+			asset = util.collections()[name]
+		elif name in self.asset_templates:
+			asset = self.asset_templates[name]
+			importedObj = util.obj_copy(asset, context)
+			importedObj["MCprep_noSwap"] = 1
 		else:
 			util.bAppendLink(os.path.join(meshSwapPath, 'Object'), name, False)
 			# ## NOTICE: IF THERE IS A DISCREPENCY BETWEEN ASSETS FILE AND WHAT IT SAYS SHOULD
 			# ## BE IN FILE, EG NAME OF MESH TO SWAP CHANGED, INDEX ERROR IS THROWN HERE
 			# ## >> MAKE a more graceful error indication.
 			# filter out non-meshes in case of parent grouping or other pull-ins
-			# env.log("DEBUG - post importing {}, selected objects: {}".format(
-			# 	name, list(bpy.context.selected_objects)), vv_only=True)
-
 			for ob in bpy.context.selected_objects:
 				# 2.79b specific hack to clear brought in empties with the mesh
 				# e.g. in case of animated deformation modifiers via object
@@ -922,210 +1451,91 @@ class MCPREP_OT_meshswap(bpy.types.Operator):
 				# in case nothing selected.. which happens even during selection?
 				return False
 			importedObj["MCprep_noSwap"] = 1
-			# now check properties
-			for item in importedObj.items():
-				try:
-					x = item[1].name  # will NOT work if property UI
-				except:
-					x = item[0]  # the name of the property, [1] is the value
-					if x == 'variance':
-						variance = [True, item[1]]
-					elif x == 'edgeFloat':
-						edgeFloat = True
-					elif x == 'doorlike':
-						doorlike = True
-					elif x == 'edgeFlush':
-						edgeFlush = True
-					elif x == 'torchlike':
-						torchlike = True
-					elif x == 'removable':
-						removable = True
+			asset = importedObj
 			for ob in context.selected_objects:
 				util.select_set(ob, False)
-		# #### HERE set the other properties, e.g. variance and edgefloat, now that the obj exists
+
+		if props is None:
+			props = read_swap_props(asset)
+			env.log(f"Swap props of {name}: {props}")
+			library = get_meshswap_cache(context)
+			in_library = name in library["groups" if groupSwap else "objects"]
+			if in_library and not local_group:
+				asset_cache.set_props(filepath, asset_key, props)
+
 		env.log(f"groupSwap: {groupSwap}, meshSwap: {meshSwap}")
-		env.log(f"edgeFloat: {edgeFloat}, variance: {variance}, torchlike: {torchlike}")
 		return {
 			'importName': name, 'object': importedObj, 'meshSwap': meshSwap,
-			'groupSwap': groupSwap, 'variance': variance, 'edgeFlush': edgeFlush,
-			'edgeFloat': edgeFloat, 'torchlike': torchlike, 'removable': removable,
-			'doorlike': doorlike, 'new_groups': new_groups}
-
-	def proccess_poly_orientations(
-			self, face: FaceStruct, swapProps: Dict[str, str], swapGen: str,
-			instance_configs: Dict[str, Tuple[VectorType, int]]
-		) -> None:
-		"""Iterate over individual face, updating instance loc/rotation
-
-		Arguments:
-			face: face struct with n (normal), g (global coord), l (local coord)
-			instance_configs: pass by ref dict of instances to make, with rot and loc info
+			'groupSwap': groupSwap, 'variance': props['variance'],
+			'edgeFlush': props['edgeFlush'], 'edgeFloat': props['edgeFloat'],
+			'torchlike': props['torchlike'], 'removable': props['removable'],
+			'doorlike': props['doorlike'], 'new_groups': new_groups}
+
+	def get_instance_configs(
+			self, faces: FaceArrays, swapProps: Dict[str, str], swapGen: str
+		) -> Dict[Tuple[int, int, int], List]:
+		"""Return the instances to make for the faces of one object.
+
+		Keyed by block cell, each with [loc, rot_type]. Rotations of all faces
+		are classified at once, see get_rot_types, then a single instance is
+		kept per block: the first face's, or the last one's for edgeFloat.
 		"""
-
-		offset = 0.5 if self.track_exporter == 'Mineways' else 0
-
-		# Transform so centers are half ints (jmc2obj default), from local coords
-		x = round(face.l[0])
-		y = round(face.l[1])
-		z = round(face.l[2])
-
-		# Reverses which block to count 'on edge' for so that the instances
-		# are placed in "front" of where it hangs, as this is how the meshswap
-		# assets are setup (object origin will be in front of the hanging item)
-		outside_hanging = 1 if swapProps['edgeFloat'] else -1
-		# check if face is on unit block boundary (local coord!)
-		if util.face_on_edge(face.l):
-			a = face.n[0] * 0.1 * outside_hanging
-			b = face.n[1] * 0.1 * outside_hanging
-			c = face.n[2] * 0.1 * outside_hanging
-			x = round(face.l[0] + a)
-			y = round(face.l[1] + b)
-			z = round(face.l[2] + c)
-			# print("ON EDGE, BRO! line, "+str(x) +","+str(y)+","+str(z))
-			# print([facebook[ind].l[0], facebook[ind].l[1], facebook[ind].l[2]])
-		else:
-			a, b, c = 0, 0, 0
-
-		instance_key = f"{x}-{y}-{z}"
-		loc = [x, y, z]
-
-		# ### TORCHES, hack removes duplicates while not removing "edge" floats
-		# if facebook[ind].l[1]+0.5 - math.floor(facebook[ind].l[1]+0.5) < 0.3:
-		# 	#continue if coord. is < 1/3 of block height, to do with torch's base
-		#   #in wrong cube.
-		# 	if not swapProps['edgeFloat']:
-		# 		#continue
-		# 		print("do nothing, this is for jmc2obj")
-		env.log(
-			"Instance:  loc, face.local, face.nrm, hanging offset, if_edgeFloat:",
-			vv_only=True)
-		env.log(
-			str([loc, face.l, face.n, [a, b, c], outside_hanging]),
-			vv_only=True)
+		rules, default = get_rotation_rules(self.track_exporter, swapProps)
+		rot_types = get_rot_types(faces, rules, default)
+		edge_float = swapProps['edgeFloat']
+		offset = -0.5 if self.track_exporter == 'Mineways' else 0
 
 		# ## START HACK PATCH, FOR MINEWAYS (single-tex export) double-tall blocks
 		# prevent double high grass... which mineways names sunflowers.
-		hack_check = ["Sunflower", "Iron_Door", "Wooden_Door"]
-		if swapGen in hack_check and f"{x}-{y - 2}-{z}" in instance_configs:
-			overwrite = -1
-		elif swapGen in hack_check and f"{x}-{y + 1}-{z}" in instance_configs:
-			# dupList[dupList.index([x,y+1,z])] = [x,y,z]
-			instance_configs[f"{x}-{y + 1}-{z}"][0] = loc  # update loc only
-			overwrite = -1
-		else:
-			overwrite = 0  # 0 = normal, -1 = skip, 1 = overwrite the block below
-		# ## END HACK PATCH
-
-		# rotation value (second append value: 0 means no rotation, rest is 1-4)
-		if overwrite < 0:
-			return
-
-		if instance_key in instance_configs and not swapProps['edgeFloat']:
-			return  # no need to overwrite
-
-		# dupList.append([x,y,z])
-		# check difference from rounding, this gets us the rotation!
-		x_diff = x - face.l[0]
-		z_diff = z - face.l[2]
-
-		# append rotation, exporter dependent
-		if self.track_exporter == "jmc2obj":
-			if swapProps['torchlike']:  # needs fixing
-				if (x_diff > .1 and x_diff < 0.4):
-					rot_type = 1
-				elif (z_diff > .1 and z_diff < 0.4):
-					rot_type = 2
-				elif (x_diff < -.1 and x_diff > -0.4):
-					rot_type = 3
-				elif (z_diff < -.1 and z_diff > -0.4):
-					rot_type = 4
-				else:
-					rot_type = 0
-			elif swapProps['edgeFloat']:
-				env.log("Edge float!", vv_only=True)
-				if (y - face.l[1] < 0):
-					rot_type = 8
-				elif (x_diff > 0.3):
-					rot_type = 7
-				elif (z_diff > 0.3):
-					rot_type = 0
-				elif (z_diff < -0.3):
-					rot_type = 6
-				else:
-					rot_type = 5
-			elif swapProps['edgeFlush']:
-				# actually 6 cases here, can need rotation below...
-				# currently not necessary/used, so not programmed..
-				rot_type = 0
-			elif swapProps['doorlike']:
-				if (y - face.l[1] < 0):
-					rot_type = 8
-				elif (x_diff > 0.3):
-					rot_type = 7
-				elif (z_diff > 0.3):
-					rot_type = 0
-				elif (z_diff < -0.3):
-					rot_type = 6
-				else:
-					rot_type = 5
+		double_tall = swapGen in ["Sunflower", "Iron_Door", "Wooden_Door"]
+
+		instance_configs = {}
+		if np is not None and not double_tall:
+			cells = np.asarray(faces.c, dtype=np.int64).reshape(-1, 3)
+			if not len(cells):
+				return instance_configs
+			# Unique rows come back sorted the same way both times, so the
+			# first and last face of each block line up by index.
+			_, first = np.unique(cells, axis=0, return_index=True)
+			if edge_float:  # later faces overwrite the rotation
+				_, last = np.unique(cells[::-1], axis=0, return_index=True)
+				last = len(cells) - 1 - last
 			else:
-				rot_type = 0
-		elif self.track_exporter == "Mineways":
-			env.log(f"checking: {x_diff} {z_diff}")
-			if swapProps['torchlike']:  # needs fixing
-				env.log("recognized it's a torchlike obj..")
-				if (x_diff > .1 and x_diff < 0.6):
-					rot_type = 1
-				elif (z_diff > .1 and z_diff < 0.6):
-					rot_type = 2
-				elif (x_diff < -.1 and x_diff > -0.6):
-					rot_type = 3
-				elif (z_diff < -.1 and z_diff > -0.6):
-					rot_type = 4
-				else:
-					rot_type = 0
-			elif swapProps['edgeFloat']:
-				if (y - face.l[1] < 0):
-					rot_type = 8
-				elif (x_diff > 0.3):
-					rot_type = 7
-				elif (z_diff > 0.3):
-					rot_type = 0
-				elif (z_diff < -0.3):
-					rot_type = 6
-				else:
-					rot_type = 5
-			elif swapProps['edgeFlush']:
-				# actually 6 cases here, can need rotation below...
-				# currently not necessary/used, so not programmed..
-				rot_type = 0
-			elif swapProps['doorlike']:
-				if (y - face.l[1] < 0):
-					rot_type = 8
-				elif (x_diff > 0.3):
-					rot_type = 7
-				elif (z_diff > 0.3):
-					rot_type = 0
-				elif (z_diff < -0.3):
-					rot_type = 6
-				else:
-					rot_type = 5
-			else:
-				rot_type = 0
+				last = first
+			order = np.argsort(first)
+			keys = cells[first[order]].tolist()
+			rots = np.asarray(rot_types)[last[order]].tolist()
+			for (x, y, z), rot_type in zip(keys, rots):
+				instance_configs[(x, y, z)] = [
+					[x + offset, y + offset, z + offset], rot_type]
 		else:
-			rot_type = 0
+			cells = faces.c.tolist() if hasattr(faces.c, "tolist") else faces.c
+			for (x, y, z), rot_type in zip(cells, rot_types):
+				if double_tall:
+					if (x, y - 2, z) in instance_configs:
+						continue
+					prior = instance_configs.get((x, y + 1, z))
+					if prior is not None:
+						prior[0] = [x, y, z]  # update loc only
+						continue
+				# ## END HACK PATCH
 
-		# update the instance ref for this face
-		offset = -0.5 if self.track_exporter == 'Mineways' else 0
-		loc_unoffset = [pos + offset for pos in loc]
-		instance_configs[instance_key] = [loc_unoffset, rot_type]
+				if (x, y, z) in instance_configs and not edge_float:
+					continue  # no need to overwrite
+				instance_configs[(x, y, z)] = [
+					[x + offset, y + offset, z + offset], rot_type]
+
+		env.log(
+			f"{len(instance_configs)} instances from {len(faces)} faces",
+			vv_only=True)
+		return instance_configs
 
 	def add_instances_with_transforms(
 		self,
 		context: Context,
 		swap: bpy.types.Object,
 		swapProps: Dict[str, str],
-		instance_configs: Dict[str, Tuple[VectorType, int]]
+		instance_configs: Dict[Tuple[int, int, int], List]
 	) -> Tuple[bool, List[bpy.types.Object]]:
 		"""Creates all block instances for a single object.
 
@@ -1149,13 +1559,16 @@ class MCPREP_OT_meshswap(bpy.types.Operator):
 				if hasattr(context, "view_layer"):
 					context.view_layer.update()  # but does not redraw ui
 
-			loc = util.matmul(swap.matrix_world, mathutils.Vector(loc_local))
-
-			# loc = swap.matrix_world*mathutils.Vector(set) #local to global
 			if grouped:
 				# definition for randimization, defined at top!
 				randGroup = util.randomizeMeshSwap(swapProps['importName'], 3)
 				env.log(f"Rand group: {randGroup}")
+
+			loc, rotation, scale = get_instance_transform(
+				swap, loc_local, rot, swapProps['variance'])
+
+			# loc = swap.matrix_world*mathutils.Vector(set) #local to global
+			if grouped:
 				new_ob = util.addGroupInstance(randGroup, loc)
 				if hasattr(new_ob, "empty_draw_size"):
 					new_ob.empty_draw_size = 0.25
@@ -1163,78 +1576,61 @@ class MCPREP_OT_meshswap(bpy.types.Operator):
 					new_ob.empty_display_size = 0.25
 				dupedObj.append(new_ob)
 			else:
-				# TODO: Change to adding a single vertex, dupliverts
 				new_ob = util.obj_copy(base, context)
-				new_ob.location = mathutils.Vector(loc)
+				new_ob.location = loc
 				util.select_set(new_ob, True)  # needed?
 				dupedObj.append(new_ob)
 
 			# obj = new_ob # bpy.context.selected_objects[-1]
 			# do extra transformations now as necessary
-			new_ob.rotation_euler = swap.rotation_euler
-
-			# special case of un-applied,
-			# 90(+/- 0.01)-0-0 rotation on source (y-up conversion)
-			checkcon = swap.rotation_euler[0] >= math.pi / 2 - .01
-			checkcon &= swap.rotation_euler[0] <= math.pi / 2 + .01
-			checkcon &= swap.rotation_euler[1] == 0
-			checkcon &= swap.rotation_euler[2] == 0
-			if checkcon:
-				new_ob.rotation_euler[0] -= math.pi / 2
-			new_ob.scale = swap.scale
-
-			# rotation/translation for walls, assumes last added object still selected
-			x, y, offset, rotValue, z = 0, 0, 0.28, 0.436332, 0.12
-
-			if rot == 1:
-				# torch rotation 1
-				x = -offset
-				new_ob.location += mathutils.Vector((x, y, z))
-				new_ob.rotation_euler[1] += rotValue
-			elif rot == 2:
-				# torch rotation 2
-				y = offset
-				new_ob.location += mathutils.Vector((x, y, z))
-				new_ob.rotation_euler[0] += rotValue
-			elif rot == 3:
-				# torch rotation 3
-				x = offset
-				new_ob.location += mathutils.Vector((x, y, z))
-				new_ob.rotation_euler[1] -= rotValue
-			elif rot == 4:
-				# torch rotation 4
-				y = -offset
-				new_ob.location += mathutils.Vector((x, y, z))
-				new_ob.rotation_euler[0] -= rotValue
-			elif rot == 5:
-				# edge block rotation 1
-				new_ob.rotation_euler[2] += -math.pi / 2
-			elif rot == 6:
-				# edge block rotation 2
-				new_ob.rotation_euler[2] += math.pi
-			elif rot == 7:
-				# edge block rotation 3
-				new_ob.rotation_euler[2] += math.pi / 2
-			elif rot == 8:
-				# edge block rotation 4 (ceiling, not 'keep same')
-				new_ob.rotation_euler[0] += math.pi / 2
-
-			# extra variance to break up regularity, e.g. for tall grass
-			# first, xy and z variance
-			if [True, 1] == swapProps['variance']:
-				x = (random.random() - 0.5) * 0.5
-				y = (random.random() - 0.5) * 0.5
-				z = (random.random() / 2 - 0.5) * 0.6
-				new_ob.location += mathutils.Vector((x, y, z))
-			# now for just xy variance, base stays the same
-			elif [True, 0] == swapProps['variance']:  # for non-z variance
-				# values LOWER than *1.0 make it less variable
-				x = (random.random() - 0.5) * 0.5
-				y = (random.random() - 0.5) * 0.5
-				new_ob.location += mathutils.Vector((x, y, 0))
+			new_ob.rotation_euler = rotation
+			new_ob.scale = scale
 
 		return grouped, dupedObj
 
+	def add_instances_as_points(
+		self,
+		context: Context,
+		swap: bpy.types.Object,
+		swapProps: Dict[str, str],
+		instance_configs: Dict[Tuple[int, int, int], List]
+	) -> Tuple[bool, List[bpy.types.Object]]:
+		"""Creates one point cloud object per block type for a single object.
+
+		Each point carries the same transforms add_instances_with_transforms
+		would apply, and is instanced by a geometry nodes modifier. Random
+		group variants each get their own point cloud.
+		"""
+		base = swapProps["object"]
+		grouped = swapProps["groupSwap"]
+
+		transforms = {}  # source name: list of (loc, rotation, scale)
+		for loc_local, rot in instance_configs.values():
+			self.runcount += 1
+			if grouped:
+				source = util.randomizeMeshSwap(swapProps['importName'], 3)
+			else:
+				source = base.name
+			transforms.setdefault(source, []).append(get_instance_transform(
+				swap, loc_local, rot, swapProps['variance']))
+
+		new_objs = []
+		for source, points in transforms.items():
+			if grouped:
+				source_id = util.collections().get(source)
+			else:
+				source_id = bpy.data.objects.get(source)
+			if source_id is None:
+				env.log(f"Instance source not found: {source}")
+				continue
+			obj = create_instance_points(
+				context, f"{source} instances", source_id, points)
+			new_objs.append(obj)
+		env.log(
+			f"Instanced {len(instance_configs)} points on {len(new_objs)} objects",
+			vv_only=True)
+		return grouped, new_objs
+
 	def offsetByHalf(self, obj: bpy.types.Object) -> None:
 		if obj.type != 'MESH':
 			return
@@ -16,8 +16,10 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+from collections import OrderedDict
+from pathlib import Path
 from subprocess import Popen, PIPE
-from typing import List, Optional, Union, Tuple
+from typing import Any, Dict, List, Optional, Union, Tuple
 import enum
 import json
 import operator
@@ -497,16 +499,180 @@ def load_mcprep_json() -> bool:
 	if not os.path.isfile(path):
 		env.log(f"Error, json file does not exist: {path}")
 		env.json_data = default
+		build_json_indexes()
 		return False
 	with open(path) as data_file:
 		try:
 			env.json_data = json.load(data_file)
+			build_json_indexes()
 			env.log("Successfully read the JSON file")
 			return True
 		except Exception as err:
 			print("Failed to load json file:")
 			print('\t', err)
 			env.json_data = default
+			build_json_indexes()
+
+
+def build_json_indexes() -> None:
+	"""Precompile lookup structures derived from the loaded json data."""
+	env.canonical_index = CanonicalIndex(env.json_data)
+	env.checklist_index = ChecklistIndex(env.json_data)
+
+
+class CanonicalIndex:
+	"""Precompiled lookup of material names to canonical MC names and form.
+
+	Built once per load of the json data, merging the mc, jmc2obj and Mineways
+	block mappings into flat tables so that a lookup is a single dict hit
+	instead of up to five. Results are memoized by the raw input name, as the
+	same names are requested once per material or object across prep, swap
+	and animate operations.
+	"""
+
+	JMC_PREFIX = "minecraft_block-"
+	MEMO_SIZE = 4096
+
+	def __init__(self, json_data: Optional[Dict]):
+		self.source = json_data
+		self._memo: OrderedDict = OrderedDict()
+
+		# Exact name lookups, in priority order of mc > jmc2obj > mineways
+		self._exact: Dict[str, Tuple[str, str]] = {}
+		# Lowercased name lookups, which only apply to jmc2obj and mineways
+		self._folded: Dict[str, Tuple[str, str]] = {}
+
+		blocks = json_data.get("blocks", {}) if json_data else {}
+		mappings = ["block_mapping_mc", "block_mapping_jmc", "block_mapping_mineways"]
+		self.valid = all(key in blocks for key in mappings)
+		if not self.valid:
+			return
+
+		for key, form in [
+				("block_mapping_mineways", "mineways"),
+				("block_mapping_jmc", "jmc2obj")]:
+			for name, canon in blocks[key].items():
+				self._exact[name] = (canon, form)
+				self._folded[name] = (canon, form)
+		for name, canon in blocks["block_mapping_mc"].items():
+			self._exact[name] = (canon, "mc")
+
+	def lookup(self, name: str) -> Tuple[str, Optional[str]]:
+		"""Return the canonical name and form for a raw material name."""
+		try:
+			res = self._memo[name]
+			self._memo.move_to_end(name)
+			return res
+		except KeyError:
+			pass
+
+		res = self._resolve(name)
+		self._memo[name] = res
+		if len(self._memo) > self.MEMO_SIZE:
+			self._memo.popitem(last=False)
+		return res
+
+	def _resolve(self, name: str) -> Tuple[str, Optional[str]]:
+		general_name = nameGeneralize(name)
+
+		# Special case to allow material names, e.g. in meshswap, to end in
+		# .emit while still mapping to canonical names, to pick up features
+		# like animated textures. Cross check that name isn't exactly .emit to
+		# avoid None return.
+		if ".emit" in general_name and general_name != ".emit":
+			general_name = general_name.replace(".emit", "")
+
+		if not self.valid:
+			env.log("Missing key values in json")
+			return general_name, None
+
+		# The below workaround is to account for the jmc2obj v113+ which
+		# changes how mappings and assignments work.
+		if general_name.startswith(self.JMC_PREFIX):
+			# minecraft_block-name maps to textures/block/name.png,
+			# other options over block are: entity, models, etc.
+			jmc_prefix = True
+			general_name = name[len(self.JMC_PREFIX):]
+		else:
+			jmc_prefix = False
+
+		# Patch naming to avoid issues.
+		if general_name == "water":
+			# Improves connection with older exports, without getting
+			# mixed up with the new "water": "painting/water" texture.
+			general_name = "water_still"
+
+		match = self._exact.get(general_name)
+		if match is None:
+			match = self._folded.get(general_name.lower())
+
+		if match is None:
+			env.log(f"Canonical name not matched: {general_name}", vv_only=True)
+			canon = general_name
+			form = None
+		else:
+			canon, form = match
+			if form == "mc" and jmc_prefix:
+				form = "jmc2obj"
+
+		if canon is None or canon == '':
+			env.log(f"Error: Encountered None canon value with {general_name}")
+			canon = general_name
+
+		return canon, form
+
+
+class ChecklistIndex:
+	"""Precompiled matchers for the block lists of the json data.
+
+	Each list (e.g. reflective, solid, emit) is compiled into a set of exact
+	names plus a single regex of its wildcard fragments. Like the original
+	wildcard expansion, a fragment matches if contained anywhere in the name.
+	Results are memoized per (name, list), as the same canonical names are
+	checked against several lists for each material prepped.
+	"""
+
+	def __init__(self, json_data: Optional[Dict]):
+		self.source = json_data
+		self._memo: Dict[Tuple[str, str], bool] = {}
+		self._exact: Dict[str, frozenset] = {}
+		self._wildcards: Dict[str, Optional[re.Pattern]] = {}
+
+		blocks = json_data.get("blocks", {}) if json_data else {}
+		for list_name, entries in blocks.items():
+			if not isinstance(entries, (list, dict)):
+				continue
+			self._exact[list_name] = frozenset(entries)
+			fragments = []
+			for name in entries:
+				if '*' not in name:
+					continue
+				# Only the text around the first wildcard is considered.
+				for part in name.split('*')[:2]:
+					if part != '':
+						fragments.append(re.escape(part))
+			if fragments:
+				self._wildcards[list_name] = re.compile("|".join(fragments))
+			else:
+				self._wildcards[list_name] = None
+
+	def has_list(self, list_name: str) -> bool:
+		return list_name in self._exact
+
+	def check(self, name: str, list_name: str) -> bool:
+		"""Return whether name is in, or wildcard matches, the given list."""
+		key = (name, list_name)
+		res = self._memo.get(key)
+		if res is not None:
+			return res
+
+		if name in self._exact[list_name]:
+			res = True
+		else:
+			pattern = self._wildcards[list_name]
+			res = pattern is not None and pattern.search(name) is not None
+		self._memo[key] = res
+		return res
 
 
 def ui_scale() -> float:
@@ -522,6 +688,107 @@ def ui_scale() -> float:
 		return 1
 
 
+class FileRecordCache:
+	"""Persistent store of records about files, kept between sessions.
+
+	Records are keyed by absolute file path, and only returned while the
+	file's size and mtime still match what was recorded. Each write appends
+	the whole record as a json line, with later lines overriding earlier ones
+	for the same path. Once the file holds COMPACT_RATIO times more lines than
+	records, it is rewritten with one line per record.
+
+	Subclasses define what a record holds, and may override _is_valid to
+	treat malformed records, such as from a hand edited file, as missing.
+	"""
+
+	COMPACT_RATIO = 2
+
+	def __init__(self, cache_path: Union[Path, str]):
+		self.cache_path = Path(cache_path)
+		self._records: Dict[str, Dict[str, Any]] = {}
+		self._lines = 0
+		self._loaded = False
+
+	def _load(self) -> None:
+		if self._loaded:
+			return
+		self._loaded = True
+		if not self.cache_path.is_file():
+			return
+		try:
+			with open(self.cache_path, 'r', encoding='utf-8') as f:
+				for line in f:
+					self._lines += 1
+					try:
+						record = json.loads(line)
+						self._records[record["path"]] = record
+					except (ValueError, KeyError, TypeError):
+						continue  # Skip partially written or corrupt lines
+		except OSError as e:
+			env.log(f"Could not read cache {self.cache_path.name}: {e}")
+			return
+		if self._lines > self.COMPACT_RATIO * max(len(self._records), 1):
+			self._compact()
+
+	def _compact(self) -> None:
+		tmp_path = self.cache_path.with_suffix(".tmp")
+		try:
+			self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+			with open(tmp_path, 'w', encoding='utf-8') as f:
+				for record in self._records.values():
+					f.write(json.dumps(record) + "\n")
+			os.replace(tmp_path, self.cache_path)
+			self._lines = len(self._records)
+		except OSError as e:
+			env.log(f"Could not compact cache {self.cache_path.name}: {e}")
+
+	@staticmethod
+	def _stat(filepath: str) -> Optional[Tuple[int, float]]:
+		try:
+			stat = os.stat(filepath)
+		except OSError:
+			return None
+		return stat.st_size, stat.st_mtime
+
+	def _is_valid(self, record: Any) -> bool:
+		return isinstance(record, dict)
+
+	def get(self, filepath: str) -> Optional[Dict[str, Any]]:
+		"""Returns the record for this file, if still valid for its contents."""
+		self._load()
+		record = self._records.get(filepath)
+		if not self._is_valid(record):
+			return None
+		stat = self._stat(filepath)
+		if stat is None or (record.get("size"), record.get("mtime")) != stat:
+			return None
+		return record
+
+	def put(self, filepath: str, record: Dict[str, Any]) -> None:
+		"""Store the record for this file, stamped with its size and mtime."""
+		stat = self._stat(filepath)
+		if stat is None:
+			return
+		self._load()
+		record = dict(record, path=filepath, size=stat[0], mtime=stat[1])
+		try:
+			line = json.dumps(record) + "\n"
+		except TypeError as e:
+			env.log(f"Could not serialize record for {filepath}: {e}", vv_only=True)
+			return
+		self._records[filepath] = record
+		self._lines += 1
+		if self._lines > self.COMPACT_RATIO * len(self._records):
+			self._compact()
+			return
+		try:
+			self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+			with open(self.cache_path, 'a', encoding='utf-8') as f:
+				f.write(line)
+		except OSError as e:
+			env.log(f"Could not write cache {self.cache_path.name}: {e}", vv_only=True)
+
+
 class UvSelAct(enum.Enum):
 	SELECT = 'SELECT'
 	DESELECT = 'DESELECT'
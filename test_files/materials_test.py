@@ -19,8 +19,10 @@
 from typing import Tuple
 import datetime
 import os
+from pathlib import Path
 import shutil
 import tempfile
+import time
 import unittest
 
 import bpy
@@ -29,6 +31,7 @@ from bpy.types import Material
 from MCprep_addon import util
 from MCprep_addon.materials import generate
 from MCprep_addon.materials import sequences
+from MCprep_addon.materials import uv_tools
 from MCprep_addon.materials.generate import find_additional_passes
 from MCprep_addon.materials.generate import get_mc_canonical_name
 from MCprep_addon.materials.uv_tools import get_uv_bounds_per_material
@@ -196,6 +199,150 @@ class MaterialsTest(unittest.TestCase):
         self.assertEqual(
             missing_images, 2, "Other passes should remain empty")
 
+    def test_prep_duplicate_materials(self):
+        """Ensures duplicate materials are all prepped from one group."""
+        new_mat, node = self._create_canon_mat("stone")
+        dup_mat = new_mat.copy()
+        dup_name = dup_mat.name
+        dup_mat["custom_prop"] = 1
+        new_mat["custom_prop"] = 2
+        new_mat.use_backface_culling = False
+        dup_mat.use_backface_culling = True
+        dup_mat.pass_index = 3
+
+        bpy.ops.mesh.primitive_plane_add()
+        obj_a = bpy.context.object
+        obj_a.active_material = new_mat
+        bpy.ops.mesh.primitive_plane_add(location=(3, 0, 0))
+        obj_b = bpy.context.object
+        obj_b.active_material = dup_mat
+        obj_a.select_set(True)
+
+        groups = generate.group_materials_for_prep([new_mat, dup_mat])
+        self.assertEqual(len(groups), 1, "Duplicates should share a group")
+
+        # A duplicate with its own normal map must be prepped on its own.
+        norm_mat = new_mat.copy()
+        norm_node = norm_mat.node_tree.nodes.new(type="ShaderNodeTexImage")
+        norm_node.image = bpy.data.images.new("stone_n", 16, 16)
+        norm_node["MCPREP_normal"] = True
+        groups = generate.group_materials_for_prep([new_mat, dup_mat, norm_mat])
+        self.assertEqual(len(groups), 2, "Normal map should split the group")
+        self.assertEqual(groups[1][1], [norm_mat])
+        self.assertEqual(groups[1][0]["normal"], norm_node.image)
+        bpy.data.materials.remove(norm_mat)
+
+        res = bpy.ops.mcprep.prep_materials(
+            animateTextures=False,
+            packFormat="simple",
+            autoFindMissingTextures=False,
+            improveUiSettings=False)
+        self.assertEqual(res, {'FINISHED'})
+
+        prepped_dup = obj_b.active_material
+        self.assertEqual(prepped_dup.name, dup_name)
+        self.assertEqual(prepped_dup.get("custom_prop"), 1)
+        self.assertTrue(prepped_dup.use_backface_culling)
+        self.assertEqual(prepped_dup.pass_index, 3)
+        self.assertEqual(
+            prepped_dup.get("MCPREP_TEMPLATE"),
+            obj_a.active_material.get("MCPREP_TEMPLATE"))
+        for mat in (obj_a.active_material, prepped_dup):
+            diffuse = generate.get_node_for_pass(mat, "diffuse")
+            self.assertIsNotNone(diffuse, f"No diffuse node for {mat.name}")
+            self.assertEqual(diffuse.image, node.image)
+
+    def test_prep_reuses_template(self):
+        """Ensures re-prepping copies the template kept for the same graph."""
+        new_mat = self._prep_material_test_constructor("specular")
+        key = new_mat.get("MCPREP_TEMPLATE")
+        self.assertIsNotNone(key)
+        template = generate.get_material_template(key)
+        self.assertIsNotNone(template, "No template kept after first prep")
+        node_count = len(template.node_tree.nodes)
+        name = new_mat.name
+
+        # Edit a generated value, which re-prepping should reset.
+        edited = None
+        for node in new_mat.node_tree.nodes:
+            for socket in node.inputs:
+                if socket.type == "VALUE" and not socket.is_linked:
+                    edited = (node.name, socket.identifier)
+                    break
+            if edited:
+                break
+        self.assertIsNotNone(edited, "No unlinked value socket to edit")
+        socket = new_mat.node_tree.nodes[edited[0]].inputs[edited[1]]
+        generated_value = socket.default_value
+        socket.default_value = generated_value + 0.5
+
+        res = bpy.ops.mcprep.prep_materials(
+            animateTextures=False,
+            packFormat="specular",
+            autoFindMissingTextures=False,
+            improveUiSettings=False)
+        self.assertEqual(res, {'FINISHED'})
+
+        # The material is replaced by a copy of the template, under its name.
+        prepped = bpy.context.object.active_material
+        self.assertEqual(prepped.name, name)
+        self.assertEqual(len(prepped.node_tree.nodes), node_count)
+        socket = prepped.node_tree.nodes[edited[0]].inputs[edited[1]]
+        self.assertAlmostEqual(
+            socket.default_value, generated_value, places=5,
+            msg="Edited value was not reset")
+        diffuse = generate.get_node_for_pass(prepped, "diffuse")
+        self.assertIsNotNone(diffuse.image, "Diffuse image was not patched")
+        self.assertIsNone(
+            generate.get_node_for_pass(template, "diffuse").image,
+            "Template should not hold images")
+
+        # Changing the format is a different template, so should regenerate.
+        res = bpy.ops.mcprep.prep_materials(
+            animateTextures=False,
+            packFormat="simple",
+            autoFindMissingTextures=False,
+            improveUiSettings=False)
+        self.assertEqual(res, {'FINISHED'})
+        count_images, _ = self._get_imgnode_stats(
+            bpy.context.object.active_material)
+        self.assertEqual(count_images, 1, "Should have regenerated as simple")
+
+    def test_prep_template_faster(self):
+        """Ensures copying from a template is faster than regenerating."""
+        count = 20
+        _, img_node = self._create_canon_mat("dirt")
+        options = generate.PrepOptions(
+            passes={"diffuse": img_node.image},
+            use_reflections=False,
+            use_principled=True,
+            only_solid=False,
+            pack_format=generate.PackFormat.SPECULAR,
+            use_emission_nodes=False,
+            use_emission=False
+        )
+        # Prep one first, so that the template exists for the timed loop.
+        mat, _ = self._create_canon_mat("dirt")
+        _, res = generate.prep_material_from_template(mat, options)
+        self.assertEqual(res, 0)
+
+        mats = [self._create_canon_mat("dirt")[0] for _ in range(count)]
+        start = time.perf_counter()
+        for mat in mats:
+            generate.matprep_cycles(mat, options)
+        generate_time = time.perf_counter() - start
+
+        mats = [self._create_canon_mat("dirt")[0] for _ in range(count)]
+        start = time.perf_counter()
+        for mat in mats:
+            _, res = generate.prep_material_from_template(mat, options)
+            self.assertEqual(res, 0)
+        template_time = time.perf_counter() - start
+
+        print(f"Generated {count} in {generate_time:.4f}s, "
+              f"copied {count} in {template_time:.4f}s")
+        self.assertLess(template_time, generate_time)
+
     def test_prep_missing_pbr_passes(self):
         """Ensures norm/spec passes loaded after simple prepping."""
         self._set_test_mcprep_texturepack_path()
@@ -265,6 +412,116 @@ class MaterialsTest(unittest.TestCase):
         """Validates generating an image sequence works ok."""
         self._material_sequnece_subtest(operator=False)
 
+    def test_export_image_to_sequence(self):
+        """Validates exported frames match the tiles of the source image."""
+        source = self._get_canon_texture_image("lava_flow")
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            first = sequences.export_image_to_sequence(source, tmp_dir)
+            self.assertTrue(os.path.isfile(first), "First frame not saved")
+
+            src = bpy.data.images.load(source)
+            width = src.size[0]
+            tiles = src.size[1] // width
+            frames = sorted(os.listdir(tmp_dir))
+            self.assertEqual(len(frames), tiles)
+
+            # The first frame is the top tile of the source image.
+            frame = bpy.data.images.load(os.path.join(tmp_dir, frames[0]))
+            self.assertEqual(tuple(frame.size), (width, width))
+            tile_len = width * width * 4
+            expected = src.pixels[len(src.pixels) - tile_len:]
+            for exp, res in zip(expected, frame.pixels[:]):
+                self.assertAlmostEqual(exp, res, places=2)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_export_float_image_to_sequence(self):
+        """Validates float sources are exported as srgb png frames."""
+        tmp_dir = tempfile.mkdtemp()
+        source = os.path.join(tmp_dir, "float_tiles.exr")
+        img = bpy.data.images.new("float_tiles", 2, 4, float_buffer=True)
+        img.pixels = [0.214, 0.214, 0.214, 1.0] * 8  # Linear of srgb 0.5
+        img.filepath_raw = source
+        img.file_format = 'OPEN_EXR'
+        img.save()
+        bpy.data.images.remove(img)
+        out_dir = os.path.join(tmp_dir, "frames")
+        try:
+            first = sequences.export_image_to_sequence(source, out_dir)
+            self.assertEqual(os.path.splitext(first)[1], ".png")
+            frame = bpy.data.images.load(first)
+            self.assertAlmostEqual(frame.pixels[0], 0.5, places=2)
+            self.assertAlmostEqual(frame.pixels[3], 1.0, places=2)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_sequence_manifest(self):
+        """Validates sequences are reused, or repaired, via their manifest."""
+        tmp_dir = tempfile.mkdtemp()
+        source = os.path.join(tmp_dir, "lava_flow.png")
+        shutil.copyfile(self._get_canon_texture_image("lava_flow"), source)
+        try:
+            res, err = sequences.generate_material_sequence(
+                source, source, None, "texturepack", False)
+            self.assertIsNone(err)
+            seq_path = os.path.join(tmp_dir, "lava_flow")
+            manifest = sequences.read_sequence_manifest(seq_path)
+            self.assertIsNotNone(manifest, "Manifest not written")
+            self.assertEqual(manifest["frames"], len(manifest["files"]))
+            self.assertEqual(
+                len(manifest["timeline"]), len(manifest["files"]))
+            self.assertEqual(
+                res["diffuse"], os.path.join(seq_path, manifest["files"][0]))
+
+            # A deleted frame should be re-exported on its own.
+            missing = os.path.join(seq_path, manifest["files"][-1])
+            os.remove(missing)
+            sequences.generate_material_sequence(
+                source, source, None, "texturepack", False)
+            self.assertTrue(os.path.isfile(missing), "Frame not re-exported")
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_sequence_plan(self):
+        """Validates mcmeta frame orders and times map to sequence frames."""
+        frames, timeline = sequences.get_sequence_plan(None, 3)
+        self.assertEqual(frames, [(0, 0, 0.0), (1, 1, 0.0), (2, 2, 0.0)])
+        self.assertEqual(timeline, [(0, 1), (1, 1), (2, 1)])
+        self.assertEqual(sequences.get_uniform_ticks(timeline), 1)
+
+        # Long frame times should not repeat frames.
+        mcmeta = {"animation": {"frametime": 300}}
+        frames, timeline = sequences.get_sequence_plan(mcmeta, 2)
+        self.assertEqual(frames, [(0, 0, 0.0), (1, 1, 0.0)])
+        self.assertEqual(sequences.get_uniform_ticks(timeline), 300)
+
+        # Repeated tiles share one frame, and out of range frames are skipped.
+        mcmeta = {"animation": {
+            "frametime": 2, "frames": [1, {"index": 0, "time": 4}, 5, 1]}}
+        frames, timeline = sequences.get_sequence_plan(mcmeta, 2)
+        self.assertEqual(frames, [(1, 1, 0.0), (0, 0, 0.0)])
+        self.assertEqual(timeline, [(0, 2), (1, 4), (0, 2)])
+        self.assertIsNone(sequences.get_uniform_ticks(timeline))
+
+        mcmeta = {"animation": {"frametime": 2, "interpolate": True}}
+        frames, timeline = sequences.get_sequence_plan(mcmeta, 2)
+        self.assertEqual(
+            frames, [(0, 0, 0.0), (0, 1, 0.5), (1, 1, 0.0), (1, 0, 0.5)])
+        self.assertEqual(sequences.get_uniform_ticks(timeline), 1)
+
+        # Long interpolated times are split into a limited number of blends.
+        mcmeta = {"animation": {"frametime": 300, "interpolate": True}}
+        frames, timeline = sequences.get_sequence_plan(mcmeta, 22)
+        self.assertEqual(len(frames), 22 * sequences.INTERPOLATE_STEPS)
+        self.assertEqual(sum(ticks for _, ticks in timeline), 22 * 300)
+
+        # Malformed times fall back to defaults rather than failing.
+        mcmeta = {"animation": {"frametime": 0, "frames": [
+            {"index": 0, "time": "1"}, {"index": 1, "time": 2.5}, True]}}
+        frames, timeline = sequences.get_sequence_plan(mcmeta, 2)
+        self.assertEqual(timeline, [(0, 1), (1, 2)])
+
     def test_prep_material_animated(self):
         """Validates loading an animated material works ok."""
         self._material_sequnece_subtest(operator=True)
@@ -644,6 +901,68 @@ class MaterialsTest(unittest.TestCase):
             uv_bounds, {mname: [0, 1, 0, 1]},
             "UV mapping is irregular, should have different min/max")
 
+    def test_select_alpha_faces(self):
+        """Ensure faces over transparent pixels are selected."""
+        bpy.ops.mesh.primitive_plane_add()
+        bpy.ops.object.editmode_toggle()
+        bpy.ops.mesh.select_all(action='SELECT')
+        bpy.ops.mesh.subdivide(number_cuts=1)
+        bpy.ops.uv.reset()
+        bpy.ops.mesh.select_all(action='DESELECT')
+
+        # Left column of pixels transparent, right column opaque.
+        img = bpy.data.images.new("alpha_test", 2, 2, alpha=True)
+        img.pixels = [1, 1, 1, 0, 1, 1, 1, 1] * 2
+        mat, img_node = self._create_canon_mat()
+        img_node.image = img
+        bpy.context.object.active_material = mat
+
+        res = bpy.ops.mcprep.select_alpha_faces(threshold=0.5)
+        self.assertEqual(res, {'FINISHED'})
+        bpy.ops.object.editmode_toggle()
+        polys = bpy.context.object.data.polygons
+        selected = [poly.center.x < 0 for poly in polys if poly.select]
+        self.assertEqual(selected, [True, True], "Left faces should select")
+        self.assertIn(img.name_full, generate.env.alpha_cache)
+
+        # Edited pixels must not use the prior cached alpha.
+        img.pixels = [1, 1, 1, 1] * 4
+        bpy.ops.object.editmode_toggle()
+        bpy.ops.mesh.select_all(action='DESELECT')
+        bpy.ops.mcprep.select_alpha_faces(threshold=0.5)
+        bpy.ops.object.editmode_toggle()
+        self.assertFalse(
+            any(poly.select for poly in polys), "Opaque faces selected")
+
+    def test_alpha_cache_bounded(self):
+        """Ensure cached alpha buffers stay within the pixel limit."""
+        prior = uv_tools.ALPHA_CACHE_PIXELS
+        uv_tools.ALPHA_CACHE_PIXELS = 2 * 16  # Two 4x4 images
+        generate.env.alpha_cache.clear()
+        try:
+            images = [
+                bpy.data.images.new(f"alpha_{i}", 4, 4, alpha=True)
+                for i in range(3)]
+            names = [img.name_full for img in images]
+            for img in images:
+                uv_tools.get_image_alpha(img)
+            self.assertEqual(list(generate.env.alpha_cache), names[1:])
+
+            # Reading an image again keeps it over less recently used ones.
+            uv_tools.get_image_alpha(images[1])
+            uv_tools.get_image_alpha(images[0])
+            self.assertEqual(
+                list(generate.env.alpha_cache), [names[1], names[0]])
+
+            # Images removed from the file are dropped first.
+            bpy.data.images.remove(images[1])
+            uv_tools.get_image_alpha(images[2])
+            self.assertEqual(
+                list(generate.env.alpha_cache), [names[0], names[2]])
+        finally:
+            uv_tools.ALPHA_CACHE_PIXELS = prior
+            generate.env.alpha_cache.clear()
+
     def test_canonical_test_mappings(self):
         """Test some specific mappings to ensure they return correctly."""
 
@@ -665,6 +984,16 @@ class MaterialsTest(unittest.TestCase):
                     res, val,
                     f"{key} should map to {res} ({mapped}, not {val}")
 
+    def test_canonical_index_rebuild(self):
+        """Ensure the canonical index follows reloads of the json data."""
+        first = get_mc_canonical_name("mushroom_red")
+        self.assertIs(util.env.canonical_index.source, util.env.json_data)
+        self.assertEqual(get_mc_canonical_name("mushroom_red"), first)
+
+        util.load_mcprep_json()
+        self.assertIs(util.env.canonical_index.source, util.env.json_data)
+        self.assertEqual(get_mc_canonical_name("mushroom_red"), first)
+
     def detect_extra_passes(self):
         """Ensure only the correct pbr file matches are found for input file"""
 
@@ -738,6 +1067,27 @@ class MaterialsTest(unittest.TestCase):
         cleanup()
         self.assertEqual(res, {}, "Fake file should not have any return")
 
+    def test_pass_index_refresh(self):
+        """Ensure the cached pass index picks up newly added pass files."""
+        tmp_dir = tempfile.mkdtemp()
+        diffuse = os.path.join(tmp_dir, "andesite.png")
+        normal = os.path.join(tmp_dir, "andesite_n.png")
+        try:
+            with open(diffuse, 'a'):
+                pass
+            res = find_additional_passes(diffuse)
+            self.assertNotIn("normal", res)
+
+            with open(normal, 'a'):
+                pass
+            # Ensure a distinct folder mtime, regardless of fs resolution.
+            stat = os.stat(tmp_dir)
+            os.utime(tmp_dir, (stat.st_atime, stat.st_mtime + 10))
+            res = find_additional_passes(diffuse)
+            self.assertEqual(res.get("normal"), normal)
+        finally:
+            shutil.rmtree(tmp_dir)
+
     def test_replace_missing_images_fixed(self):
         """Find missing images from selected materials, cycles.
 
@@ -954,6 +1304,104 @@ class MaterialsTest(unittest.TestCase):
                 prepMaterials=True)
             self.assertTrue(res, {"FINISHED"})
 
+    def test_texturepack_index(self):
+        """Ensure texture pack lookups resolve from a shared catalog."""
+        testdir = os.path.dirname(__file__)
+        pack = Path(testdir, "test_resource_pack")
+        res = generate.find_from_texturepack("diamond_ore", pack)
+        self.assertEqual(
+            res, Path(pack, "textures", "diamond_ore.png"))
+        index = generate.get_texturepack_index(pack)
+        self.assertIs(index, generate.get_texturepack_index(pack))
+        self.assertIsNone(index.find("not_a_texture"))
+
+        res = generate.find_from_texturepack("not_a_texture", pack)
+        self.assertIsInstance(res, util.MCprepError)
+
+    def test_texturepack_index_no_textures_folder(self):
+        """Ensure packs without a textures folder only index search folders."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for relpath in ["blocks/stone.png", "unrelated/deep/dirt.png"]:
+                path = Path(tmp_dir, relpath)
+                path.parent.mkdir(parents=True)
+                path.write_bytes(b"")
+
+            index = generate.TexturePackIndex(Path(tmp_dir))
+            self.assertEqual(
+                index.find("stone"), Path(tmp_dir, "blocks", "stone.png"))
+            self.assertIsNone(index.find("dirt"), "Should not walk all folders")
+            # Subpaths outside of the catalog are still found on disk.
+            self.assertEqual(
+                index.find("unrelated/deep/dirt"),
+                Path(tmp_dir, "unrelated", "deep", "dirt.png"))
+
+            # Removals are picked up from directory mtimes, not per lookup.
+            Path(tmp_dir, "blocks", "stone.png").unlink()
+            index.validate(force=True)
+            self.assertIsNone(index.find("stone"))
+
+    def test_texturepack_index_case(self):
+        """Ensure texture lookups ignore the case of names and files."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir, "textures", "block", "Stone_Bricks.PNG")
+            path.parent.mkdir(parents=True)
+            path.write_bytes(b"")
+
+            index = generate.TexturePackIndex(Path(tmp_dir))
+            self.assertEqual(index.find("stone_bricks"), path)
+            self.assertEqual(index.find("block/STONE_BRICKS"), path)
+            self.assertEqual(
+                index.get_exact("block/stone_bricks.png"), str(path))
+
+    def test_texturepack_stack(self):
+        """Ensure layered packs resolve from the first pack with a match."""
+        testdir = os.path.dirname(__file__)
+        pack = Path(testdir, "test_resource_pack")
+        addon_prefs = util.get_user_preferences(bpy.context)
+        base = Path(bpy.path.abspath(addon_prefs.custom_texturepack_path))
+
+        res = generate.find_from_texturepack("diamond_ore", [pack, base])
+        self.assertEqual(res, Path(pack, "textures", "diamond_ore.png"))
+        res = generate.find_from_texturepack("diamond_ore", [base, pack])
+        self.assertNotEqual(res, Path(pack, "textures", "diamond_ore.png"))
+
+        # Not defined in the test pack, so should come from the base pack.
+        res = generate.find_from_texturepack("stone", [pack, base])
+        self.assertIsInstance(res, Path)
+        self.assertTrue(str(res).startswith(str(base)))
+
+    def test_image_analysis_cache(self):
+        """Ensure image analysis results persist to disk between sessions."""
+        testdir = os.path.dirname(__file__)
+        img_path = os.path.join(
+            testdir, "test_resource_pack", "textures", "diamond_ore.png")
+        cache_path = Path(tempfile.gettempdir(), "mcprep_image_cache.jsonl")
+        if cache_path.exists():
+            cache_path.unlink()
+
+        prior = generate.env.image_cache_path
+        generate.env.image_cache_path = cache_path
+        generate.env.image_analysis_cache = None
+        try:
+            image = bpy.data.images.load(img_path)
+            is_gray = generate.is_image_grayscale(image)
+            self.assertFalse(sequences.is_image_tiled(image))
+
+            # A fresh cache, as in a new session, should read back the results.
+            cache = generate.ImageAnalysisCache(cache_path)
+            record = cache.get(os.path.normpath(img_path))
+            self.assertIsNotNone(record)
+            self.assertEqual(record["grayscale"], is_gray)
+            self.assertEqual(record["width"], image.size[0])
+            self.assertEqual(record["height"], image.size[1])
+            self.assertEqual(record["tiles"], 1)
+            self.assertIsNone(cache.get(os.path.join(testdir, "not_a_file.png")))
+        finally:
+            generate.env.image_cache_path = prior
+            generate.env.image_analysis_cache = None
+            if cache_path.exists():
+                cache_path.unlink()
+
 
 if __name__ == '__main__':
     unittest.main(exit=False)
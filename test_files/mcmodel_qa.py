@@ -1,15 +1,18 @@
 """Test MC Model spawning by iterating through whole list.
 
-Will be slow, spawning each one, and listing which ones have errors.
+Spawns all models in one batch, and lists which ones have errors. The
+first model is also spawned through the operator, to cover the same path
+as placing a model from the panel.
 """
 
 import bpy
 
+from MCprep_addon.spawner import mcmodel
+
 # Limit the number of models to spawn.
 MAX_CHECK = 100
 
-# For visualizing or creating a simple asset library. It will get crazy slow
-# if MAX_CHECK is large!
+# For visualizing or creating a simple asset library.
 PLACE_IN_GRID = True
 SPACING = 2  # Spacing between each model in meters.
 
@@ -24,51 +27,44 @@ def check_models(context):
 	successful = []
 
 	count = len(scn_props.model_list)
-	prior_obj = None
-
 	print("Total to process: ", count)
 	if count > MAX_CHECK:
 		print("Limited to ", MAX_CHECK)
 		count = MAX_CHECK
 
-	width = int(count**0.5)
+	models = list(scn_props.model_list)[:count]
+	results = mcmodel.spawn_models(
+		context,
+		[model.filepath for model in models],
+		spacing=SPACING if PLACE_IN_GRID else None)
+
+	for index, res in enumerate(results):
+		name = models[index].name
+		if res.error:
+			exceptions.append([name, res.error])
+			print(f"{name} failed")
+		elif len(res.obj.data.vertices) < 4:
+			exceptions.append([name, "Not enough geo generated"])
+			print("#{} {} failed".format(index, name))
+		else:
+			successful.append(name)
+		print("#{}/{} {:.3f}s".format(index, count, res.duration))
 
-	for index in range(len(scn_props.model_list)):
-		# scn_props.model_list_index = index
-		model = scn_props.model_list[index]
+		if res.obj and not PLACE_IN_GRID:
+			bpy.data.objects.remove(res.obj)
 
+	if models:
+		name = models[0].name
 		try:
-			bpy.ops.mcprep.spawn_model(filepath=model.filepath, skipUsage=True)
-
-			new_obj = context.object
-			if new_obj != prior_obj:
-				prior_obj = new_obj
-			else:
-				exceptions.append([model.name, "object was same between iteration"])
-				print("Object was the same between iterations")
-				break
-			if len(new_obj.data.vertices) < 4:
-				exceptions.append([model.name, "Not enough geo generated"])
-				print("#{} {} failed".format(
-					index, model.name))
-			else:
-				successful.append(model.name)
-		except Exception as err:
-			exceptions.append([model.name, str(err)])
-			print(f"{model.name} failed")
-		finally:
-			print("#{}/{}".format(index, count))
-
-		if PLACE_IN_GRID:
-			row = index // width
-			col = index % width
-			bpy.context.object.location = (row * SPACING, col * SPACING, 0)
-
-		else:
-			bpy.ops.object.delete(use_global=True)
-
-		if MAX_CHECK <= index:
-			break
+			res = bpy.ops.mcprep.spawn_model(
+				filepath=models[0].filepath, skipUsage=True)
+		except Exception as e:
+			res = e
+		if res != {'FINISHED'}:
+			exceptions.append([name, f"Operator failed: {res}"])
+			print(f"{name} failed through operator")
+		elif not PLACE_IN_GRID:
+			bpy.data.objects.remove(context.object)
 
 	print("Succeeded: {}, failed: {}".format(
 		len(successful),
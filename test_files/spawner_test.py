@@ -16,13 +16,18 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+import json
 import os
+import shutil
+import tempfile
 import unittest
 
 import bpy
 from mathutils import Vector
 
 from MCprep_addon import util
+from MCprep_addon.spawner import mcmodel
+from MCprep_addon.spawner import meshswap
 
 
 class BaseSpawnerTest(unittest.TestCase):
@@ -154,6 +159,56 @@ class ItemSpawnerTest(BaseSpawnerTest):
         polys = len(obj.data.polygons)
         self.assertEqual(16, polys, "Wrong pixel scaling applied")
 
+    def test_item_spawner_transparency(self):
+        """Test that only faces of opaque pixels are built."""
+        # Bottom two rows transparent, top two rows opaque.
+        tmp_img = bpy.data.images.new("tmp_item_alpha", 4, 4, alpha=True)
+        tmp_img.pixels = [0, 0, 0, 0] * 8 + [0, 0, 0, 1] * 8
+        tmp_img.filepath = os.path.join(bpy.app.tempdir, "tmp_item_alpha.png")
+        tmp_img.save()
+
+        bpy.ops.mcprep.spawn_item_file(
+            filepath=tmp_img.filepath, thickness=0)
+        obj = bpy.context.object
+        self.assertEqual(len(obj.data.polygons), 8, "Wrong face count")
+        self.assertEqual(len(obj.data.vertices), 15, "Expected shared verts")
+        self.assertTrue(
+            all(poly.center.y > 0 for poly in obj.data.polygons),
+            "Transparent faces were not removed")
+        self.assertEqual(len(obj.data.uv_layers), 1)
+
+        bpy.ops.mcprep.spawn_item_file(
+            filepath=tmp_img.filepath, thickness=0, transparency=False)
+        self.assertEqual(len(bpy.context.object.data.polygons), 16)
+
+    def test_item_spawner_greedy(self):
+        """Test merged item faces and reuse of the merged mesh."""
+        tmp_img = bpy.data.images.new("tmp_item_greedy", 4, 4, alpha=True)
+        tmp_img.pixels = [0, 0, 0, 0] * 8 + [0, 0, 0, 1] * 8
+        tmp_img.filepath = os.path.join(bpy.app.tempdir, "tmp_item_greedy.png")
+        tmp_img.save()
+
+        bpy.ops.mcprep.spawn_item_file(
+            filepath=tmp_img.filepath, greedy=True, size=2)
+        first = bpy.context.object
+        self.assertEqual(len(first.data.polygons), 1, "Opaque half not merged")
+        self.assertEqual(tuple(first.scale), (1, 1, 1))
+        uvs = sorted(tuple(loop.uv) for loop in first.data.uv_layers[0].data)
+        self.assertEqual(uvs, [(0, 0.5), (0, 1), (1, 0.5), (1, 1)])
+
+        bpy.ops.mcprep.spawn_item_file(
+            filepath=tmp_img.filepath, greedy=True)
+        second = bpy.context.object
+        self.assertNotEqual(first, second)
+        self.assertEqual(first.data, second.data, "Mesh not reused")
+        self.assertEqual(len(second.data.materials), 1)
+
+        # A mesh no longer stamped with the same inputs isn't reused.
+        del second.data["MCPREP_ITEM"]
+        bpy.ops.mcprep.spawn_item_file(
+            filepath=tmp_img.filepath, greedy=True)
+        self.assertNotEqual(second.data, bpy.context.object.data)
+
 
 class EffectsSpawnerTest(BaseSpawnerTest):
     """EffectsSpawning-related tests."""
@@ -324,6 +379,121 @@ class ModelSpawnerTest(BaseSpawnerTest):
         model = new_objs[0]
         self.assertTrue(model.active_material, "No material on model")
 
+    def test_model_spawner_shared_mesh(self):
+        """Test repeated model spawns share one mesh unless single user."""
+        bpy.ops.mcprep.reload_models()
+        scn_props = bpy.context.scene.mcprep_props
+        filepath = scn_props.model_list[scn_props.model_list_index].filepath
+        model_name = os.path.splitext(os.path.basename(filepath))[0]
+
+        bpy.ops.mcprep.spawn_model(filepath=filepath, single_user=False)
+        first = bpy.context.object
+        pre_mats = len(bpy.data.materials)
+        _, second = mcmodel.add_model(
+            os.path.normpath(filepath), "renamed_model", share_mesh=True)
+        self.assertNotEqual(first, second)
+        self.assertEqual(first.data, second.data, "Mesh not shared")
+        self.assertEqual(
+            len(bpy.data.materials), pre_mats, "Materials were rebuilt")
+        for mat in second.data.materials:
+            self.assertTrue(
+                mat.name.startswith(model_name),
+                f"Shared material not named after model: {mat.name}")
+
+        # Spawns are single user by default.
+        bpy.ops.mcprep.spawn_model(filepath=filepath)
+        third = bpy.context.object
+        self.assertNotEqual(first.data, third.data, "Mesh not single user")
+        self.assertEqual(
+            len(first.data.polygons), len(third.data.polygons))
+        # Two objects, and a fake user so the cached mesh is kept on save.
+        self.assertTrue(first.data.use_fake_user)
+        self.assertFalse(third.data.use_fake_user)
+        self.assertEqual(first.data.users, 3)
+
+    def test_spawn_models_batch(self):
+        """Test spawning a batch of models laid out in a grid."""
+        bpy.ops.mcprep.reload_models()
+        scn_props = bpy.context.scene.mcprep_props
+        paths = [model.filepath for model in scn_props.model_list][:4]
+        paths.append(os.path.join(bpy.app.tempdir, "not_a_model.json"))
+
+        results = mcmodel.spawn_models(bpy.context, paths, spacing=2)
+        self.assertEqual(len(results), 5)
+        self.assertIsNotNone(results[-1].error, "Missing file should fail")
+        self.assertIsNone(results[-1].obj)
+
+        spawned = [res.obj for res in results if res.obj]
+        self.assertTrue(spawned, "No models spawned")
+        for res in results[:-1]:
+            if res.obj:
+                self.assertIsNone(res.error)
+                self.assertGreaterEqual(res.duration, 0)
+        locations = {tuple(obj.location) for obj in spawned}
+        self.assertEqual(len(locations), len(spawned), "Models overlap")
+
+    def test_read_model_cache(self):
+        """Test resolved parent models are cached until their files change."""
+        tmpdir = tempfile.mkdtemp()
+        models = os.path.join(tmpdir, "assets", "minecraft", "models", "block")
+        os.makedirs(models)
+
+        def write_model(name, data):
+            with open(os.path.join(models, f"{name}.json"), "w") as fd:
+                json.dump(data, fd)
+
+        write_model("cube", {
+            "elements": [{"from": [0, 0, 0], "to": [16, 16, 16]}],
+            "textures": {"particle": "#all"}})
+        write_model("stone", {
+            "parent": "block/cube", "textures": {"all": "block/stone"}})
+        write_model("dirt", {
+            "parent": "block/cube", "textures": {"all": "block/dirt"}})
+
+        try:
+            mcmodel.env.model_cache = {}
+            stone = os.path.join(models, "stone.json")
+            elements, textures = mcmodel.read_model(bpy.context, stone)
+            self.assertEqual(len(elements), 1)
+            self.assertEqual(textures["all"], "block/stone")
+
+            # The shared parent should not be altered by either child.
+            _, textures = mcmodel.read_model(
+                bpy.context, os.path.join(models, "dirt.json"))
+            self.assertEqual(textures["all"], "block/dirt")
+            self.assertEqual(len(mcmodel.env.model_cache), 3)
+
+            chain = []
+            mcmodel.read_model(bpy.context, stone, chain=chain)
+            self.assertEqual(
+                [os.path.basename(path) for path in chain],
+                ["stone.json", "cube.json"])
+
+            # Editing the parent file should be picked up by the child.
+            write_model("cube", {"elements": [], "textures": {}})
+            cube = os.path.join(models, "cube.json")
+            mtime = os.path.getmtime(cube) + 10
+            os.utime(cube, (mtime, mtime))
+            elements, _ = mcmodel.read_model(bpy.context, stone)
+            self.assertEqual(elements, [])
+
+            stack = mcmodel.get_model_pack_stack(bpy.context, stone)
+            parent = mcmodel.get_parent_model_path(
+                {"parent": "block/cube"}, stack)
+            self.assertEqual(os.path.normpath(parent), cube)
+            self.assertIsNone(mcmodel.get_parent_model_path(
+                {"parent": "item/generated"}, stack))
+
+            # Batches parse the parents of models up front, then resolve.
+            mcmodel.env.model_cache = {}
+            results = mcmodel.spawn_models(bpy.context, [stone])
+            self.assertIsNone(results[0].error)
+            self.assertIn(
+                (cube, tuple(str(folder) for folder in stack.folders)),
+                mcmodel.env.model_cache)
+        finally:
+            shutil.rmtree(tmpdir)
+
 
 class EntitySpawnerTest(BaseSpawnerTest):
     """EntitySpawning-related tests."""
@@ -364,7 +534,7 @@ class MeshswapTest(BaseSpawnerTest):
         self.assertGreater(
             len(bpy.data.materials), 50, "Should have many mats")
 
-    def _meshswap_util(self, mat_name: str) -> str:
+    def _meshswap_util(self, mat_name: str, **kwargs) -> str:
         """Run meshswap on the first object with found mat_name"""
         if mat_name not in bpy.data.materials:
             return "Not a material: " + mat_name
@@ -390,7 +560,7 @@ class MeshswapTest(BaseSpawnerTest):
             except Exception:
                 pass
         obj.select_set(True)
-        res = bpy.ops.mcprep.meshswap()
+        res = bpy.ops.mcprep.meshswap(**kwargs)
         if res != {'FINISHED'}:
             return "Meshswap returned cancelled for " + mat_name
         return ""
@@ -501,6 +671,117 @@ class MeshswapTest(BaseSpawnerTest):
                 res = self._meshswap_util(mat_name)
                 self.assertEqual("", res)
 
+    def test_meshswap_instance_points(self):
+        """Test swapping into geometry node instanced point clouds."""
+        if not meshswap.instance_points_available():
+            self.skipTest("Instance on points requires Blender 3.2+")
+        test_subpath = os.path.join("test_data", "jmc2obj_test_1_15_2.obj")
+        self._import_world_with_settings(file=test_subpath)
+
+        # Object swaps and random group variants (torches) both as points.
+        for mat_name in ["sugarcane", "torch"]:
+            with self.subTest(mat_name):
+                pre_objs = set(bpy.data.objects)
+                res = self._meshswap_util(mat_name, use_dupliverts=True)
+                self.assertEqual("", res)
+
+                new_objs = list(set(bpy.data.objects) - pre_objs)
+                points = [
+                    obj for obj in new_objs
+                    if obj.type == "MESH" and obj.modifiers
+                    and obj.modifiers[0].type == "NODES"]
+                self.assertTrue(points, "No instance points objects added")
+                self.assertLess(
+                    len(new_objs), 10, "Should not add an object per block")
+                for obj in points:
+                    self.assertIn("rotation", obj.data.attributes)
+                    self.assertIn("scale", obj.data.attributes)
+                    self.assertGreater(len(obj.data.vertices), 0)
+
+    def test_meshswap_preload(self):
+        """Test swapping several block types with assets preloaded at once."""
+        test_subpath = os.path.join("test_data", "jmc2obj_test_1_15_2.obj")
+        self._import_world_with_settings(file=test_subpath)
+
+        mat_names = ["torch", "sugarcane", "vines"]
+        for ob in bpy.context.scene.objects:
+            ob.select_set(False)
+        for ob in bpy.data.objects:
+            if ob.active_material and ob.active_material.name in mat_names:
+                ob.select_set(True)
+        self.assertTrue(bpy.context.selected_objects)
+
+        res = bpy.ops.mcprep.meshswap()
+        self.assertEqual(res, {'FINISHED'})
+        self.assertIn("torch.1", bpy.data.collections, "Variants not loaded")
+        orphans = [ob.name for ob in bpy.data.objects if ob.users == 0]
+        self.assertEqual(orphans, [], "Object templates left over")
+
+    def test_meshswap_asset_cache(self):
+        """Ensure meshswap library contents persist to disk between sessions."""
+        cache_path = os.path.join(tempfile.gettempdir(), "mcprep_meshswap.jsonl")
+        if os.path.isfile(cache_path):
+            os.remove(cache_path)
+
+        prior = meshswap.env.meshswap_asset_cache_file
+        meshswap.env.meshswap_asset_cache_file = cache_path
+        meshswap.env.meshswap_asset_cache = None
+        try:
+            cache = meshswap.get_meshswap_cache(bpy.context, clear=True)
+            self.assertGreater(len(cache["groups"]), 15)
+            filepath = meshswap.get_meshswap_filepath(bpy.context)
+
+            # A fresh cache, as in a new session, should read back the names.
+            asset_cache = meshswap.MeshswapAssetCache(cache_path)
+            record = asset_cache.get(filepath)
+            self.assertIsNotNone(record)
+            self.assertEqual(record["groups"], cache["groups"])
+            self.assertEqual(record["objects"], cache["objects"])
+
+            key = meshswap.get_asset_key("torch", True)
+            props = {flag: False for flag in meshswap.SWAP_FLAGS}
+            props["variance"] = [False, 0]
+            asset_cache.set_props(filepath, key, props)
+            asset_cache = meshswap.MeshswapAssetCache(cache_path)
+            self.assertEqual(asset_cache.get_props(filepath, key), props)
+            self.assertIsNone(asset_cache.get(cache_path + ".blend"))
+
+            # Clearing reads the library again, replacing the stale record.
+            asset_cache.set_names(filepath, ["stale"], [])
+            meshswap.env.meshswap_asset_cache = asset_cache
+            cache = meshswap.get_meshswap_cache(bpy.context, clear=True)
+            self.assertNotIn("stale", cache["groups"])
+            self.assertEqual(
+                asset_cache.get(filepath)["groups"], cache["groups"])
+
+            # Malformed records, as if edited by hand, are just misses.
+            with open(cache_path, "w") as fd:
+                record = {"path": filepath, "size": 1, "props": []}
+                fd.write(json.dumps(record) + "\n")
+            asset_cache = meshswap.MeshswapAssetCache(cache_path)
+            self.assertIsNone(asset_cache.get(filepath))
+            self.assertIsNone(asset_cache.get_props(filepath, key))
+        finally:
+            meshswap.env.meshswap_asset_cache_file = prior
+            meshswap.env.meshswap_asset_cache = None
+            if os.path.isfile(cache_path):
+                os.remove(cache_path)
+
+    def test_read_swap_props(self):
+        obj = bpy.data.objects.new("swap_props_test", None)
+        props = meshswap.read_swap_props(obj)
+        self.assertEqual(props["variance"], [False, 0])
+        self.assertFalse(any(props[flag] for flag in meshswap.SWAP_FLAGS))
+
+        obj["variance"] = 1
+        obj["edgeFloat"] = 1
+        obj["material"] = bpy.data.materials.new("swap_props_test")
+        props = meshswap.read_swap_props(obj)
+        self.assertEqual(props["variance"], [True, 1])
+        self.assertTrue(props["edgeFloat"])
+        self.assertFalse(props["torchlike"])
+        self.assertNotIn("material", props)
+
     def test_meshswap_spawner(self):
         scn_props = bpy.context.scene.mcprep_props
         bpy.ops.mcprep.reload_meshswap()
@@ -544,6 +825,52 @@ class MeshswapTest(BaseSpawnerTest):
         self.assertEqual(
             count, 1, "Should have 1 fire groups exactly, did not cache")
 
+    def test_meshswap_face_cells(self):
+        """Test face block cells match between bulk and per face paths."""
+        bpy.ops.mesh.primitive_cube_add(location=(2, 0, 1))
+        obj = bpy.context.object
+        faces = meshswap.get_face_list(obj, 0, 1)
+        self.assertEqual(len(faces), 6)
+        for normal, glob, local, cell in zip(faces.n, faces.g, faces.l, faces.c):
+            poly_center = [local[0], local[1], local[2]]
+            self.assertEqual(
+                [int(val) for val in cell],
+                meshswap.get_face_cell(poly_center, list(normal), 1))
+            self.assertAlmostEqual(glob[0], local[0] + 2, places=5)
+            self.assertAlmostEqual(glob[2], local[2] + 1, places=5)
+
+        # Faces on block edges go to the block they face, or that behind.
+        self.assertEqual(
+            meshswap.get_face_cell([0.5, 0, 0], [1, 0, 0], 1), [1, 0, 0])
+        self.assertEqual(
+            meshswap.get_face_cell([0.5, 0, 0], [1, 0, 0], -1), [0, 0, 0])
+
+    def test_meshswap_instance_configs(self):
+        """Test instances are keyed by block cell with rule based rotations."""
+        props = {
+            "torchlike": True,
+            "edgeFloat": False,
+            "edgeFlush": False,
+            "doorlike": False}
+        rules, default = meshswap.get_rotation_rules("jmc2obj", props)
+        self.assertEqual(default, 0)
+
+        # Torch leaning off the west side of its block, and one upright.
+        faces = meshswap.FaceArrays(
+            n=[[0, 1, 0], [0, 1, 0], [1, 0, 0]],
+            g=[[0.8, 0, 0], [3, 0, 0], [3.05, 0, 0]],
+            l=[[0.8, 0, 0], [3, 0, 0], [3.05, 0, 0]],
+            c=[[1, 0, 0], [3, 0, 0], [3, 0, 0]])
+        self.assertEqual(meshswap.get_rot_types(faces, rules, default), [1, 0, 0])
+
+        op = type("Op", (), {"track_exporter": "jmc2obj"})()
+        configs = meshswap.MCPREP_OT_meshswap.get_instance_configs(
+            op, faces, props, "torch")
+        self.assertEqual(configs, {(1, 0, 0): [[1, 0, 0], 1], (3, 0, 0): [[3, 0, 0], 0]})
+
+        # Other exporters have no rotation rules.
+        self.assertEqual(meshswap.get_rotation_rules("other", props), ([], 0))
+
 
 if __name__ == '__main__':
     unittest.main(exit=False)
@@ -287,6 +287,13 @@ class WorldToolsTest(unittest.TestCase):
                 [lava_obj, water_obj])
             self.assertTrue(invalid, "Combined lava/water should still alert")
 
+        with self.subTest("test_uv_transform_sampled_matches_full"):
+            full = detect_invalid_uvs_from_objs(bpy.context.selected_objects)
+            sampled = detect_invalid_uvs_from_objs(
+                bpy.context.selected_objects, sample_size=8)
+            self.assertEqual(
+                sampled, full, "Sampled uv check should match full scan")
+
         with self.subTest("canon_name_validation"):
             self._canonical_name_no_none()
 